@@ -1,13 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends
-from .state import room, add_user, get_users
-from .timer import start_registration, start_new_cycle
-from .auth import create_access_token, get_current_user
+from fastapi import APIRouter, HTTPException, Depends, Request
+from .state import DEFAULT_ROOM_ID, ANSWER_ERRORS, rooms, join_room, accept_answer, top_players, votes_payload
+from .models import Room
+from .timer import start_registration, start_new_cycle, close_room
+from .auth import require_organizer, security, signer, verify_token
+from fastapi.security import HTTPAuthorizationCredentials
+from .store import store
 from pydantic import BaseModel
-import qrcode
-from fastapi.responses import StreamingResponse
-from io import BytesIO
+from typing import Callable, Optional
+from fastapi.responses import Response
+from . import clock, config, journal, metrics, qr
+import asyncio
+import hashlib
+import json
+import re
+import secrets
 
+# Роуты одной комнаты: подключаются как /api/room (комната по умолчанию)
+# и как /api/rooms/{room_id}
 router = APIRouter()
+# Управление комнатами
+rooms_router = APIRouter()
 
 class RegisterRequest(BaseModel):
     name: str
@@ -15,106 +27,238 @@ class RegisterRequest(BaseModel):
 class AnswerRequest(BaseModel):
     answer: int
 
-@router.get("/room")
-async def get_room():
-    return {
+class CreateRoomRequest(BaseModel):
+    id: Optional[str] = None
+
+# Версии комнат у разных воркеров независимы, поэтому ETag помечается воркером
+ETAG_WORKER = hashlib.sha1(store.worker_id.encode()).hexdigest()[:8]
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match может перечислять несколько ETag через запятую"""
+    return etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(","))
+
+def cached_json(request: Request, room: Room, name: str, variant, build: Callable[[], object]) -> Response:
+    """JSON-ответ, собранный один раз на версию комнаты и общий для всех запросов.
+
+    variant — то, что меняется без смены версии (таймер, limit). Клиент
+    с совпавшим If-None-Match получает 304 без тела.
+    """
+    cached = room.payloads.get(name)
+    if cached is None or cached[0] != variant:
+        body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode()
+        etag = f'"{ETAG_WORKER}-{room.version}-{variant}"'
+        cached = room.payloads[name] = (variant, body, etag)
+    _, body, etag = cached
+    # no-cache: браузер хранит ответ, но каждый раз сверяется с сервером по ETag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def current_room(room_id: str = DEFAULT_ROOM_ID) -> Room:
+    """Комната из пути /api/rooms/{room_id}; для /api/room — комната по умолчанию"""
+    room = rooms.get(room_id)
+    if room is None:
+        raise HTTPException(status_code=404, detail="Комната не найдена")
+    return room
+
+async def get_current_user(
+    room: Room = Depends(current_room),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> str:
+    """Получение текущего пользователя из токена, выданного в текущем цикле этой комнаты"""
+    username = verify_token(credentials.credentials, room.id, room.game)
+    if username is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Недействительный токен",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return username
+
+@rooms_router.get("/rooms")
+async def list_rooms():
+    return [
+        {"id": room.id, "stage": room.stage, "timer": room.timer, "users": len(room.users)}
+        for room in rooms
+    ]
+
+# Идентификатор комнаты попадает в пути, метрики и журнал: только короткий slug
+ROOM_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,32}')
+
+@rooms_router.post("/rooms", dependencies=[Depends(require_organizer)])
+async def create_room(req: CreateRoomRequest):
+    room_id = req.id or secrets.token_urlsafe(6)
+    if ROOM_ID_PATTERN.fullmatch(room_id) is None:
+        raise HTTPException(status_code=400, detail="Невалидный идентификатор комнаты")
+    if rooms.get(room_id) is not None:
+        raise HTTPException(status_code=409, detail="Комната уже существует")
+    if len(rooms) >= config.MAX_ROOMS:
+        raise HTTPException(status_code=409, detail="Слишком много комнат")
+    room = rooms.create(room_id)
+    start_registration(room)
+    return {"ok": True, "id": room.id}
+
+@rooms_router.delete("/rooms/{room_id}", dependencies=[Depends(require_organizer)])
+async def delete_room(room_id: str):
+    if room_id == DEFAULT_ROOM_ID:
+        raise HTTPException(status_code=403, detail="Комнату по умолчанию удалить нельзя")
+    if not close_room(room_id):
+        raise HTTPException(status_code=404, detail="Комната не найдена")
+    return {"ok": True}
+
+@rooms_router.get("/games")
+async def list_games(room: Optional[str] = None, limit: int = 20):
+    """Прошедшие и текущие игры из журнала, сначала новые"""
+    if journal.sink is None:
+        raise HTTPException(status_code=404, detail="Журнал игр выключен")
+    return await asyncio.to_thread(journal.sink.games, room, min(max(1, limit), 200))
+
+@rooms_router.get("/games/{game}")
+async def get_game(game: str):
+    """Итог игры: участники, вопросы с числом ответов и итоговая таблица"""
+    if journal.sink is None:
+        raise HTTPException(status_code=404, detail="Журнал игр выключен")
+    summary = await asyncio.to_thread(journal.sink.game, game)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Игра не найдена")
+    return summary
+
+@router.get("")
+async def get_room(request: Request, room: Room = Depends(current_room)):
+    timer = room.timer
+    return cached_json(request, room, "room", timer, lambda: {
         "stage": room.stage,
-        "timer": room.timer,
-        "users": [u.name for u in get_users()],
+        "timer": timer,
+        "users": room.users.names,
         "current_question": getattr(room, 'current_question', 0),
         "question_count": len(getattr(room, 'questions', []))
-    }
+    })
 
-@router.post("/room/register")
-async def register_user(req: RegisterRequest):
+@router.post("/register")
+async def register_user(req: RegisterRequest, room: Room = Depends(current_room)):
     if room.stage != 'registration' or room.timer <= 0:
         raise HTTPException(status_code=403, detail="Регистрация закрыта")
-    if not validate_name(req.name):
+    name = " ".join(req.name.split())
+    if not validate_name(name):
         raise HTTPException(status_code=400, detail="Невалидное имя")
-    if not add_user(req.name.strip()):
+    if not await join_room(room, name):
         raise HTTPException(status_code=409, detail="Имя занято или лимит")
     
-    # Создаем JWT токен для пользователя
-    access_token = create_access_token(data={"sub": req.name.strip()})
-    return {"ok": True, "token": access_token, "user": req.name.strip()}
+    # Создаем JWT токен для пользователя: подпись пачками вне event loop
+    access_token = await signer.sign({"sub": name, "room": room.id, "game": room.game})
+    return {"ok": True, "token": access_token, "user": name}
+
+# Поддерживаем латиницу, кириллицу, цифры, пробелы и точки
+NAME_PATTERN = re.compile(r'[a-zA-Zа-яА-Я0-9 .]+')
 
 def validate_name(name: str) -> bool:
-    import re
     name = name.strip()
-    if not name:
-        return False
-    # Поддерживаем латиницу, кириллицу, цифры, пробелы и точки
-    return bool(re.match(r'^[a-zA-Zа-яА-Я0-9 .]+$', name))
-
-@router.post("/room/start")
-async def start_room():
-    start_registration()
+    return bool(name) and NAME_PATTERN.fullmatch(name) is not None
+
+@router.post("/start")
+async def start_room(room: Room = Depends(current_room)):
+    start_registration(room)
     return {"ok": True}
 
-@router.post("/room/restart")
-async def restart_room():
+@router.post("/restart")
+async def restart_room(room: Room = Depends(current_room)):
     """Запуск нового цикла викторины"""
-    start_new_cycle()
+    start_new_cycle(room)
     return {"ok": True}
 
-@router.get("/room/question")
-async def get_question():
+@router.get("/question")
+async def get_question(request: Request, room: Room = Depends(current_room)):
+    timer = room.timer
+    return cached_json(request, room, "question", timer, lambda: question_payload(room, timer))
+
+def question_payload(room: Room, timer: int) -> dict:
     if room.stage != 'quiz':
         return {"question": None}
     
     try:
-        q = room.questions[room.current_question]
-        return {
-            "question": {
-                "text": q.text,
-                "options": q.options,
-                "theme": q.theme,
-                "timer": room.timer
-            }
-        }
-    except (IndexError, AttributeError):
+        return {"question": {**room.public_questions[room.current_question], "timer": timer}}
+    except IndexError:
         return {"question": None}
 
-@router.post("/room/answer")
-async def answer_question(req: AnswerRequest, current_user: str = Depends(get_current_user)):
-    if room.stage != 'quiz' or room.timer <= 0:
-        raise HTTPException(status_code=403, detail="Вопрос не активен")
-    if current_user not in room.users:
-        raise HTTPException(status_code=403, detail="Пользователь не зарегистрирован")
-    if current_user in room.answers:
-        raise HTTPException(status_code=409, detail="Уже отвечал")
-    
-    # Сохраняем ответ и время ответа
-    room.answers[current_user] = {
-        'answer': req.answer,
-        'time': room.timer  # время, когда пользователь ответил
-    }
+@router.get("/votes")
+async def get_votes(room: Room = Depends(current_room)):
+    """Распределение ответов на текущий вопрос (экран ведущего без WebSocket — /ws/presenter)"""
+    return votes_payload(room)
+
+@router.post("/answer")
+async def answer_question(
+    req: AnswerRequest,
+    room: Room = Depends(current_room),
+    current_user: str = Depends(get_current_user),
+):
+    """Запасной путь для клиентов без WebSocket (основной — сообщение answer в /ws/room)"""
+    error = await accept_answer(room, current_user, req.answer, clock.now())
+    if error is not None:
+        status_code, detail = ANSWER_ERRORS[error]
+        raise HTTPException(status_code=status_code, detail=detail)
+    metrics.answers_total.inc("http")
     return {"ok": True}
 
-@router.get("/room/leaderboard")
-async def leaderboard():
-    users = sorted(get_users(), key=lambda u: u.score, reverse=True)
-    return [{"name": u.name, "score": u.score} for u in users]
-
-@router.get("/room/qr")
-async def get_qr():
-    url = "https://v386879.hosted-by-vdsina.com/"  # Главная страница приложения
-    img = qrcode.make(url)
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    return StreamingResponse(buf, media_type="image/png")
-
-@router.get("/room/me")
-async def get_current_user_info(current_user: str = Depends(get_current_user)):
+@router.get("/leaderboard")
+async def leaderboard(request: Request, limit: Optional[int] = None, room: Room = Depends(current_room)):
+    """Топ участников; без limit — вся таблица"""
+    users = room.users
+    limit = len(users) if limit is None else min(max(0, limit), len(users))
+    return cached_json(request, room, "leaderboard", limit, lambda: top_players(room, limit))
+
+@router.get("/leaderboard/me")
+async def leaderboard_around_me(
+    radius: int = 2,
+    room: Room = Depends(current_room),
+    current_user: str = Depends(get_current_user),
+):
+    """Место текущего пользователя и его соседи по таблице"""
+    users = room.users
+    idx = users.get(current_user)
+    if idx is None:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    radius = min(max(0, radius), 50)
+    room.leaderboard.sync(len(users))
+    position, around = room.leaderboard.around(idx, radius)
+    first = max(0, position - radius)
+    return {
+        "rank": position + 1,
+        "total": len(users),
+        "around": [
+            {"rank": first + i + 1, "name": users.names[j], "score": users.score[j]}
+            for i, j in enumerate(around.tolist())
+        ],
+    }
+
+@router.get("/qr")
+async def get_qr(request: Request, format: str = "png", size: int = qr.DEFAULT_BOX_SIZE):
+    """QR-код главной страницы; готовые байты из памяти, ETag и 304"""
+    if format not in qr.FORMATS or size not in config.QR_BOX_SIZES:
+        raise HTTPException(status_code=400, detail="Неподдерживаемый вариант QR-кода")
+    rendered = await qr.get_qr(config.PUBLIC_URL, format, size)
+    headers = {"ETag": rendered.etag, "Cache-Control": "public, max-age=3600"}
+    if etag_matches(request, rendered.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=rendered.body, media_type=rendered.media_type, headers=headers)
+
+@router.get("/me")
+async def get_current_user_info(
+    room: Room = Depends(current_room),
+    current_user: str = Depends(get_current_user),
+):
     """Получение информации о текущем пользователе"""
-    if current_user not in room.users:
+    idx = room.users.get(current_user)
+    if idx is None:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     
-    user = room.users[current_user]
+    user = room.users.public(idx)
+    room.leaderboard.sync(len(room.users))
     return {
         "name": user.name,
         "score": user.score,
-        "last_answer_correct": getattr(user, 'last_answer_correct', None),
-        "last_score": getattr(user, 'last_score', 0)
-    } 
\ No newline at end of file
+        "last_answer_correct": user.last_answer_correct,
+        "last_score": user.last_score,
+        "rank": int(room.leaderboard.rank[idx]) + 1,
+        "total": len(room.users)
+    }
@@ -1,49 +1,168 @@
-from datetime import datetime, timedelta
-from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from typing import List, Optional, Tuple
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import secrets
 from fastapi import Depends
+from . import config, metrics
+from .store import store
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
 
 # Конфигурация JWT
-SECRET_KEY = secrets.token_urlsafe(32)  # Генерируем случайный секретный ключ
+# QUIZ_SECRET_KEY или общий для всех воркеров ключ из хранилища. Читается (и при
+# необходимости создается) при старте приложения или первой подписи, а не при импорте
+SECRET_KEY: Optional[str] = None
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 часа
 
 security = HTTPBearer()
 
+# Кэш проверенных токенов: токен → (имя, комната, игра, до какого time.time() доверяем).
+# Во время волны ответов один и тот же токен приходит снова и снова, а полная
+# проверка подписи и разбор claims — самое дорогое на этом пути.
+_verified: "OrderedDict[str, Tuple[str, str, str, float]]" = OrderedDict()
+token_cache_stats = {"hits": 0, "misses": 0}
+metrics.Counter("quiz_token_cache_total", "Проверки токенов: из кэша и полным разбором", ("result",),
+                source=lambda: {(result,): count for result, count in token_cache_stats.items()})
+
+def b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+# Заголовок у всех токенов один, ключ HMAC подготовлен заранее: подпись — один
+# json.dumps и один HMAC, без разбора заголовка и claims в python-jose
+JWT_HEADER = b64url(b'{"alg":"HS256","typ":"JWT"}')
+_mac = None
+
+def load_secret_key() -> str:
+    global SECRET_KEY, _mac
+    if SECRET_KEY is None:
+        SECRET_KEY = store.secret_key()
+        _mac = hmac.new(SECRET_KEY.encode(), digestmod=hashlib.sha256)
+    return SECRET_KEY
+
+def sign_token(claims: dict) -> str:
+    """Подпись HS256; проверяется тем же jwt.decode, что и токены python-jose"""
+    signing_input = JWT_HEADER + b"." + b64url(json.dumps(claims, separators=(",", ":")).encode())
+    if _mac is None:
+        load_secret_key()
+    mac = _mac.copy()
+    mac.update(signing_input)
+    return (signing_input + b"." + b64url(mac.digest())).decode()
+
+def sign_batch(batch: List[dict]) -> List[str]:
+    return [sign_token(claims) for claims in batch]
+
+def token_claims(data: dict, expires_delta: Optional[timedelta] = None) -> dict:
+    if expires_delta is None:
+        expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {**data, "exp": int(time.time() + expires_delta.total_seconds())}
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Создание JWT токена"""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def verify_token(token: str) -> Optional[str]:
-    """Проверка JWT токена и возврат имени пользователя"""
+    return sign_token(token_claims(data, expires_delta))
+
+class TokenSigner:
+    """Подпись токенов регистрации пачками в ограниченном пуле потоков.
+
+    Запросы, пришедшие за один оборот event loop, подписываются одной задачей
+    пула; workers=0 — подпись сразу в event loop. HMAC коротких данных не отпускает
+    GIL, поэтому пул не ускоряет подпись, а только дробит работу между оборотами loop.
+    """
+
+    def __init__(self, workers: int, batch: int):
+        self.batch = batch
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="token") if workers > 0 else None
+        self.pending: List[Tuple[dict, asyncio.Future]] = []
+
+    async def sign(self, data: dict) -> str:
+        claims = token_claims(data)
+        if self.executor is None:
+            return sign_token(claims)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((claims, future))
+        if len(self.pending) == 1:
+            loop.call_soon(self.flush, loop)
+        return await future
+
+    def flush(self, loop: asyncio.AbstractEventLoop):
+        pending, self.pending = self.pending, []
+        for start in range(0, len(pending), self.batch):
+            chunk = pending[start:start + self.batch]
+            signed = loop.run_in_executor(self.executor, sign_batch, [claims for claims, _ in chunk])
+            signed.add_done_callback(partial(self.deliver, chunk))
+
+    @staticmethod
+    def deliver(chunk: List[Tuple[dict, asyncio.Future]], signed: asyncio.Future):
+        error = signed.exception()
+        tokens = signed.result() if error is None else [None] * len(chunk)
+        for (_, future), token in zip(chunk, tokens):
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(token)
+            else:
+                future.set_exception(error)
+
+signer = TokenSigner(config.TOKEN_SIGN_WORKERS, config.TOKEN_SIGN_BATCH)
+
+def decode_token(token: str) -> Optional[Tuple[str, str, str, float]]:
+    """Полная проверка JWT: (имя, комната, игра, exp) или None"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
+        payload = jwt.decode(token, load_secret_key(), algorithms=[ALGORITHM])
     except JWTError:
         return None
-
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
-    """Получение текущего пользователя из токена"""
-    token = credentials.credentials
-    username = verify_token(token)
+    username = payload.get("sub")
     if username is None:
+        return None
+    return username, payload.get("room"), payload.get("game"), float(payload["exp"])
+
+def verify_token(token: str, room_id: str, game: str) -> Optional[str]:
+    """Проверка JWT токена и возврат имени пользователя.
+
+    Токен действителен только для комнаты и цикла игры (room.game), в которых был выдан:
+    в новом цикле то же имя может занять другой участник.
+    """
+    now = time.time()
+    cached = _verified.get(token)
+    if cached is not None and now < cached[3]:
+        token_cache_stats["hits"] += 1
+        _verified.move_to_end(token)
+        username, token_room, token_game, _ = cached
+        return username if token_room == room_id and token_game == game else None
+
+    token_cache_stats["misses"] += 1
+    decoded = decode_token(token)
+    if decoded is None:
+        _verified.pop(token, None)
+        return None
+    username, token_room, token_game, expires = decoded
+    _verified[token] = (username, token_room, token_game, min(expires, now + config.TOKEN_CACHE_TTL))
+    _verified.move_to_end(token)
+    if len(_verified) > config.TOKEN_CACHE_SIZE:
+        _verified.popitem(last=False)
+    return username if token_room == room_id and token_game == game else None
+
+def forget_room_tokens(room_id: str):
+    """Сброс кэша проверенных токенов комнаты (новый цикл или удаление комнаты)"""
+    for token in [token for token, cached in _verified.items() if cached[1] == room_id]:
+        del _verified[token]
+
+async def require_organizer(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Доступ только с токеном организатора (QUIZ_ADMIN_TOKEN)"""
+    if config.ADMIN_TOKEN is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Управление комнатами выключено")
+    if not hmac.compare_digest(credentials.credentials.encode(), config.ADMIN_TOKEN.encode()):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Недействительный токен",
+            detail="Недействительный токен организатора",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return username 
\ No newline at end of file
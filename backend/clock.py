@@ -0,0 +1,71 @@
+import time
+from typing import Optional
+from . import config
+
+# Игровое время: дедлайны стадий, время получения ответов, таймеры комнат.
+# Все модули читают его через clock.now(), поэтому игру можно ускорить
+# или вести вручную (тесты и бенчмарки проходят цикл за миллисекунды).
+
+class Clock:
+    # Игровых секунд в одной реальной (0 — время идет только вручную)
+    speed = 1.0
+
+    def now(self) -> float:
+        raise NotImplementedError
+
+    def real_delay(self, delay: float) -> Optional[float]:
+        """Сколько реальных секунд ждать delay игровых; None — ждать, пока время не переведут"""
+        return delay / self.speed
+
+class RealClock(Clock):
+    """Обычное время: time.monotonic()"""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+class ScaledClock(Clock):
+    """Ускоренное время. Считается от time.monotonic(), поэтому совпадает у всех воркеров хоста"""
+
+    def __init__(self, speed: float):
+        self.speed = speed
+
+    def now(self) -> float:
+        return time.monotonic() * self.speed
+
+class ManualClock(Clock):
+    """Время стоит, пока его не переведут (scheduler.advance)"""
+    speed = 0.0
+
+    def __init__(self, start: float = 0.0):
+        self.current = start
+
+    def now(self) -> float:
+        return self.current
+
+    def real_delay(self, delay: float) -> Optional[float]:
+        return None
+
+    def set(self, value: float):
+        self.current = max(self.current, value)
+
+def create_clock() -> Clock:
+    if config.CLOCK == "manual":
+        return ManualClock()
+    if config.CLOCK != "real":
+        raise ValueError(f"Unknown QUIZ_CLOCK: {config.CLOCK}")
+    if config.CLOCK_SPEED != 1:
+        return ScaledClock(config.CLOCK_SPEED)
+    return RealClock()
+
+_clock = create_clock()
+
+def now() -> float:
+    return _clock.now()
+
+def current() -> Clock:
+    return _clock
+
+def use(clock: Clock):
+    """Подмена часов (до запуска игры: дедлайны, выставленные по старым часам, не пересчитываются)"""
+    global _clock
+    _clock = clock
@@ -0,0 +1,54 @@
+import json
+from typing import Callable, Dict, List
+
+try:
+    import orjson
+except ImportError:
+    # orjson необязателен: без него кадры кодирует стандартный json
+    orjson = None
+
+# Кодирование кадров /ws/room. Кадр рассылки кодируется один раз на каждую
+# кодировку и отправляется всем клиентам с этой кодировкой.
+
+def dumps_stdlib(data) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+def dumps_orjson(data) -> str:
+    return orjson.dumps(data).decode()
+
+dumps: Callable[[object], str] = dumps_orjson if orjson is not None else dumps_stdlib
+
+# Компактная кодировка: короткие ключи верхнего уровня и однобуквенные типы кадров.
+# Вложенные объекты (вопрос, итог, таблица) не меняются. Клиент разворачивает
+# кадр обратно по тем же таблицам (frontend/src/roomEvents.js).
+COMPACT_KEYS = {
+    "type": "t", "stage": "s", "timer": "r", "current_question": "q", "question_count": "n",
+    "users": "u", "offset": "o", "seq": "i", "stream": "m", "question": "x", "summary": "y",
+    "leaders": "l", "missed": "k", "id": "d", "error": "e", "detail": "w", "user": "a",
+    "result": "z", "received": "c", "remaining_ms": "b", "correct": "g", "points": "p", "score": "h",
+    "frames": "f",
+}
+COMPACT_TYPES = {
+    "snapshot": "S", "stage": "G", "timer": "T", "user_joined": "J", "resumed": "R",
+    "result": "U", "auth": "A", "ack": "K", "error": "E",
+}
+ENCODINGS = ("json", "compact")
+
+def compact(data: dict) -> dict:
+    frame = {COMPACT_KEYS.get(key, key): value for key, value in data.items()}
+    if "t" in frame:
+        frame["t"] = COMPACT_TYPES.get(frame["t"], frame["t"])
+    return frame
+
+def encode(data: dict, encoding: str = "json") -> str:
+    return dumps(compact(data) if encoding == "compact" else data)
+
+def encode_with_frames(data: dict, frames: List[str], encoding: str = "json") -> str:
+    """Кадр со списком frames из уже закодированных кадров (в той же кодировке) — без их
+    повторного разбора и кодирования"""
+    key = COMPACT_KEYS["frames"] if encoding == "compact" else "frames"
+    return f'{encode(data, encoding)[:-1]},"{key}":[{",".join(frames)}]}}'
+
+def encode_all(data: dict) -> Dict[str, str]:
+    """Кадр во всех кодировках: для рассылки и журнала кадров"""
+    return {encoding: encode(data, encoding) for encoding in ENCODINGS}
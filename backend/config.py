@@ -0,0 +1,113 @@
+import ipaddress
+import os
+
+# Настройки читаются из переменных окружения, значения по умолчанию — для одного процесса
+
+# Комната, которая обслуживается по путям /api/room и /ws/room
+DEFAULT_ROOM_ID = "main"
+
+# Хранилище общего состояния: memory (один воркер) или sqlite (несколько воркеров uvicorn)
+STATE_BACKEND = os.environ.get("QUIZ_STATE_BACKEND", "memory")
+STATE_DB_PATH = os.environ.get("QUIZ_STATE_DB", os.path.join(os.path.dirname(__file__), "../quiz_state.db"))
+# Сколько ждать блокировку базы состояния (секунды). Долгие ожидания не нужны: записи
+# регистраций и ответов идут пачками в отдельном потоке и держат блокировку миллисекунды
+STATE_DB_TIMEOUT = float(os.environ.get("QUIZ_STATE_DB_TIMEOUT", "1"))
+
+# Общий ключ подписи JWT; если не задан, sqlite-хранилище создает его один раз для всех воркеров,
+# а хранилище в памяти — в файле SECRET_FILE, чтобы токены переживали перезапуск
+SECRET_KEY = os.environ.get("QUIZ_SECRET_KEY")
+SECRET_FILE = os.environ.get("QUIZ_SECRET_FILE", os.path.join(os.path.dirname(__file__), "../quiz_secret.key"))
+
+# Как часто воркер забирает события других воркеров и продлевает лидерство (секунды)
+SYNC_INTERVAL = float(os.environ.get("QUIZ_SYNC_INTERVAL", "0.05"))
+LEADER_LEASE = float(os.environ.get("QUIZ_LEADER_LEASE", "3"))
+
+# Максимум участников в одной комнате
+MAX_USERS = int(os.environ.get("QUIZ_MAX_USERS", "100"))
+
+# Токен организатора для создания и удаления комнат (Authorization: Bearer <токен>);
+# без него управление комнатами выключено. Каждая комната — работа на каждом тике, поэтому их число ограничено
+ADMIN_TOKEN = os.environ.get("QUIZ_ADMIN_TOKEN") or None
+MAX_ROOMS = int(os.environ.get("QUIZ_MAX_ROOMS", "20"))
+
+# Адрес, который зашивается в QR-код для входа, и допустимые размеры модуля QR (пиксели)
+PUBLIC_URL = os.environ.get("QUIZ_PUBLIC_URL", "https://v386879.hosted-by-vdsina.com/")
+QR_BOX_SIZES = tuple(int(size) for size in os.environ.get("QUIZ_QR_BOX_SIZES", "5,10,20").split(","))
+
+# Кэш уже проверенных JWT: сколько токенов держать и сколько секунд доверять проверке
+TOKEN_CACHE_SIZE = int(os.environ.get("QUIZ_TOKEN_CACHE_SIZE", "20000"))
+TOKEN_CACHE_TTL = float(os.environ.get("QUIZ_TOKEN_CACHE_TTL", "600"))
+
+# Банк вопросов: .json, .jsonl, .csv или SQLite (.db/.sqlite с таблицей questions)
+QUESTIONS_PATH = os.environ.get("QUIZ_QUESTIONS", os.path.join(os.path.dirname(__file__), "questions.json"))
+QUESTIONS_PER_GAME = int(os.environ.get("QUIZ_QUESTIONS_PER_GAME", "5"))
+# Фильтры выборки для игры (пусто — любые темы и сложности)
+QUESTIONS_THEME = os.environ.get("QUIZ_QUESTIONS_THEME") or None
+QUESTIONS_DIFFICULTY = int(os.environ["QUIZ_QUESTIONS_DIFFICULTY"]) if os.environ.get("QUIZ_QUESTIONS_DIFFICULTY") else None
+# Как часто проверять, не изменился ли файл банка (секунды)
+QUESTIONS_RELOAD_INTERVAL = float(os.environ.get("QUIZ_QUESTIONS_RELOAD", "5"))
+
+# Журнал игр (регистрации, ответы, баллы, итоги): SQLite или .jsonl; пустая строка — выключен
+JOURNAL_PATH = os.environ.get("QUIZ_JOURNAL", os.path.join(os.path.dirname(__file__), "../quiz_journal.db"))
+# Максимум записей, ожидающих сброса; сверх него записи отбрасываются
+JOURNAL_BUFFER = int(os.environ.get("QUIZ_JOURNAL_BUFFER", "100000"))
+# Записей в одной пачке и максимальный интервал между сбросами (секунды)
+JOURNAL_BATCH = int(os.environ.get("QUIZ_JOURNAL_BATCH", "1000"))
+JOURNAL_FLUSH_INTERVAL = float(os.environ.get("QUIZ_JOURNAL_FLUSH", "1"))
+
+# Снимок комнат для продолжения игры после перезапуска (только хранилище в памяти;
+# sqlite-хранилище само восстанавливается из событий). Пустая строка — выключен
+SNAPSHOT_PATH = os.environ.get("QUIZ_SNAPSHOT", os.path.join(os.path.dirname(__file__), "../quiz_snapshot.json"))
+SNAPSHOT_INTERVAL = float(os.environ.get("QUIZ_SNAPSHOT_INTERVAL", "1"))
+# Снимок старше этого (секунды простоя) не восстанавливается: вместо давно прерванной игры — новая регистрация
+SNAPSHOT_MAX_AGE = float(os.environ.get("QUIZ_SNAPSHOT_MAX_AGE", "300"))
+
+# Часы игры: real — обычное время (QUIZ_CLOCK_SPEED ускоряет его во столько раз),
+# manual — время идет только вручную (scheduler.advance), для тестов и симуляций
+CLOCK = os.environ.get("QUIZ_CLOCK", "real")
+CLOCK_SPEED = float(os.environ.get("QUIZ_CLOCK_SPEED", "1"))
+
+# Ограничение частоты запросов: QUIZ_RATE_LIMIT=0 выключает.
+# Лимит — "запросов в секунду/подряд"; пустое значение снимает этот лимит.
+# Лимиты по IP щедрые: участники в одном зале часто выходят через один адрес, и волна
+# регистраций (2000 за 5 секунд) с одного адреса должна проходить целиком.
+# Поэтому регистрацию дополнительно ограничивает ключ клиента (заголовок X-Client-Id, его
+# хранит страница регистрации): один браузер в общем зале не выберет лимит всего адреса.
+# Ответы через /ws/room (основной путь) не ограничиваются: на вопрос принимается один ответ
+RATE_LIMIT = os.environ.get("QUIZ_RATE_LIMIT", "1") != "0"
+
+def parse_limit(value: str):
+    if not value:
+        return None
+    rate, burst = value.split("/")
+    return float(rate), float(burst)
+
+RATE_LIMITS = {
+    key: limit for key, limit in {
+        ("register", "ip"): parse_limit(os.environ.get("QUIZ_LIMIT_REGISTER_IP", "500/2500")),
+        ("register", "client"): parse_limit(os.environ.get("QUIZ_LIMIT_REGISTER_CLIENT", "1/5")),
+        ("answer", "ip"): parse_limit(os.environ.get("QUIZ_LIMIT_ANSWER_IP", "1000/5000")),
+        ("answer", "user"): parse_limit(os.environ.get("QUIZ_LIMIT_ANSWER_USER", "2/5")),
+    }.items() if limit is not None
+}
+# Сколько ключей держать в каждой таблице корзин
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("QUIZ_RATE_LIMIT_KEYS", "100000"))
+# Адреса или подсети прокси (nginx), которым доверяем заголовок X-Real-IP. В Docker запросы
+# nginx с хоста приходят с адреса шлюза bridge-сети (172.16.0.0/12 по умолчанию)
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(value.strip(), strict=False)
+    for value in os.environ.get("QUIZ_TRUSTED_PROXIES", "127.0.0.1,::1,172.16.0.0/12").split(",") if value.strip()
+]
+
+# Собранный фронтенд (отдается из памяти) и как часто проверять, не пересобран ли он (секунды; 0 — не проверять)
+FRONTEND_DIST = os.environ.get("QUIZ_FRONTEND_DIST", os.path.join(os.path.dirname(__file__), "../frontend_dist"))
+STATIC_RELOAD_INTERVAL = float(os.environ.get("QUIZ_STATIC_RELOAD", "0"))
+
+# Сколько последних кадров комнаты помнит каждый воркер: клиент, переподключившийся
+# с номером последнего кадра, получает только пропущенные (иначе — полный снимок)
+WS_HISTORY = int(os.environ.get("QUIZ_WS_HISTORY", "512"))
+
+# Подпись токенов при регистрации: потоков пула (0 — прямо в event loop) и токенов в одной задаче пула.
+# Подпись стоит ~10 мкс, на одном ядре пул только добавляет переключения потоков
+TOKEN_SIGN_WORKERS = int(os.environ.get("QUIZ_TOKEN_SIGN_WORKERS", "0"))
+TOKEN_SIGN_BATCH = int(os.environ.get("QUIZ_TOKEN_SIGN_BATCH", "64"))
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+from . import config, metrics
+
+logger = logging.getLogger(__name__)
+
+# Запись журнала: (время, игра, комната, вид, данные)
+Record = Tuple[float, str, str, str, dict]
+
+class JournalSink:
+    """Куда журнал сбрасывает записи; вызывается только из отдельного потока"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, batch: List[Record]):
+        raise NotImplementedError
+
+    def records(self, game: Optional[str] = None) -> List[Record]:
+        """Все записи (или записи одной игры) в порядке появления"""
+        raise NotImplementedError
+
+    def games(self, room: Optional[str], limit: int) -> List[dict]:
+        """Последние игры: сначала новые"""
+        return list_games(self.records(), room, limit)
+
+    def game(self, game: str) -> Optional[dict]:
+        return summarize_game(game, self.records(game))
+
+class SQLiteJournal(JournalSink):
+    """Журнал в таблице SQLite; пачка записей — одна транзакция"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.db = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS journal (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, game TEXT, room TEXT, kind TEXT, payload TEXT
+            );
+            CREATE INDEX IF NOT EXISTS journal_game ON journal (game, id);
+        """)
+
+    def write(self, batch: List[Record]):
+        rows = [(ts, game, room, kind, json.dumps(data, ensure_ascii=False)) for ts, game, room, kind, data in batch]
+        with self.lock, self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany("INSERT INTO journal (ts, game, room, kind, payload) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def records(self, game: Optional[str] = None) -> List[Record]:
+        with self.lock:
+            if game is None:
+                rows = self.db.execute("SELECT ts, game, room, kind, payload FROM journal ORDER BY id").fetchall()
+            else:
+                rows = self.db.execute(
+                    "SELECT ts, game, room, kind, payload FROM journal WHERE game = ? ORDER BY id", (game,)
+                ).fetchall()
+        return [(ts, game, room, kind, json.loads(payload)) for ts, game, room, kind, payload in rows]
+
+    def games(self, room: Optional[str], limit: int) -> List[dict]:
+        # Список игр считается в базе, без чтения всех записей
+        with self.lock:
+            rows = self.db.execute("""
+                SELECT game, room, MIN(ts), MAX(ts), SUM(kind = 'user_joined'), MAX(kind = 'standings')
+                FROM journal WHERE ? IS NULL OR room = ?
+                GROUP BY game ORDER BY MIN(id) DESC LIMIT ?
+            """, (room, room, limit)).fetchall()
+        return [
+            {"game": game, "room": room_id, "started": started, "updated": updated,
+             "players": players, "finished": bool(finished)}
+            for game, room_id, started, updated, players, finished in rows
+        ]
+
+class JSONLJournal(JournalSink):
+    """Журнал в файле JSON Lines: одна запись — одна строка, файл только дописывается"""
+
+    def write(self, batch: List[Record]):
+        lines = "".join(
+            json.dumps({"ts": ts, "game": game, "room": room, "kind": kind, "data": data}, ensure_ascii=False) + "\n"
+            for ts, game, room, kind, data in batch
+        )
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def records(self, game: Optional[str] = None) -> List[Record]:
+        if not os.path.exists(self.path):
+            return []
+        with self.lock, open(self.path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        return [
+            (e["ts"], e["game"], e["room"], e["kind"], e["data"])
+            for e in entries if game is None or e["game"] == game
+        ]
+
+def list_games(records: List[Record], room: Optional[str], limit: int) -> List[dict]:
+    games = {}
+    for ts, game, room_id, kind, _ in records:
+        if room is not None and room_id != room:
+            continue
+        info = games.setdefault(game, {
+            "game": game, "room": room_id, "started": ts, "updated": ts, "players": 0, "finished": False,
+        })
+        info["updated"] = ts
+        info["players"] += kind == "user_joined"
+        info["finished"] |= kind == "standings"
+    return list(reversed(list(games.values())))[:limit]
+
+def summarize_game(game: str, records: List[Record]) -> Optional[dict]:
+    """Итог прошедшей игры из ее записей журнала"""
+    if not records:
+        return None
+    summary = {
+        "game": game,
+        "room": records[0][2],
+        "started": records[0][0],
+        "players": [],
+        "questions": [],
+        "standings": None,
+    }
+    answers = {}
+    for ts, _, _, kind, data in records:
+        if kind == "user_joined":
+            summary["players"].append(data["name"])
+        elif kind == "answer":
+            answers[data["question"]] = answers.get(data["question"], 0) + 1
+        elif kind == "scores":
+            summary["questions"].append({
+                "question": data["question"],
+                "text": data["text"],
+                "correct_index": data["correct_index"],
+                "answers": answers.get(data["question"], 0),
+                "correct": len(data["points"]),
+            })
+        elif kind == "standings":
+            summary["standings"] = data["standings"]
+            summary["finished"] = ts
+    return summary
+
+def create_sink() -> Optional[JournalSink]:
+    path = config.JOURNAL_PATH
+    if not path:
+        return None
+    logger.info(f"📓 Game journal: {path}")
+    if path.endswith(".jsonl"):
+        return JSONLJournal(path)
+    return SQLiteJournal(path)
+
+# Файл журнала открывается при старте приложения (start_journal), а не при импорте
+sink: Optional[JournalSink] = None
+
+# Очередь записей, еще не сброшенных на диск; событийный цикл только дописывает в нее
+queue: deque = deque()
+stats = {
+    "queued": 0,
+    "written": 0,
+    "dropped": 0,
+    "batches": 0,
+    "errors": 0,
+    "last_flush_ms": 0.0,
+    "max_flush_ms": 0.0,
+}
+metrics.Counter("quiz_journal_records_total", "Записи журнала игр", ("state",), source=lambda: {
+    (state,): stats[state] for state in ("queued", "written", "dropped")
+})
+metrics.Gauge("quiz_journal_pending", "Записи журнала, ожидающие сброса", source=lambda: len(queue))
+flush_seconds = metrics.Histogram("quiz_journal_flush_seconds", "Сброс одной пачки журнала")
+_wakeup: Optional[asyncio.Event] = None
+FLUSH_TASK = None
+
+def record(room, kind: str, **data):
+    """Добавляет запись в очередь; на диск она попадет фоновым сбросом"""
+    if sink is None and not config.JOURNAL_PATH:
+        return
+    if len(queue) >= config.JOURNAL_BUFFER:
+        # Диск не успевает: теряем запись журнала, но не задерживаем игру
+        stats["dropped"] += 1
+        return
+    queue.append((time.time(), room.game, room.id, kind, data))
+    stats["queued"] += 1
+    if len(queue) >= config.JOURNAL_BATCH and _wakeup is not None:
+        _wakeup.set()
+
+async def flush():
+    """Сбрасывает накопленные записи пачками в отдельном потоке"""
+    while queue:
+        batch = [queue.popleft() for _ in range(min(len(queue), config.JOURNAL_BATCH))]
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(sink.write, batch)
+        except Exception:
+            # Пачка возвращается в начало очереди и уйдет при следующем сбросе
+            queue.extendleft(reversed(batch))
+            stats["errors"] += 1
+            logger.exception("❌ Journal flush failed")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        stats["written"] += len(batch)
+        stats["batches"] += 1
+        flush_seconds.observe(elapsed / 1000)
+        stats["last_flush_ms"] = round(elapsed, 3)
+        stats["max_flush_ms"] = max(stats["max_flush_ms"], stats["last_flush_ms"])
+
+async def flush_loop():
+    while True:
+        _wakeup.clear()
+        try:
+            await asyncio.wait_for(_wakeup.wait(), config.JOURNAL_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        await flush()
+
+def start_journal():
+    global FLUSH_TASK, _wakeup, sink
+    if sink is None:
+        sink = create_sink()
+    if sink is None or (FLUSH_TASK and not FLUSH_TASK.done()):
+        return
+    _wakeup = asyncio.Event()
+    FLUSH_TASK = asyncio.create_task(flush_loop())
+
+async def stop_journal():
+    """Остановка с записью всего, что осталось в очереди"""
+    if FLUSH_TASK is not None:
+        FLUSH_TASK.cancel()
+    if sink is not None:
+        await flush()
+
+def status() -> dict:
+    return {**stats, "pending": len(queue), "enabled": sink is not None}
@@ -0,0 +1,147 @@
+import ipaddress
+import json
+import math
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from . import config, metrics
+
+# Ограничение частоты /register и /answer. Проверка идет в ASGI-middleware до
+# разбора тела, проверки JWT и зависимостей FastAPI, поэтому отказ почти ничего не стоит.
+# Сообщения answer в /ws/room сюда не попадают и не ограничиваются: лишние ответы
+# отклоняются проверкой «уже отвечал» без записи.
+
+class TokenBucket:
+    """Корзины токенов по ключам: rate в секунду, не больше burst подряд"""
+
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # Ключ → [токены, время последнего пополнения]
+        self.buckets: Dict[str, List[float]] = {}
+
+    def allow(self, key: str, now: float) -> bool:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_keys:
+                self.evict(now)
+            self.buckets[key] = [self.burst - 1, now]
+            return True
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+    def retry_after(self, key: str) -> float:
+        bucket = self.buckets.get(key)
+        return 0.0 if bucket is None else max(0.0, (1 - bucket[0]) / self.rate)
+
+    def evict(self, now: float):
+        """Убирает полностью пополнившиеся корзины: они не отличаются от новых.
+        Если таких мало, отбрасывает старшую половину по порядку появления."""
+        idle = self.burst / self.rate
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if now - bucket[1] < idle}
+        if len(self.buckets) >= self.max_keys:
+            keys = list(self.buckets)
+            for key in keys[:len(keys) // 2]:
+                del self.buckets[key]
+
+def create_buckets() -> Dict[Tuple[str, str], TokenBucket]:
+    """(маршрут, по чему считаем) → корзины"""
+    return {
+        (route, scope): TokenBucket(rate, burst, config.RATE_LIMIT_MAX_KEYS)
+        for (route, scope), (rate, burst) in config.RATE_LIMITS.items()
+    }
+
+buckets = create_buckets()
+rejected = metrics.Counter(
+    "quiz_rate_limited_total", "Запросы, отклоненные ограничением частоты", ("route", "key"),
+)
+LIMITED_ROUTES = {"/register": "register", "/answer": "answer"}
+
+@lru_cache(maxsize=4096)
+def trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in config.TRUSTED_PROXIES)
+
+def client_ip(scope) -> str:
+    """Адрес клиента; за nginx — из X-Real-IP"""
+    client = scope.get("client")
+    host = client[0] if client else ""
+    if trusted_proxy(host):
+        for name, value in scope["headers"]:
+            if name == b"x-real-ip":
+                return value.decode("latin-1")
+    return host
+
+def bearer_token(scope) -> Optional[str]:
+    """Токен из Authorization без проверки: у каждого участника он свой, поэтому годится как ключ пользователя"""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            value = value.decode("latin-1")
+            return value[7:] if value[:7].lower() == "bearer " else None
+    return None
+
+def client_id(scope) -> Optional[str]:
+    """Ключ браузера из X-Client-Id; без заголовка действуют только лимиты по IP"""
+    for name, value in scope["headers"]:
+        if name == b"x-client-id":
+            return value[:64].decode("latin-1") or None
+    return None
+
+def check(route: str, scope) -> Optional[Tuple[str, float]]:
+    """None — пропустить; иначе (по чему отказано, через сколько секунд повторить).
+    Узкие ключи проверяются раньше адреса: отклоненные повторы одного клиента не тратят
+    общую корзину зала за этим адресом"""
+    now = time.monotonic()
+    for key_scope, key in (("client", client_id), ("user", bearer_token), ("ip", client_ip)):
+        bucket = buckets.get((route, key_scope))
+        if bucket is None:
+            continue
+        value = key(scope)
+        if value is not None and not bucket.allow(value, now):
+            return key_scope, bucket.retry_after(value)
+    return None
+
+class RateLimitMiddleware:
+    """ASGI-middleware: 429 с Retry-After для слишком частых /register и /answer"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") != "POST" or not config.RATE_LIMIT:
+            return await self.app(scope, receive, send)
+        route = LIMITED_ROUTES.get(scope["path"][scope["path"].rfind("/"):])
+        if route is None:
+            return await self.app(scope, receive, send)
+        limited = check(route, scope)
+        if limited is None:
+            return await self.app(scope, receive, send)
+        key_scope, retry = limited
+        rejected.inc(route, key_scope)
+        body = json.dumps({"detail": "Слишком много запросов, повторите позже"}, ensure_ascii=False).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+def status() -> dict:
+    return {
+        "enabled": config.RATE_LIMIT,
+        "keys": {f"{route}:{scope}": len(bucket.buckets) for (route, scope), bucket in buckets.items()},
+        "rejected": {f"{route}:{scope}": count for (route, scope), count in rejected.values.items()},
+    }
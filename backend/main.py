@@ -1,14 +1,23 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from .api import router
-from .ws import ws_router
-from .timer import start_registration, start_new_cycle
-import os
+from .api import router, rooms_router
+from .ws import ws_router, start_broadcaster
+from .metrics import metrics_router, LatencyMiddleware
+from .limiter import RateLimitMiddleware
+from .timer import start_engine
+from .qr import prerender as prerender_qr
+from .questions import watch as watch_questions
+from .journal import start_journal, stop_journal
+from .auth import load_secret_key
+from . import config, snapshot, static
+import asyncio
 
 app = FastAPI()
 
+# Ограничение частоты /register и /answer: внутри CORS, чтобы браузер видел ответ 429,
+# но до маршрутизации, разбора тела и проверки токена
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -16,23 +25,32 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Время запросов регистрации и ответа для /metrics (снаружи, вместе с CORS)
+app.add_middleware(LatencyMiddleware)
 
-# Сначала монтируем статические файлы
-FRONTEND_DIST = os.path.join(os.path.dirname(__file__), '../frontend_dist')
-if os.path.exists(FRONTEND_DIST):
-    app.mount("/assets", StaticFiles(directory=os.path.join(FRONTEND_DIST, "assets")), name="assets")
-
-# Затем API роутеры
-app.include_router(router, prefix="/api")
+# API роутеры
+app.include_router(rooms_router, prefix="/api")
+app.include_router(router, prefix="/api/room")
+app.include_router(router, prefix="/api/rooms/{room_id}")
 app.include_router(ws_router)
+app.include_router(metrics_router)
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Главная страница"""
-    if os.path.exists(FRONTEND_DIST):
-        return FileResponse(os.path.join(FRONTEND_DIST, "index.html"))
+    index = static.bundle.index
+    if index is not None:
+        return index.response(request)
     return {"status": "ok"}
 
+@app.get("/assets/{path:path}")
+async def assets(path: str, request: Request):
+    """Файлы сборки из памяти: хэшированные имена кэшируются браузером навсегда"""
+    file = static.bundle.get(f"assets/{path}")
+    if file is None:
+        return Response(status_code=404)
+    return file.response(request)
+
 @app.get("/{full_path:path}")
 async def catch_all(full_path: str, request: Request):
     """Fallback для SPA - все остальные пути возвращают index.html"""
@@ -40,13 +58,36 @@ async def catch_all(full_path: str, request: Request):
         # API и WebSocket пути обрабатываются отдельно
         return {"error": "Not found"}
     
-    if os.path.exists(FRONTEND_DIST):
-        return FileResponse(os.path.join(FRONTEND_DIST, "index.html"))
+    # Файлы из корня сборки (favicon и т.п.), остальное — index.html для роутера SPA
+    file = static.bundle.get(full_path) or static.bundle.index
+    if file is not None:
+        return file.response(request)
     return {"error": "Frontend not found"}
 
 @app.on_event("startup")
 async def startup_event():
     """Автоматический запуск викторины при старте приложения"""
     print("🎯 Запуск AI Quiz Platform...")
-    start_registration()
-    print("✅ Викторина запущена в режиме регистрации") 
\ No newline at end of file
+    load_secret_key()
+    # Игра, шедшая до перезапуска, продолжается с оставшимся временем стадии
+    if snapshot.enabled():
+        snapshot.restore(config.SNAPSHOT_PATH)
+    start_engine()
+    snapshot.start_snapshots()
+    start_broadcaster()
+    start_journal()
+    # QR-коды рендерятся в фоне, старт не ждет
+    asyncio.create_task(prerender_qr())
+    # Правки файла банка вопросов подхватываются без перезапуска
+    asyncio.create_task(watch_questions())
+    if config.STATIC_RELOAD_INTERVAL > 0:
+        # Пересобранный фронтенд подхватывается без перезапуска
+        asyncio.create_task(static.watch())
+    print("✅ Викторина запущена в режиме регистрации")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Дописываем в журнал все, что еще в очереди, и сохраняем последний снимок
+    await stop_journal()
+    if snapshot.enabled():
+        snapshot.write(snapshot.dump(), config.SNAPSHOT_PATH)
@@ -0,0 +1,152 @@
+import bisect
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+# Метрики в текстовом формате Prometheus без внешних зависимостей.
+# Все обновления — обычные операции над числами в потоке событийного цикла, без блокировок.
+
+metrics_router = APIRouter()
+registry: List["Metric"] = []
+
+# Границы по умолчанию (секунды): от 100 мкс до 10 с
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def escape_label(value) -> str:
+    """Значение метки по текстовому формату Prometheus: экранируются \\, " и перевод строки"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        registry.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()])
+
+class Counter(Metric):
+    """Монотонный счетчик; значение можно брать из функции (счетчики, которые уже ведет модуль)"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), source: Optional[Callable] = None):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.source = source
+
+    def inc(self, *labels: str, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        values = self.source() if self.source else self.values
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{format_labels(self.label_names, key)} {value}" for key, value in values.items()]
+
+class Gauge(Counter):
+    """Текущее значение; обычно вычисляется функцией в момент запроса /metrics"""
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str):
+        self.values[labels] = value
+
+class Histogram(Metric):
+    """Гистограмма с фиксированными границами: наблюдение — bisect и два сложения"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        # По набору меток: [счетчики корзин..., +Inf], сумма
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def time(self, *labels: str) -> "Timer":
+        return Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+class Timer:
+    """with histogram.time(): ... — длительность блока в секундах"""
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+# Метрики горячего пути; остальные модули регистрируют свои рядом с кодом, который их ведет
+http_latency = Histogram("quiz_http_request_seconds", "Время обработки запросов регистрации и ответа", ("route",))
+answers_total = Counter("quiz_answers_total", "Принятые ответы по способу доставки", ("transport",))
+question_answers = Histogram(
+    "quiz_question_answers", "Ответов на один вопрос к его закрытию",
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+scoring_seconds = Histogram("quiz_scoring_seconds", "Подсчет баллов при закрытии вопроса")
+stage_drift = Histogram(
+    "quiz_stage_drift_seconds", "Опоздание перехода стадии относительно дедлайна", ("step",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+# Пути, время которых меряет middleware: окончание пути → метка route
+TIMED_ROUTES = {"/register": "register", "/answer": "answer"}
+
+class LatencyMiddleware:
+    """ASGI-middleware: время запросов /register и /answer любой комнаты"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") != "POST":
+            return await self.app(scope, receive, send)
+        route = TIMED_ROUTES.get(scope["path"][scope["path"].rfind("/"):])
+        if route is None:
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            http_latency.observe(time.perf_counter() - start, route)
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+@metrics_router.get("/metrics")
+async def metrics():
+    return Response(render(), media_type="text/plain; version=0.0.4")
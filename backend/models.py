@@ -1,5 +1,13 @@
 from typing import List, Dict, Optional
 from pydantic import BaseModel
+from array import array
+import itertools
+import math
+import secrets
+from . import clock
+import numpy as np
+
+# Pydantic-модели — для ответов API
 
 class User(BaseModel):
     name: str
@@ -14,10 +22,201 @@ class Question(BaseModel):
     correct_index: int
     theme: str
 
-class Room(BaseModel):
-    stage: str  # registration, preparation, quiz, results
-    timer: int
-    users: Dict[str, User]
-    questions: List[Question]
-    current_question: int = 0
-    answers: Dict[str, int] = {} 
\ No newline at end of file
+# Состояние в памяти: компактные структуры без pydantic на горячем пути
+
+def fold_name(name: str) -> str:
+    """Имя для проверки занятости: без учета регистра и лишних пробелов"""
+    return " ".join(name.split()).casefold()
+
+class Participants:
+    """Участники комнаты в колонках, индексированных номером участника.
+
+    Вместо объекта на каждого участника — список имен, словарь имя → индекс
+    и массивы чисел; при 10k участников это в разы меньше памяти. folded —
+    те же индексы по fold_name: «Иван» и « иван » — одно имя.
+    """
+    __slots__ = ("names", "index", "folded", "score", "last_score", "last_correct")
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.folded: Dict[str, int] = {}
+        self.score = array('q')
+        self.last_score = array('q')
+        self.last_correct = array('b')  # -1 — еще не было вопросов, 0/1 — результат последнего
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name: str):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def add(self, name: str) -> int:
+        idx = len(self.names)
+        self.names.append(name)
+        self.index[name] = idx
+        self.folded.setdefault(fold_name(name), idx)
+        self.score.append(0)
+        self.last_score.append(0)
+        self.last_correct.append(-1)
+        return idx
+
+    def get(self, name: str) -> Optional[int]:
+        return self.index.get(name)
+
+    def taken(self, name: str) -> bool:
+        return fold_name(name) in self.folded
+
+    def public(self, idx: int) -> User:
+        """Pydantic-представление участника для ответа API"""
+        last_correct = self.last_correct[idx]
+        return User(
+            name=self.names[idx],
+            score=self.score[idx],
+            last_answer_correct=None if last_correct < 0 else bool(last_correct),
+            last_score=self.last_score[idx],
+        )
+
+class AnswerLog:
+    """Ответы на текущий вопрос в предвыделенных массивах.
+
+    Запись — три колонки (индекс участника, вариант, время получения) и флаг
+    answered по индексу участника; подсчет идет одним векторным проходом.
+    votes — сколько ответов у каждого варианта, растет вместе с записью.
+    """
+    __slots__ = ("user", "option", "received", "answered", "count", "votes")
+
+    def __init__(self, capacity: int = 0):
+        self.user = np.empty(capacity, dtype=np.int32)
+        self.option = np.empty(capacity, dtype=np.int32)
+        self.received = np.empty(capacity, dtype=np.float64)
+        self.answered = np.zeros(capacity, dtype=bool)
+        self.count = 0
+        self.votes: List[int] = []
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, idx: int):
+        return idx < len(self.answered) and bool(self.answered[idx])
+
+    def reset(self, capacity: int):
+        """Новый вопрос: массивы переиспользуются, если их хватает на всех участников"""
+        if capacity > len(self.user):
+            self.__init__(capacity)
+        else:
+            self.answered[:] = False
+            self.count = 0
+            self.votes = []
+
+    def _grow(self, capacity: int):
+        for name in ("user", "option", "received"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+        answered = np.zeros(capacity, dtype=bool)
+        answered[:len(self.answered)] = self.answered
+        self.answered = answered
+
+    def add(self, idx: int, option: int, received: float):
+        # Участники добавляются только до вопроса, но запас не помешает
+        if self.count == len(self.user) or idx >= len(self.answered):
+            self._grow(max(16, 2 * len(self.user), idx + 1))
+        pos = self.count
+        self.user[pos] = idx
+        self.option[pos] = option
+        self.received[pos] = received
+        self.answered[idx] = True
+        self.count = pos + 1
+        if option >= len(self.votes):
+            self.votes.extend([0] * (option + 1 - len(self.votes)))
+        self.votes[option] += 1
+
+class Leaderboard:
+    """Порядок участников по убыванию баллов, обновляется при закрытии вопроса.
+
+    order — индексы участников в порядке мест (при равных баллах раньше тот,
+    кто раньше зарегистрировался), rank — место каждого участника. Топ-K — срез
+    order, место и соседи участника — обращение к rank без сортировки.
+    """
+    __slots__ = ("order", "rank")
+
+    def __init__(self):
+        self.order = np.empty(0, dtype=np.int32)
+        self.rank = np.empty(0, dtype=np.int32)
+
+    def sync(self, size: int):
+        """Новые участники (с нулем баллов) встают в конец — после всех, кто уже в таблице"""
+        known = len(self.order)
+        if size > known:
+            added = np.arange(known, size, dtype=np.int32)
+            self.order = np.concatenate([self.order, added])
+            self.rank = np.concatenate([self.rank, added])
+
+    def update(self, score: np.ndarray, changed: np.ndarray):
+        """Переставляет только участников, чьи баллы изменились, слиянием с остальными.
+
+        O(n + k log k) вместо полной сортировки при k изменившихся из n.
+        """
+        size = len(score)
+        self.sync(size)
+        if not len(changed):
+            return
+        # Ключ сортировки: больше баллов — раньше, при равенстве — меньший индекс
+        key = -score.astype(np.int64) * size + np.arange(size)
+        moved = np.zeros(size, dtype=bool)
+        moved[changed] = True
+        rest = self.order[~moved[self.order]]
+        changed = changed[np.argsort(key[changed], kind="stable")]
+        positions = np.searchsorted(key[rest], key[changed])
+        self.order = np.insert(rest, positions, changed).astype(np.int32)
+        self.rank[self.order] = np.arange(size, dtype=np.int32)
+
+    def top(self, limit: int) -> np.ndarray:
+        return self.order[:limit]
+
+    def around(self, idx: int, radius: int) -> tuple:
+        """Место участника (с нуля) и индексы соседей по таблице"""
+        position = int(self.rank[idx])
+        return position, self.order[max(0, position - radius):position + radius + 1]
+
+def new_game_id() -> str:
+    return secrets.token_hex(8)
+
+# Версии состояния общие для всех комнат процесса: пересозданная комната не повторит старую версию
+_versions = itertools.count(1)
+
+class Room:
+    __slots__ = (
+        "id", "stage", "deadline", "users", "questions", "current_question", "answers", "leaderboard", "epoch",
+        "version", "payloads", "game", "public_questions",
+    )
+
+    def __init__(self, id: str, stage: str, deadline: float = 0.0):
+        self.id = id
+        self.stage = stage  # registration, preparation, quiz, pause, results, waiting
+        self.deadline = deadline  # clock.now() окончания текущей стадии
+        self.users = Participants()
+        self.questions: List[Question] = []
+        self.public_questions: List[dict] = []  # то, что видят участники: без правильного ответа
+        self.current_question = 0
+        self.answers = AnswerLog()  # ответы на текущий вопрос
+        self.leaderboard = Leaderboard()
+        self.epoch = 0  # растет при каждом сбросе участников
+        self.game = new_game_id()  # идентификатор текущего цикла в журнале игр
+        self.version = next(_versions)  # растет при любом изменении, которое видно в GET-ответах
+        self.payloads: Dict[str, tuple] = {}  # готовые ответы API для текущей версии
+
+    def touch(self):
+        """Новая версия состояния: готовые ответы API больше не годятся"""
+        self.version = next(_versions)
+        self.payloads = {}
+
+    @property
+    def timer(self) -> int:
+        """Оставшиеся целые секунды стадии, вычисляются из дедлайна"""
+        return max(0, math.ceil(self.deadline - clock.now()))
@@ -0,0 +1,66 @@
+import asyncio
+import hashlib
+import logging
+from io import BytesIO
+from typing import Dict, Tuple
+import qrcode
+import qrcode.image.svg
+from . import config
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+# Размер по умолчанию — 10, если он разрешен в QUIZ_QR_BOX_SIZES, иначе первый из разрешенных
+DEFAULT_BOX_SIZE = 10 if 10 in config.QR_BOX_SIZES else config.QR_BOX_SIZES[0]
+
+class RenderedQR:
+    __slots__ = ("body", "media_type", "etag")
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+# Готовые QR-коды по (url, формат, размер модуля); рендер — один раз на вариант
+cache: Dict[Tuple[str, str, int], RenderedQR] = {}
+_rendering: Dict[Tuple[str, str, int], asyncio.Future] = {}
+
+def render(url: str, fmt: str, box_size: int) -> RenderedQR:
+    """Рендер QR-кода (CPU-работа, вызывается в отдельном потоке)"""
+    if fmt == "svg":
+        img = qrcode.make(url, image_factory=qrcode.image.svg.SvgPathImage, box_size=box_size)
+    else:
+        img = qrcode.make(url, box_size=box_size)
+    buf = BytesIO()
+    if fmt == "svg":
+        img.save(buf)
+    else:
+        img.save(buf, format="PNG")
+    return RenderedQR(buf.getvalue(), FORMATS[fmt])
+
+async def get_qr(url: str, fmt: str = "png", box_size: int = DEFAULT_BOX_SIZE) -> RenderedQR:
+    key = (url, fmt, box_size)
+    rendered = cache.get(key)
+    if rendered is not None:
+        return rendered
+    # Одновременные запросы одного варианта ждут один и тот же рендер
+    future = _rendering.get(key)
+    if future is None:
+        future = asyncio.ensure_future(asyncio.to_thread(render, url, fmt, box_size))
+        _rendering[key] = future
+        try:
+            cache[key] = await future
+        finally:
+            _rendering.pop(key, None)
+        return cache[key]
+    return await future
+
+async def prerender():
+    """Заранее рендерит все варианты для настроенного адреса"""
+    for fmt in FORMATS:
+        for box_size in config.QR_BOX_SIZES:
+            await get_qr(config.PUBLIC_URL, fmt, box_size)
+    logger.info(f"🔳 QR codes prerendered for {config.PUBLIC_URL}")
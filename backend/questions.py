@@ -0,0 +1,181 @@
+import asyncio
+import bisect
+import csv
+import json
+import logging
+import os
+import random
+import sqlite3
+from array import array
+from typing import Dict, List, Optional, Tuple
+from . import config
+from .models import Question
+
+logger = logging.getLogger(__name__)
+
+# Сложность по умолчанию для вопросов без поля difficulty
+DEFAULT_DIFFICULTY = 1
+
+def parse_question(raw: dict) -> Tuple[str, List[str], int, str, int]:
+    """Проверка одной записи банка: (текст, варианты, правильный, тема, сложность)"""
+    text = str(raw["text"])
+    options = raw["options"]
+    if isinstance(options, str):
+        # В CSV варианты записаны в одной колонке через |
+        options = options.split("|")
+    options = [str(option) for option in options]
+    correct = int(raw["correct"] if "correct" in raw else raw["correct_index"])
+    if len(options) < 2 or not 0 <= correct < len(options):
+        raise ValueError(f"Невалидный вопрос: {text!r}")
+    difficulty = raw.get("difficulty")
+    difficulty = DEFAULT_DIFFICULTY if difficulty in (None, "") else int(difficulty)
+    return text, options, correct, str(raw["theme"]), difficulty
+
+def read_records(path: str):
+    """Записи банка из JSON (массив), JSON Lines или CSV с заголовком"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8", newline="") as f:
+        if ext == ".json":
+            yield from json.load(f)
+        elif ext == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif ext == ".csv":
+            yield from csv.DictReader(f)
+        else:
+            raise ValueError(f"Неизвестный формат банка вопросов: {path}")
+
+class QuestionBank:
+    """Банк вопросов с индексом по (теме, сложности).
+
+    Вопросы из файлов хранятся компактными JSON-байтами, из SQLite — остаются
+    в базе; pydantic Question создаются только для выбранных в игру вопросов.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = source_mtime(path)
+        self.db: Optional[sqlite3.Connection] = None
+        # Файлы: строки вопросов по позиции; SQLite: rowid по позиции
+        self.rows: List[bytes] = []
+        self.rowids = array("q")
+        self.index: Dict[Tuple[str, int], array] = {}
+        if is_sqlite(path):
+            self._load_sqlite()
+        else:
+            self._load_file()
+
+    def __len__(self):
+        return len(self.rows) or len(self.rowids)
+
+    def _add_to_index(self, position: int, theme: str, difficulty: int):
+        positions = self.index.get((theme, difficulty))
+        if positions is None:
+            positions = self.index[(theme, difficulty)] = array("I")
+        positions.append(position)
+
+    def _load_file(self):
+        for raw in read_records(self.path):
+            text, options, correct, theme, difficulty = parse_question(raw)
+            self._add_to_index(len(self.rows), theme, difficulty)
+            self.rows.append(json.dumps([text, options, correct, theme], ensure_ascii=False).encode())
+
+    def _load_sqlite(self):
+        # Читаются только rowid, тема и сложность; тексты берутся из базы при выборке
+        self.db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        rows = self.db.execute("SELECT rowid, theme, COALESCE(difficulty, ?) FROM questions ORDER BY rowid", (DEFAULT_DIFFICULTY,))
+        for rowid, theme, difficulty in rows:
+            self._add_to_index(len(self.rowids), theme, difficulty)
+            self.rowids.append(rowid)
+
+    def themes(self) -> Dict[str, int]:
+        """Количество вопросов по темам"""
+        counts: Dict[str, int] = {}
+        for (theme, _), positions in self.index.items():
+            counts[theme] = counts.get(theme, 0) + len(positions)
+        return counts
+
+    def sample(self, count: int, theme: Optional[str] = None, difficulty: Optional[int] = None,
+               rng: random.Random = random) -> List[Question]:
+        """Случайные вопросы без повторов с фильтром по теме и сложности"""
+        groups = [
+            positions for (group_theme, group_difficulty), positions in self.index.items()
+            if (theme is None or group_theme == theme) and (difficulty is None or group_difficulty == difficulty)
+        ]
+        # Выбираем номера в «склеенном» списке групп, не собирая его целиком
+        bounds = []
+        total = 0
+        for positions in groups:
+            total += len(positions)
+            bounds.append(total)
+        picks = rng.sample(range(total), min(count, total))
+        positions = []
+        for pick in picks:
+            group = bisect.bisect_right(bounds, pick)
+            positions.append(groups[group][pick - (bounds[group - 1] if group else 0)])
+        return self.fetch(positions)
+
+    def fetch(self, positions: List[int]) -> List[Question]:
+        if self.db is None:
+            records = [json.loads(self.rows[position]) for position in positions]
+        else:
+            rowids = [self.rowids[position] for position in positions]
+            found = {
+                rowid: (text, json.loads(options), correct, theme)
+                for rowid, text, options, correct, theme in self.db.execute(
+                    f"SELECT rowid, text, options, correct, theme FROM questions WHERE rowid IN ({','.join('?' * len(rowids))})",
+                    rowids,
+                )
+            }
+            records = [found[rowid] for rowid in rowids]
+        return [
+            Question(text=text, options=options, correct_index=correct, theme=theme)
+            for text, options, correct, theme in records
+        ]
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+
+def is_sqlite(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in (".db", ".sqlite", ".sqlite3")
+
+def source_mtime(path: str) -> float:
+    """Время изменения источника (для SQLite учитывается и WAL-файл)"""
+    mtime = os.stat(path).st_mtime
+    if is_sqlite(path) and os.path.exists(path + "-wal"):
+        mtime = max(mtime, os.stat(path + "-wal").st_mtime)
+    return mtime
+
+# Текущий банк; при изменении файла заменяется целиком новым объектом
+bank = QuestionBank(config.QUESTIONS_PATH)
+logger.info(f"📚 Question bank: {len(bank)} questions from {config.QUESTIONS_PATH}")
+
+def sample_game() -> List[Question]:
+    """Вопросы для нового цикла викторины"""
+    return bank.sample(config.QUESTIONS_PER_GAME, config.QUESTIONS_THEME, config.QUESTIONS_DIFFICULTY)
+
+async def watch():
+    """Перечитывает банк в отдельном потоке, когда источник изменился"""
+    global bank
+    failed_mtime = None
+    while True:
+        await asyncio.sleep(config.QUESTIONS_RELOAD_INTERVAL)
+        mtime = None
+        try:
+            mtime = source_mtime(bank.path)
+            if mtime in (bank.mtime, failed_mtime):
+                continue
+            fresh = await asyncio.to_thread(QuestionBank, bank.path)
+            if not len(fresh):
+                fresh.close()
+                raise ValueError("no questions")
+        except Exception as e:
+            # Битый или пустой файл не должен останавливать игру: остается прежний банк до следующей правки
+            logger.error(f"❌ Question bank reload failed: {e}")
+            failed_mtime = mtime
+            continue
+        old, bank = bank, fresh
+        old.close()
+        logger.info(f"📚 Question bank reloaded: {len(bank)} questions")
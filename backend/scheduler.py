@@ -0,0 +1,85 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from . import clock, metrics
+
+logger = logging.getLogger(__name__)
+
+class Scheduled:
+    """Запланированный вызов; отмена помечает запись, из кучи она уходит сама"""
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when: float, callback, args: tuple):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class Scheduler:
+    """Общий планировщик переходов стадий для всех комнат.
+
+    Одна задача и одна куча по игровому времени (clock.now) вместо задачи на каждую
+    комнату. Колбэки синхронные и сами планируют следующий шаг — без рекурсии.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def call_at(self, when: float, callback, *args) -> Scheduled:
+        entry = Scheduled(when, callback, args)
+        heapq.heappush(self._heap, (when, next(self._seq), entry))
+        if self._heap[0][2] is entry:
+            # Новый ближайший срок — будим цикл, чтобы он пересчитал ожидание
+            self._wakeup.set()
+        return entry
+
+    def run_due(self) -> int:
+        """Выполняет все наступившие вызовы и возвращает их количество"""
+        ran = 0
+        while self._heap and self._heap[0][0] <= clock.now():
+            _, _, entry = heapq.heappop(self._heap)
+            if entry.cancelled:
+                continue
+            ran += 1
+            metrics.stage_drift.observe(clock.now() - entry.when, entry.callback.__name__)
+            try:
+                entry.callback(*entry.args)
+            except Exception:
+                logger.exception("❌ Scheduled callback failed")
+        return ran
+
+    async def run(self):
+        while True:
+            self.run_due()
+            delay = clock.current().real_delay(self._heap[0][0] - clock.now()) if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def advance(self, seconds: float):
+        """Ручные часы: переводит время вперед, выполняя переходы ровно в их сроки"""
+        manual = clock.current()
+        target = manual.now() + seconds
+        while self._heap and self._heap[0][0] <= target:
+            manual.set(self._heap[0][0])
+            self.run_due()
+        manual.set(target)
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self.run())
+
+scheduler = Scheduler()
@@ -0,0 +1,148 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+from array import array
+from typing import List
+import numpy as np
+from . import clock, config
+from .models import Room, Question, Participants, AnswerLog, Leaderboard
+from .state import rooms, set_questions
+from .store import store
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_TASK = None
+
+def pack(column) -> str:
+    """Числовая колонка → base64 ее байтов"""
+    return base64.b64encode(memoryview(column).tobytes()).decode()
+
+def unpack(data: str, typecode: str) -> array:
+    column = array(typecode)
+    column.frombytes(base64.b64decode(data))
+    return column
+
+def dump_room(room: Room, now: float) -> dict:
+    """Компактный снимок комнаты; время — относительно дедлайна, т.к. clock.now() не переживает перезагрузку"""
+    users = room.users
+    log = room.answers
+    count = log.count
+    return {
+        "id": room.id,
+        "epoch": room.epoch,
+        "game": room.game,
+        "stage": room.stage,
+        "remaining": room.deadline - now,
+        "current_question": room.current_question,
+        "questions": [q.model_dump() for q in room.questions],
+        "names": list(users.names),
+        "score": pack(users.score),
+        "last_score": pack(users.last_score),
+        "last_correct": pack(users.last_correct),
+        "answers": {
+            "user": pack(log.user[:count]),
+            "option": pack(log.option[:count]),
+            # До дедлайна: от этого числа считаются баллы
+            "before_deadline": pack(room.deadline - log.received[:count]),
+        },
+    }
+
+def load_room(data: dict, now: float) -> Room:
+    room = Room(data["id"], data["stage"], now + data["remaining"])
+    room.epoch = data["epoch"]
+    room.game = data["game"]
+    room.current_question = data["current_question"]
+    set_questions(room, [Question(**q) for q in data["questions"]])
+
+    users = Participants()
+    for name in data["names"]:
+        users.add(name)
+    users.score = unpack(data["score"], "q")
+    users.last_score = unpack(data["last_score"], "q")
+    users.last_correct = unpack(data["last_correct"], "b")
+    room.users = users
+
+    answers = data["answers"]
+    room.answers = AnswerLog(len(users))
+    received = room.deadline - np.frombuffer(base64.b64decode(answers["before_deadline"]), dtype=np.float64)
+    for idx, option, at in zip(unpack(answers["user"], "i"), unpack(answers["option"], "i"), received.tolist()):
+        room.answers.add(idx, option, at)
+
+    room.leaderboard = Leaderboard()
+    room.leaderboard.update(np.frombuffer(users.score, dtype=np.int64), np.arange(len(users)))
+    return room
+
+def dump() -> dict:
+    now = clock.now()
+    return {
+        "version": SNAPSHOT_VERSION,
+        # Сколько прошло с записи снимка, считается по настенным часам
+        "saved_at": time.time(),
+        "rooms": [dump_room(room, now) for room in rooms],
+    }
+
+def write(snapshot: dict, path: str):
+    """Атомарная запись: читатель видит либо старый снимок, либо новый целиком"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def restore(path: str) -> List[Room]:
+    """Восстанавливает комнаты из снимка; время простоя вычитается из оставшихся таймеров"""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            logger.warning(f"⚠️ Snapshot {path} has unsupported version, starting fresh")
+            return []
+        downtime = max(0.0, time.time() - snapshot["saved_at"])
+        if downtime > config.SNAPSHOT_MAX_AGE:
+            logger.warning(f"⚠️ Snapshot {path} is {downtime:.0f} s old, starting fresh")
+            return []
+        # Простой в реальных секундах → в игровых
+        current = clock.now()
+        now = current - downtime * clock.current().speed
+        # Стадия, закончившаяся за время простоя, закрывается сразу, а следующие идут
+        # с обычной длительностью: пропущенные стадии не проигрываются подряд
+        restored = [load_room(data, max(now, current - data["remaining"])) for data in snapshot["rooms"]]
+    except Exception:
+        logger.exception(f"❌ Failed to restore snapshot {path}, starting fresh")
+        return []
+    for room in restored:
+        rooms.add(room)
+    logger.info(f"💾 Restored {len(restored)} rooms from {path}")
+    return restored
+
+def enabled() -> bool:
+    return bool(config.SNAPSHOT_PATH) and not store.shared
+
+def state_key() -> tuple:
+    """Меняется вместе с любым состоянием, попадающим в снимок"""
+    return tuple((room.id, room.version, room.answers.count) for room in rooms)
+
+async def snapshot_loop():
+    saved = None
+    while True:
+        await asyncio.sleep(config.SNAPSHOT_INTERVAL)
+        try:
+            key = state_key()
+            if key == saved:
+                continue
+            # Снимок собирается в цикле событий (согласованное состояние), пишется в потоке
+            await asyncio.to_thread(write, dump(), config.SNAPSHOT_PATH)
+            saved = key
+        except Exception:
+            logger.exception("❌ Snapshot failed")
+
+def start_snapshots():
+    global SNAPSHOT_TASK
+    if not enabled() or (SNAPSHOT_TASK and not SNAPSHOT_TASK.done()):
+        return
+    SNAPSHOT_TASK = asyncio.create_task(snapshot_loop())
@@ -1,24 +1,276 @@
-from .models import Room, User, Question
-import random
-
-room = Room(
-    stage='registration',
-    timer=60,
-    users={},
-    questions=[],
-    current_question=0,
-    answers={}
-)
-
-def set_stage(stage: str, timer: int):
+from .models import Room, Question, Participants, AnswerLog, Leaderboard, new_game_id
+import numpy as np
+from . import clock, config
+from .config import DEFAULT_ROOM_ID
+from .store import store
+from .auth import forget_room_tokens
+from . import journal, metrics
+from typing import Dict, List, Optional
+import time
+
+
+class RoomManager:
+    """Все комнаты процесса по идентификатору"""
+
+    def __init__(self):
+        self.rooms: Dict[str, Room] = {}
+
+    def __len__(self):
+        return len(self.rooms)
+
+    def __iter__(self):
+        return iter(list(self.rooms.values()))
+
+    def get(self, room_id: str) -> Optional[Room]:
+        return self.rooms.get(room_id)
+
+    def create(self, room_id: str) -> Room:
+        if room_id not in self.rooms:
+            self.rooms[room_id] = Room(room_id, 'registration', clock.now() + 60)
+        return self.rooms[room_id]
+
+    def add(self, room: Room):
+        self.rooms[room.id] = room
+
+    def remove(self, room_id: str) -> Optional[Room]:
+        return self.rooms.pop(room_id, None)
+
+rooms = RoomManager()
+
+def set_stage(room: Room, stage: str, duration: float, start: Optional[float] = None):
+    """Переход к стадии с абсолютным дедлайном.
+
+    start — момент начала стадии; для цепочки стадий передается дедлайн
+    предыдущей, чтобы задержки event loop не накапливались.
+    """
+    if start is None:
+        start = clock.now()
     room.stage = stage
-    room.timer = timer
+    room.deadline = start + duration
+    room.touch()
+
+def set_questions(room: Room, questions: List[Question]):
+    """Вопросы цикла; публичная часть готовится сразу, а не на каждый показ вопроса"""
+    room.questions = questions
+    room.public_questions = [{"text": q.text, "options": q.options, "theme": q.theme} for q in questions]
+
+def add_user(room: Room, name: str) -> bool:
+    """Локальное добавление участника (проверки — в join_room)"""
+    if room.users.taken(name):
+        return False
+    room.users.add(name)
+    room.touch()
+    return True
+
+async def join_room(room: Room, name: str) -> bool:
+    """Регистрация через общее хранилище: имя свободно и лимит не превышен"""
+    epoch = room.epoch
+    if not await store.add_user(room, name, config.MAX_USERS):
+        return False
+    # Пока шла запись в хранилище, мог начаться новый цикл
+    if room.epoch != epoch or not add_user(room, name):
+        return False
+    journal.record(room, "user_joined", name=name)
+    return True
+
+def record_answer(room: Room, name: str, answer: int, received: float):
+    room.answers.add(room.users.index[name], answer, received)
+
+async def submit_answer(room: Room, name: str, answer: int, received: float) -> bool:
+    """Прием ответа через общее хранилище: не больше одного ответа на вопрос"""
+    question = (room.epoch, room.current_question)
+    if not await store.record_answer(room, name, answer, received):
+        return False
+    # Пока шла запись в хранилище, вопрос мог закрыться: ответ на него уже не считается
+    if room.stage != 'quiz' or (room.epoch, room.current_question) != question:
+        return False
+    record_answer(room, name, answer, received)
+    journal.record(room, "answer", name=name, question=room.current_question, answer=answer,
+                   remaining_ms=int((room.deadline - received) * 1000))
+    return True
+
+# Почему ответ не принят: код ошибки → (HTTP-статус, сообщение); общие для HTTP и WebSocket
+ANSWER_ERRORS = {
+    "inactive": (403, "Вопрос не активен"),
+    "not_registered": (403, "Пользователь не зарегистрирован"),
+    "invalid": (400, "Невалидный ответ"),
+    "duplicate": (409, "Уже отвечал"),
+}
+
+async def accept_answer(room: Room, name: str, answer: int, received: float) -> Optional[str]:
+    """Все проверки ответа и его запись; возвращает код ошибки из ANSWER_ERRORS или None"""
+    if room.stage != 'quiz' or received >= room.deadline or room.current_question >= len(room.questions):
+        return "inactive"
+    idx = room.users.get(name)
+    if idx is None:
+        return "not_registered"
+    if not 0 <= answer < len(room.questions[room.current_question].options):
+        return "invalid"
+    # Сохраняем ответ и точное время его получения (баллы считаются от дедлайна)
+    if idx in room.answers:
+        return "duplicate"
+    question = (room.epoch, room.current_question)
+    if not await submit_answer(room, name, answer, received):
+        return "duplicate" if room.stage == 'quiz' and (room.epoch, room.current_question) == question else "inactive"
+    return None
+
+def answer_points(remaining):
+    """Баллы за правильный ответ: оставшееся время вопроса в миллисекундах (работает и с массивами)"""
+    return np.maximum(0, (np.asarray(remaining) * 1000).astype(np.int64))
+
+def score_question(room: Room, q_idx: int, deadline: float):
+    """Начисление баллов одним векторным проходом по колонкам ответов.
+
+    Баллы считаются по точному времени получения ответа относительно дедлайна.
+    """
+    users = room.users
+    metrics.question_answers.observe(room.answers.count)
+    if not len(users) or q_idx >= len(room.questions):
+        return
+    start = time.perf_counter()
+    # Представления numpy поверх массивов участников: запись идет прямо в колонки
+    score = np.frombuffer(users.score, dtype=np.int64)
+    last_score = np.frombuffer(users.last_score, dtype=np.int64)
+    last_correct = np.frombuffer(users.last_correct, dtype=np.int8)
+
+    log = room.answers
+    count = log.count
+    correct = log.option[:count] == room.questions[q_idx].correct_index
+    winners = log.user[:count][correct]
+    # Чем быстрее ответ, тем больше баллов
+    points = answer_points(deadline - log.received[:count][correct])
+
+    last_correct[:] = 0
+    last_score[:] = 0
+    last_correct[winners] = 1
+    last_score[winners] = points
+    score[winners] += points
+    room.leaderboard.update(score, winners[points > 0])
+    room.touch()
+    metrics.scoring_seconds.observe(time.perf_counter() - start)
+
+def reset_room(room: Room):
+    """Сброс участников и вопросов перед новым циклом"""
+    room.users = Participants()
+    room.answers = AnswerLog()
+    room.leaderboard = Leaderboard()
+    set_questions(room, [])
+    room.current_question = 0
+    room.epoch += 1
+    room.game = new_game_id()
+    room.touch()
+    # Проверенные токены прошлого цикла больше не берутся из кэша
+    forget_room_tokens(room.id)
+
+def journal_scores(room: Room, q_idx: int):
+    """Баллы за закрытый вопрос — в журнал игр"""
+    if q_idx >= len(room.questions):
+        return
+    users = room.users
+    question = room.questions[q_idx]
+    winners = np.flatnonzero(np.frombuffer(users.last_score, dtype=np.int64))
+    journal.record(room, "scores", question=q_idx, text=question.text, correct_index=question.correct_index,
+                   points=[[users.names[idx], users.last_score[idx]] for idx in winners.tolist()])
+
+def top_players(room: Room, limit: int) -> List[dict]:
+    users = room.users
+    room.leaderboard.sync(len(users))
+    return [{"name": users.names[idx], "score": users.score[idx]} for idx in room.leaderboard.top(limit).tolist()]
+
+def question_summary(room: Room, leaders: int) -> dict:
+    """Итог закрытого вопроса для всех: правильный ответ, сколько ответили и верно, лидеры"""
+    return {
+        "question": room.current_question,
+        "correct_index": room.questions[room.current_question].correct_index,
+        "answers": room.answers.count,
+        "correct": int(np.count_nonzero(np.frombuffer(room.users.last_correct, dtype=np.int8))),
+        "leaders": top_players(room, leaders),
+    }
+
+def votes_payload(room: Room) -> dict:
+    """Распределение ответов на текущий вопрос для экрана ведущего: O(число вариантов)"""
+    votes = room.answers.votes
+    payload = {
+        "stage": room.stage,
+        "question": room.current_question,
+        "votes": votes,
+        "answered": room.answers.count,
+        "total": len(room.users),
+    }
+    if room.current_question < len(room.questions):
+        options = len(room.questions[room.current_question].options)
+        payload["votes"] = votes + [0] * (options - len(votes))
+        if room.stage == "pause":
+            payload["correct_index"] = room.questions[room.current_question].correct_index
+    return payload
+
+def personal_result(room: Room, name: str) -> Optional[dict]:
+    """Итог закрытого вопроса для одного участника"""
+    idx = room.users.index.get(name)
+    if idx is None:
+        return None
+    users = room.users
+    return {
+        "question": room.current_question,
+        "correct": bool(users.last_correct[idx]),
+        "points": users.last_score[idx],
+        "score": users.score[idx],
+    }
+
+def journal_standings(room: Room):
+    """Итоговая таблица цикла — в журнал игр"""
+    users = room.users
+    room.leaderboard.sync(len(users))
+    journal.record(room, "standings", standings=[
+        [users.names[idx], users.score[idx]] for idx in room.leaderboard.top(len(users)).tolist()
+    ])
+
+def stage_event(room: Room, **extra) -> dict:
+    """Событие смены стадии для других воркеров"""
+    event = {
+        "type": "stage",
+        "stage": room.stage,
+        "deadline": room.deadline,
+        "question": room.current_question,
+        "epoch": room.epoch,
+        "game": room.game,
+        **extra,
+    }
+    if room.stage == "preparation":
+        event["questions"] = [q.model_dump() for q in room.questions]
+    return event
 
-def add_user(name: str):
-    if name not in room.users and len(room.users) < 100:
-        room.users[name] = User(name=name)
-        return True
-    return False
+def apply_event(event: dict) -> Optional[Room]:
+    """Применяет событие другого воркера к локальной копии.
 
-def get_users():
-    return list(room.users.values()) 
\ No newline at end of file
+    Возвращает комнату, если в ней сменилась стадия.
+    """
+    room = rooms.get(event["room"])
+    kind = event["type"]
+    if kind == "stage":
+        room = room or rooms.create(event["room"])
+        if event["epoch"] < room.epoch:
+            return None
+        if event["epoch"] > room.epoch:
+            reset_room(room)
+            room.epoch = event["epoch"]
+        previous = (room.stage, room.current_question)
+        room.stage = event["stage"]
+        room.deadline = event["deadline"]
+        room.current_question = event["question"]
+        room.game = event["game"]
+        if "questions" in event:
+            set_questions(room, [Question(**q) for q in event["questions"]])
+        if room.stage == "quiz" and previous != ("quiz", room.current_question):
+            room.answers.reset(len(room.users))
+        if room.stage == "pause" and previous == ("quiz", room.current_question):
+            score_question(room, room.current_question, event["closed"])
+        room.touch()
+        return room
+    if room is None or event["epoch"] != room.epoch:
+        return None
+    if kind == "user_joined":
+        add_user(room, event["name"])
+    elif kind == "answer" and event["question"] == room.current_question:
+        record_answer(room, event["name"], event["answer"], event["received"])
+    return None
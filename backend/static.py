@@ -0,0 +1,128 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import Response
+from . import config
+
+try:
+    import brotli
+except ImportError:
+    # brotli необязателен: без него отдаются gzip и несжатый вариант
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Собранный фронтенд целиком в памяти: index.html и assets читаются с диска
+# один раз, сжатые варианты готовятся заранее, а не на каждый запрос.
+
+# Vite добавляет хэш содержимого к именам файлов в assets: index-BHj3kX9a.js
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8,}\.\w+$")
+# Сжимать имеет смысл только текст
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+class StaticFile:
+    """Файл и его варианты: кодировка ('' — без сжатия) → (тело, заголовки)"""
+    __slots__ = ("variants",)
+
+    def __init__(self, path: str, data: bytes, immutable: bool):
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+        bodies = {"": data}
+        if media_type.startswith(COMPRESSIBLE) and len(data) >= MIN_COMPRESS_SIZE:
+            bodies["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                bodies["br"] = brotli.compress(data, quality=11)
+        self.variants: Dict[str, Tuple[bytes, dict]] = {}
+        for encoding, body in bodies.items():
+            if encoding and len(body) >= len(data):
+                continue
+            headers = {
+                "Content-Type": media_type,
+                "ETag": f'"{digest}-{encoding}"' if encoding else f'"{digest}"',
+                # Файлы без хэша в имени (index.html) браузер сверяет по ETag при каждом заходе
+                "Cache-Control": IMMUTABLE if immutable else "no-cache",
+                "Vary": "Accept-Encoding",
+            }
+            if encoding:
+                headers["Content-Encoding"] = encoding
+            self.variants[encoding] = (body, headers)
+
+    def response(self, request: Request) -> Response:
+        body, headers = self.variants[pick_encoding(request.headers.get("accept-encoding", ""), self.variants)]
+        if headers["ETag"] in request.headers.get("if-none-match", "").split(", "):
+            return Response(status_code=304, headers={k: v for k, v in headers.items() if k != "Content-Type"})
+        return Response(content=body, headers=headers)
+
+def pick_encoding(accept: str, variants) -> str:
+    """Лучший из готовых вариантов для Accept-Encoding (br > gzip > без сжатия)"""
+    accepted = set()
+    for part in accept.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip())
+    for encoding in ("br", "gzip"):
+        if encoding in variants and (encoding in accepted or "*" in accepted):
+            return encoding
+    return ""
+
+def scan(root: str) -> List[Tuple[str, float]]:
+    """Файлы сборки (путь от корня, mtime) — по ним же видно, что сборка изменилась"""
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            found.append((os.path.relpath(path, root).replace(os.sep, "/"), os.stat(path).st_mtime))
+    return sorted(found)
+
+class StaticBundle:
+    """Все файлы сборки фронтенда: путь от корня сборки → StaticFile"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files: Dict[str, StaticFile] = {}
+        self.signature = scan(root) if os.path.isdir(root) else []
+        for path, _ in self.signature:
+            with open(os.path.join(root, path), "rb") as f:
+                data = f.read()
+            immutable = path.startswith("assets/") and HASHED_NAME.search(path) is not None
+            self.files[path] = StaticFile(path, data, immutable)
+
+    @property
+    def index(self) -> Optional[StaticFile]:
+        return self.files.get("index.html")
+
+    def get(self, path: str) -> Optional[StaticFile]:
+        return self.files.get(path)
+
+    def size(self) -> int:
+        return sum(len(body) for file in self.files.values() for body, _ in file.variants.values())
+
+# Текущая сборка; при перезагрузке заменяется целиком
+bundle = StaticBundle(config.FRONTEND_DIST)
+if bundle.files:
+    logger.info(f"🗂️ Frontend: {len(bundle.files)} files, {bundle.size() / 1024:.0f} KiB in memory with compressed variants")
+
+async def watch():
+    """Пересобирает bundle в отдельном потоке, когда содержимое frontend_dist изменилось"""
+    global bundle
+    while True:
+        await asyncio.sleep(config.STATIC_RELOAD_INTERVAL)
+        try:
+            root = bundle.root
+            signature = await asyncio.to_thread(lambda: scan(root) if os.path.isdir(root) else [])
+            if signature == bundle.signature:
+                continue
+            bundle = await asyncio.to_thread(StaticBundle, root)
+        except Exception as e:
+            # Сборка может быть записана наполовину: пробуем снова на следующем шаге
+            logger.error(f"❌ Frontend reload failed: {e}")
+            continue
+        logger.info(f"🗂️ Frontend reloaded: {len(bundle.files)} files")
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import logging
+import os
+import secrets
+import socket
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+from . import config
+from .models import Room, fold_name
+
+logger = logging.getLogger(__name__)
+
+class StateBackend:
+    """Общее хранилище состояния викторины.
+
+    Каждый воркер держит локальную копию комнат; хранилище решает гонки
+    (имя занято, повторный ответ), раздает события другим воркерам и выбирает
+    одного лидера, который ведет таймеры стадий.
+    """
+
+    # Несколько процессов делят состояние и нуждаются в синхронизации
+    shared = False
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{secrets.token_hex(2)}"
+        self.leader = True
+
+    def secret_key(self) -> str:
+        return config.SECRET_KEY or secrets.token_urlsafe(32)
+
+    def try_lead(self) -> bool:
+        """Захват или продление лидерства; возвращает, лидер ли этот воркер"""
+        return self.leader
+
+    async def add_user(self, room: Room, name: str, limit: int) -> bool:
+        """Атомарная проверка, что имя свободно (без учета регистра и пробелов) и лимит не превышен"""
+        return not room.users.taken(name) and len(room.users) < limit
+
+    async def record_answer(self, room: Room, name: str, answer: int, received: float) -> bool:
+        """Атомарная проверка, что пользователь еще не отвечал на текущий вопрос"""
+        return room.users.index[name] not in room.answers
+
+    def publish_stage(self, room: Room, event: dict):
+        """Рассылка смены стадии другим воркерам"""
+
+    def publish(self, room_id: str, epoch: int, event: dict):
+        """Рассылка произвольного события комнаты другим воркерам"""
+
+    def poll(self) -> List[Tuple[int, dict]]:
+        """События других воркеров, появившиеся с прошлого вызова"""
+        return []
+
+    def prune(self, room_id: str, epoch: Optional[int] = None):
+        """Удаление событий прошедших циклов (или всей комнаты)"""
+
+class MemoryBackend(StateBackend):
+    """Состояние только в памяти процесса: один воркер, все проверки локальные"""
+
+    def secret_key(self) -> str:
+        if config.SECRET_KEY or not config.SECRET_FILE:
+            return super().secret_key()
+        # Ключ создается один раз и читается при следующих запусках
+        try:
+            fd = os.open(config.SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            with open(config.SECRET_FILE, encoding="utf-8") as f:
+                return f.read().strip()
+        key = secrets.token_urlsafe(32)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(key)
+        return key
+
+class SQLiteBackend(StateBackend):
+    """Общее состояние в файле SQLite для нескольких воркеров на одной машине.
+
+    Таблица events служит очередью pub/sub: воркеры читают ее по возрастанию id.
+    Дедлайны хранятся в clock.now() — time.monotonic(), общем для всех процессов хоста.
+    Регистрации и ответы пишет отдельный поток со своим соединением: все, что пришло
+    за один оборот event loop, проверяется и записывается одной транзакцией.
+    """
+
+    shared = True
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.leader = False
+        self.path = path
+        self.last_event_id = 0
+        self.db = self.connect()
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS leader (id INTEGER PRIMARY KEY CHECK (id = 0), worker TEXT, expires REAL);
+            CREATE TABLE IF NOT EXISTS rooms (id TEXT PRIMARY KEY, epoch INTEGER, stage TEXT, question INTEGER, deadline REAL);
+            CREATE TABLE IF NOT EXISTS users (room TEXT, epoch INTEGER, name TEXT, PRIMARY KEY (room, epoch, name));
+            CREATE TABLE IF NOT EXISTS answers (room TEXT, epoch INTEGER, question INTEGER, name TEXT, PRIMARY KEY (room, epoch, question, name));
+            CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, room TEXT, epoch INTEGER, origin TEXT, payload TEXT);
+        """)
+        # Соединение потока записи: транзакции пачек не смешиваются с запросами event loop
+        self.writer_db = self.connect()
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="state-db")
+        self.pending: List[Tuple[Callable, tuple, asyncio.Future]] = []
+
+    def connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=config.STATE_DB_TIMEOUT, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _insert_event(self, room_id: str, epoch: int, event: dict, db: Optional[sqlite3.Connection] = None):
+        (db or self.db).execute(
+            "INSERT INTO events (room, epoch, origin, payload) VALUES (?, ?, ?, ?)",
+            (room_id, epoch, self.worker_id, json.dumps(event, ensure_ascii=False)),
+        )
+
+    def secret_key(self) -> str:
+        if config.SECRET_KEY:
+            return config.SECRET_KEY
+        self.db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('secret_key', ?)", (secrets.token_urlsafe(32),))
+        return self.db.execute("SELECT value FROM meta WHERE key = 'secret_key'").fetchone()[0]
+
+    def try_lead(self) -> bool:
+        now = time.time()
+        self.db.execute("INSERT OR IGNORE INTO leader (id, worker, expires) VALUES (0, '', 0)")
+        cursor = self.db.execute(
+            "UPDATE leader SET worker = ?, expires = ? WHERE id = 0 AND (worker = ? OR expires < ?)",
+            (self.worker_id, now + config.LEADER_LEASE, self.worker_id, now),
+        )
+        self.leader = cursor.rowcount == 1
+        return self.leader
+
+    async def write(self, op, *args) -> bool:
+        """Операция в потоке записи; операции одного оборота loop идут одной транзакцией"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((op, args, future))
+        if len(self.pending) == 1:
+            loop.call_soon(self.flush, loop)
+        return await future
+
+    def flush(self, loop: asyncio.AbstractEventLoop):
+        pending, self.pending = self.pending, []
+        done = loop.run_in_executor(self.writer, self.write_batch, [(op, args) for op, args, _ in pending])
+        done.add_done_callback(partial(self.deliver, [future for _, _, future in pending]))
+
+    def write_batch(self, batch: list) -> List[bool]:
+        with self.writer_db:
+            self.writer_db.execute("BEGIN IMMEDIATE")
+            return [op(*args) for op, args in batch]
+
+    @staticmethod
+    def deliver(futures: List[asyncio.Future], done: asyncio.Future):
+        error = done.exception()
+        results = done.result() if error is None else [None] * len(futures)
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    async def add_user(self, room: Room, name: str, limit: int) -> bool:
+        # Поля комнаты читаются сейчас: к моменту записи в потоке она может уйти дальше
+        return await self.write(self._add_user, room.id, room.epoch, name, limit)
+
+    def _add_user(self, room_id: str, epoch: int, name: str, limit: int) -> bool:
+        db = self.writer_db
+        row = db.execute("SELECT epoch, stage FROM rooms WHERE id = ?", (room_id,)).fetchone()
+        if row != (epoch, "registration"):
+            return False
+        count = db.execute("SELECT COUNT(*) FROM users WHERE room = ? AND epoch = ?", (room_id, epoch)).fetchone()[0]
+        if count >= limit:
+            return False
+        # В таблице — приведенное имя: так занятость проверяет первичный ключ
+        cursor = db.execute(
+            "INSERT OR IGNORE INTO users (room, epoch, name) VALUES (?, ?, ?)", (room_id, epoch, fold_name(name))
+        )
+        if cursor.rowcount != 1:
+            return False
+        self._insert_event(room_id, epoch, {"type": "user_joined", "name": name}, db)
+        return True
+
+    async def record_answer(self, room: Room, name: str, answer: int, received: float) -> bool:
+        return await self.write(self._record_answer, room.id, room.epoch, room.current_question, name, answer, received)
+
+    def _record_answer(self, room_id: str, epoch: int, question: int, name: str, answer: int, received: float) -> bool:
+        db = self.writer_db
+        # Вопрос мог быть закрыт лидером: такой ответ не должен попасть в подсчет
+        row = db.execute("SELECT epoch, stage, question FROM rooms WHERE id = ?", (room_id,)).fetchone()
+        if row != (epoch, "quiz", question):
+            return False
+        cursor = db.execute(
+            "INSERT OR IGNORE INTO answers (room, epoch, question, name) VALUES (?, ?, ?, ?)",
+            (room_id, epoch, question, name),
+        )
+        if cursor.rowcount != 1:
+            return False
+        self._insert_event(room_id, epoch, {
+            "type": "answer", "name": name, "answer": answer, "received": received, "question": question,
+        }, db)
+        return True
+
+    def publish_stage(self, room: Room, event: dict):
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.execute(
+                "INSERT OR REPLACE INTO rooms (id, epoch, stage, question, deadline) VALUES (?, ?, ?, ?, ?)",
+                (room.id, room.epoch, room.stage, room.current_question, room.deadline),
+            )
+            self._insert_event(room.id, room.epoch, event)
+
+    def publish(self, room_id: str, epoch: int, event: dict):
+        with self.db:
+            self._insert_event(room_id, epoch, event)
+
+    def poll(self) -> List[Tuple[int, dict]]:
+        rows = self.db.execute(
+            "SELECT id, room, epoch, origin, payload FROM events WHERE id > ? ORDER BY id", (self.last_event_id,)
+        ).fetchall()
+        events = []
+        for event_id, room_id, epoch, origin, payload in rows:
+            self.last_event_id = event_id
+            if origin != self.worker_id:
+                events.append((event_id, {"epoch": epoch, **json.loads(payload), "room": room_id}))
+        return events
+
+    def prune(self, room_id: str, epoch: Optional[int] = None):
+        with self.db:
+            if epoch is None:
+                self.db.execute("DELETE FROM events WHERE room = ?", (room_id,))
+                self.db.execute("DELETE FROM rooms WHERE id = ?", (room_id,))
+                self.db.execute("DELETE FROM users WHERE room = ?", (room_id,))
+                self.db.execute("DELETE FROM answers WHERE room = ?", (room_id,))
+            else:
+                self.db.execute("DELETE FROM events WHERE room = ? AND epoch < ?", (room_id, epoch))
+                self.db.execute("DELETE FROM users WHERE room = ? AND epoch < ?", (room_id, epoch))
+                self.db.execute("DELETE FROM answers WHERE room = ? AND epoch < ?", (room_id, epoch))
+
+def create_backend() -> StateBackend:
+    if config.STATE_BACKEND == "sqlite":
+        logger.info(f"🗄️ Shared state in SQLite: {config.STATE_DB_PATH}")
+        return SQLiteBackend(config.STATE_DB_PATH)
+    if config.STATE_BACKEND != "memory":
+        raise ValueError(f"Unknown QUIZ_STATE_BACKEND: {config.STATE_BACKEND}")
+    return MemoryBackend()
+
+store = create_backend()
@@ -1,10 +1,22 @@
+from .state import (
+    DEFAULT_ROOM_ID, rooms, set_stage, reset_room, score_question, stage_event, apply_event,
+    journal_scores, journal_standings, set_questions,
+)
+from .models import Room
+from .scheduler import scheduler, Scheduled
+from .store import store
+from .auth import forget_room_tokens
+from . import config, questions
+from typing import Dict, Optional
 import asyncio
-from .state import room, set_stage
-from .models import Question
-import random
+import logging
+import time
 
-# Глобальный task для управления стадиями
-TIMER_TASK = None
+logger = logging.getLogger(__name__)
+
+# Запланированный следующий переход для каждой комнаты
+PENDING: Dict[str, Scheduled] = {}
+SYNC_TASK = None
 
 STAGES = [
     ("registration", 60),
@@ -14,151 +26,185 @@ STAGES = [
     ("results", 0)
 ]
 
-QUESTIONS_POOL = [
-    {"text": "Что такое Вайбкодинг?", "options": ["Метод обучения", "Язык программирования", "Стиль код-ревью", "Техника командной работы"], "correct": 0, "theme": "Вайбкодинг"},
-    {"text": "Что такое AI?", "options": ["Искусственный интеллект", "Автоматизация интерфейса", "Анализ изображений", "Архитектурный индекс"], "correct": 0, "theme": "AI"},
-    {"text": "Что делает ИИ-агент?", "options": ["Выполняет задачи самостоятельно", "Только обучается", "Только хранит данные", "Только рисует"], "correct": 0, "theme": "ИИ-агенты"},
-    {"text": "Какой язык программирования используется в Вайбкодинге?", "options": ["Python", "JavaScript", "Java", "C++"], "correct": 0, "theme": "Вайбкодинг"},
-    {"text": "Что такое машинное обучение?", "options": ["Подмножество AI", "База данных", "Операционная система", "Сеть"], "correct": 0, "theme": "AI"},
-    {"text": "Как ИИ-агент принимает решения?", "options": ["На основе алгоритмов", "Случайно", "По расписанию", "Только по команде"], "correct": 0, "theme": "ИИ-агенты"},
-    {"text": "В чем преимущество Вайбкодинга?", "options": ["Быстрая разработка", "Низкая стоимость", "Простота обучения", "Все вышеперечисленное"], "correct": 3, "theme": "Вайбкодинг"},
-    {"text": "Что такое нейронная сеть?", "options": ["Модель AI", "Интернет-сеть", "База данных", "Программа"], "correct": 0, "theme": "AI"},
-    {"text": "Может ли ИИ-агент обучаться?", "options": ["Да, на основе данных", "Нет, никогда", "Только при перезапуске", "Только в лаборатории"], "correct": 0, "theme": "ИИ-агенты"},
-    {"text": "Какой принцип лежит в основе Вайбкодинга?", "options": ["Простота и скорость", "Сложность и точность", "Дороговизна", "Медленная разработка"], "correct": 0, "theme": "Вайбкодинг"},
-]
+def schedule(room: Room, when: float, step, *args):
+    """Планирует следующий переход комнаты, отменяя предыдущий.
+
+    Таймеры ведет только воркер-лидер, остальные получают смены стадий событиями.
+    """
+    cancel_room(room)
+    if store.leader:
+        PENDING[room.id] = scheduler.call_at(when, step, room, *args)
+
+def cancel_room(room: Room):
+    pending = PENDING.pop(room.id, None)
+    if pending is not None:
+        pending.cancel()
 
-def start_registration():
-    global TIMER_TASK
-    if TIMER_TASK and not TIMER_TASK.done():
-        TIMER_TASK.cancel()
-    TIMER_TASK = asyncio.create_task(registration_loop())
+def publish_stage(room: Room, **extra):
+    store.publish_stage(room, stage_event(room, **extra))
 
-def start_new_cycle():
+def resume_room(room: Room):
+    """Планирует следующий переход по текущей стадии комнаты"""
+    if room.stage == "registration":
+        schedule(room, room.deadline, start_preparation)
+    elif room.stage == "preparation":
+        schedule(room, room.deadline, start_quiz, 0)
+    elif room.stage == "quiz":
+        schedule(room, room.deadline, close_question, room.current_question)
+    elif room.stage == "pause":
+        schedule(room, room.deadline, end_pause, room.current_question)
+    elif room.stage == "results":
+        # 10 секунд на странице результатов, затем сброс данных и новый цикл
+        schedule(room, room.deadline + 10, start_waiting, room.deadline + 10)
+    elif room.stage == "waiting":
+        schedule(room, room.deadline, reopen_registration)
+
+def start_registration(room: Room):
+    open_registration(room, 60)
+
+def start_new_cycle(room: Room):
     """Запуск нового цикла викторины с 2-минутной регистрацией"""
-    global TIMER_TASK
-    if TIMER_TASK and not TIMER_TASK.done():
-        TIMER_TASK.cancel()
-    TIMER_TASK = asyncio.create_task(new_cycle_loop())
-
-async def new_cycle_loop():
-    """Новый цикл с 2-минутной регистрацией"""
-    # Инициализация стадии регистрации (2 минуты = 120 секунд)
-    set_stage("registration", 120)
-    
-    # Таймер без блокировок
-    for i in range(120, 0, -1):
-        await asyncio.sleep(1)
-        room.timer = i - 1
-    
-    # Переход к подготовке
-    await start_preparation()
+    open_registration(room, 120)
 
-async def registration_loop():
+def open_registration(room: Room, duration: float, start: Optional[float] = None):
     # Инициализация стадии регистрации
-    set_stage("registration", 60)
-    
-    # Таймер без блокировок
-    for i in range(60, 0, -1):
-        await asyncio.sleep(1)
-        room.timer = i - 1
-    
-    # Переход к подготовке
-    await start_preparation()
+    set_stage(room, "registration", duration, start)
+    publish_stage(room)
+    resume_room(room)
 
-async def start_preparation():
-    # Инициализация стадии подготовки
-    set_stage("preparation", 15)
-    
-    # Генерация вопросов
-    qs = random.sample(QUESTIONS_POOL, min(5, len(QUESTIONS_POOL)))
-    room.questions = []
-    for q in qs:
-        room.questions.append(Question(
-            text=q["text"],
-            options=q["options"],
-            correct_index=q["correct"],
-            theme=q["theme"]
-        ))
-    
-    # Таймер без блокировок
-    for i in range(15, 0, -1):
-        await asyncio.sleep(1)
-        room.timer = i - 1
+def start_preparation(room: Room):
+    # Вопросы из банка: в модели превращаются только выбранные
+    game = questions.sample_game()
+    if not game:
+        # Без вопросов викторину не начать: продлеваем регистрацию, пока банк не поправят
+        logger.error(
+            f"❌ No questions for room {room.id} (theme={config.QUESTIONS_THEME}, "
+            f"difficulty={config.QUESTIONS_DIFFICULTY}): registration extended"
+        )
+        open_registration(room, 60, room.deadline)
+        return
+
+    # Инициализация стадии подготовки; отсчет от дедлайна предыдущей стадии
+    set_stage(room, "preparation", 15, room.deadline)
+    set_questions(room, game)
     
     # Переход к викторине
-    await start_quiz(0)
+    publish_stage(room)
+    resume_room(room)
 
-async def start_quiz(q_idx):
+def start_quiz(room: Room, q_idx: int):
     # Инициализация вопроса
-    set_stage("quiz", 15)
+    set_stage(room, "quiz", 15, room.deadline)
     room.current_question = q_idx
-    # Сбрасываем ответы для нового вопроса
-    room.answers = {}
-    
-    # Таймер без блокировок
-    for i in range(15, 0, -1):
-        await asyncio.sleep(1)
-        room.timer = i - 1
-    
-    # Начисление баллов (используем время, когда пользователь ответил)
-    for uname, user in room.users.items():
-        if uname in room.answers:
-            answer_data = room.answers[uname]
-            user_answer = answer_data['answer']
-            answer_time = answer_data['time']
-            
-            if user_answer == room.questions[q_idx].correct_index:
-                # Начисляем баллы за правильный ответ
-                # Баллы = время ответа (чем быстрее, тем больше)
-                user.last_answer_correct = True
-                user.last_score = answer_time
-                user.score += answer_time
-            else:
-                user.last_answer_correct = False
-                user.last_score = 0
-        else:
-            user.last_answer_correct = False
-            user.last_score = 0
-    
-    # Переход к паузе
-    await start_pause(q_idx)
+    # Сбрасываем ответы для нового вопроса (массивы на всех участников)
+    room.answers.reset(len(room.users))
+    publish_stage(room)
+    resume_room(room)
 
-async def start_pause(q_idx):
-    # Инициализация паузы
-    set_stage("pause", 3)
-    
-    # Таймер без блокировок
-    for i in range(3, 0, -1):
-        await asyncio.sleep(1)
-        room.timer = i - 1
-    
+def close_question(room: Room, q_idx: int):
+    deadline = room.deadline
+    
+    # Переход к паузе. Сначала закрываем вопрос в общем хранилище, чтобы
+    # поздние ответы других воркеров отклонялись, затем забираем принятые
+    set_stage(room, "pause", 3, deadline)
+    publish_stage(room, closed=deadline)
+    catch_up()
+    
+    score_question(room, q_idx, deadline)
+    journal_scores(room, q_idx)
+    resume_room(room)
+
+def end_pause(room: Room, q_idx: int):
     # Определение следующего этапа
     if q_idx + 1 < len(room.questions):
-        await start_quiz(q_idx + 1)
+        start_quiz(room, q_idx + 1)
     else:
-        await start_results()
+        start_results(room)
 
-async def start_results():
-    set_stage("results", 0)
-    
-    # Ждем 10 секунд на странице результатов, затем сбрасываем данные и запускаем новый цикл
-    await asyncio.sleep(10)
-    await start_new_cycle_auto()
+def start_results(room: Room):
+    set_stage(room, "results", 0, room.deadline)
+    journal_standings(room)
+    publish_stage(room)
+    resume_room(room)
 
-async def start_new_cycle_auto():
+def start_waiting(room: Room, start: float):
     """Автоматический запуск нового цикла"""
     # Сбрасываем данные пользователей
-    room.users = {}
-    room.answers = {}
-    room.questions = []
-    room.current_question = 0
-    
-    # Устанавливаем стадию ожидания
-    set_stage("waiting", 15)
+    reset_room(room)
+    store.prune(room.id, room.epoch)
     
-    # Ждем 15 секунд перед началом новой регистрации
-    for i in range(15, 0, -1):
-        await asyncio.sleep(1)
-        room.timer = i - 1
-    
-    await new_cycle_loop() 
\ No newline at end of file
+    # Стадия ожидания: 15 секунд перед началом новой регистрации
+    set_stage(room, "waiting", 15, start)
+    publish_stage(room)
+    resume_room(room)
+
+def reopen_registration(room: Room):
+    open_registration(room, 120, room.deadline)
+
+def remove_room(room_id: str) -> Optional[Room]:
+    room = rooms.remove(room_id)
+    if room is not None:
+        cancel_room(room)
+        forget_room_tokens(room_id)
+    return room
+
+def close_room(room_id: str) -> bool:
+    """Удаление комнаты во всех воркерах"""
+    if remove_room(room_id) is None:
+        return False
+    store.prune(room_id)
+    store.publish(room_id, 0, {"type": "room_removed"})
+    return True
+
+def catch_up():
+    """Применяет события других воркеров, накопившиеся в хранилище"""
+    for _, event in store.poll():
+        if event["type"] == "room_removed":
+            remove_room(event["room"])
+            continue
+        room = apply_event(event)
+        if room is not None and store.leader:
+            resume_room(room)
+
+def take_over():
+    """Воркер стал лидером: подхватываем таймеры всех комнат"""
+    if store.shared:
+        logger.info(f"👑 Worker {store.worker_id} is now the stage leader")
+    for room in rooms:
+        resume_room(room)
+    if rooms.get(DEFAULT_ROOM_ID) is None:
+        start_registration(rooms.create(DEFAULT_ROOM_ID))
+
+def step_down():
+    logger.info(f"👋 Worker {store.worker_id} lost stage leadership")
+    for room in rooms:
+        cancel_room(room)
+
+async def sync_loop():
+    last_lease = 0.0
+    while True:
+        await asyncio.sleep(config.SYNC_INTERVAL)
+        try:
+            now = time.monotonic()
+            if now - last_lease >= config.LEADER_LEASE / 3:
+                was_leader = store.leader
+                store.try_lead()
+                last_lease = now
+                if store.leader and not was_leader:
+                    take_over()
+                elif was_leader and not store.leader:
+                    step_down()
+            catch_up()
+        except Exception:
+            logger.exception("❌ State sync failed")
+
+def start_engine():
+    """Запуск движка: восстановление из общего хранилища и таймеры комнат"""
+    global SYNC_TASK
+    scheduler.start()
+    store.try_lead()
+    catch_up()
+    if store.leader:
+        take_over()
+    if store.shared and not (SYNC_TASK and not SYNC_TASK.done()):
+        SYNC_TASK = asyncio.create_task(sync_loop())
@@ -1,45 +1,565 @@
 from fastapi import WebSocket, WebSocketDisconnect, APIRouter
-from .state import room, get_users
+from .state import (
+    DEFAULT_ROOM_ID, ANSWER_ERRORS, rooms, accept_answer, question_summary, top_players, personal_result,
+    votes_payload,
+)
+from .models import Room
+from .store import store
+from .auth import verify_token
+from .codec import ENCODINGS, encode, encode_all, encode_with_frames
+from . import clock, config, journal, limiter, metrics
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
 import asyncio
+import json
 import logging
+import secrets
+import time
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 ws_router = APIRouter()
-connections = set()
+# Подключения по комнатам
+connections: Dict[str, Set[WebSocket]] = {}
+# Экраны ведущего по комнатам: только читают распределение ответов
+presenters: Dict[str, Set[WebSocket]] = {}
+# Авторизация каждого подключения (для личных кадров result)
+sessions: Dict[WebSocket, "Session"] = {}
+
+# Общий рассыльщик: один снимок состояния на тик для всех сокетов всех комнат
+BROADCAST_TASK = None
+BROADCAST_INTERVAL = 1.0  # игровые секунды между тиками
+MIN_INTERVAL = 0.05  # реальные секунды: предел частоты тиков при ускоренных часах
+SEND_TIMEOUT = 2.0  # сколько ждем один медленный сокет, прежде чем отключить его
+
+# Рассылка ведущим: не чаще 5 кадров в секунду, все ответы между кадрами сливаются в один
+PRESENTER_TASK = None
+PRESENTER_INTERVAL = 0.2  # реальные секунды
+# Что уже отправлено ведущим комнаты: (цикл, стадия, вопрос, ответов, участников)
+presenter_sent: Dict[str, tuple] = {}
+
+# Версия протокола: снимок при подключении, затем только события об изменениях;
+# с версии 2 клиент может авторизоваться и отправлять ответы по тому же сокету;
+# с версии 3 кадр стадии несет вопрос, итог вопроса или таблицу, а участник
+# получает свой результат кадром result — без запросов к API после смены стадии;
+# с версии 4 кадры пронумерованы (seq), и клиент может продолжить с последнего;
+# с версии 5 клиент может выбрать компактную кодировку (?v=5&enc=compact, см. codec.py);
+# с версии 6 пропущенные кадры приходят внутри кадра resumed (frames), одной отправкой
+PROTOCOL_VERSION = 6
+COMPACT_SINCE = 5
+BATCH_RESUME_SINCE = 6
+
+# Сколько лидеров в итоге вопроса и в итоговой таблице
+SUMMARY_LEADERS = 10
+RESULTS_LEADERS = 100
+
+# Что уже разослано клиентам каждой комнаты; по этому состоянию считаются дельты
+last_sent: Dict[str, dict] = {}
+
+class EventLog:
+    """Последние кадры рассылки комнаты с номерами: для продолжения после переподключения"""
+    __slots__ = ("seq", "frames")
+
+    def __init__(self, size: int):
+        self.seq = 0
+        # (номер, тип кадра, текст в каждой кодировке); номера идут подряд
+        self.frames: deque = deque(maxlen=size)
+
+    def add(self, event: dict) -> Dict[str, str]:
+        """Нумерует кадр и кодирует его один раз в каждой кодировке"""
+        self.seq += 1
+        event["seq"] = self.seq
+        texts = encode_all(event)
+        self.frames.append((self.seq, event["type"], texts))
+        return texts
+
+    def since(self, seq: int) -> Optional[List[Tuple[int, str, Dict[str, str]]]]:
+        """Кадры после seq; None — столько уже не помним (или seq из будущего).
+        Номера идут подряд, поэтому читается только хвост журнала"""
+        count = self.seq - seq
+        if count < 0 or seq < 0 or count > len(self.frames):
+            return None
+        frames = self.frames
+        return [frames[i] for i in range(-count, 0)]
+
+def coalesce(frames: List[Tuple[int, str, Dict[str, str]]]) -> List[Tuple[int, str, Dict[str, str]]]:
+    """Пропущенные кадры без устаревших: все до последнего снимка (нового цикла) и тики
+    таймера, кроме последнего, если после него не было кадра стадии (тот сам несет таймер)"""
+    first = last_timer = last_stage = -1
+    for index, (_, kind, _) in enumerate(frames):
+        if kind == "timer":
+            last_timer = index
+        elif kind == "stage":
+            last_stage = index
+        elif kind == "snapshot":
+            first = last_stage = index
+    return [frame for index, frame in enumerate(frames)
+            if index >= first and (frame[1] != "timer" or (index == last_timer and index > last_stage))]
+
+# Номера кадров действуют только в этом процессе: клиент присылает stream вместе с seq,
+# и после перезапуска или на другом воркере получает снимок
+STREAM = secrets.token_hex(4)
+history: Dict[str, EventLog] = {}
+
+def room_log(room_id: str) -> EventLog:
+    log = history.get(room_id)
+    if log is None:
+        log = history[room_id] = EventLog(config.WS_HISTORY)
+    return log
+
+# Чем закончились подключения: продолжение с пропущенных кадров или полный снимок
+reconnects = {"resumed": 0, "snapshot": 0, "resumed_frames": 0}
+metrics.Counter("quiz_ws_reconnects_total", "Подключения с номером кадра: продолжение или снимок", ("result",),
+                source=lambda: {(result,): reconnects[result] for result in ("resumed", "snapshot")})
+
+# Сколько ответов пришло по сокету (остальные — через POST /api/room/answer)
+ws_answers = {"accepted": 0, "rejected": 0}
+
+# Статистика трафика в сравнении с прежним протоколом (полный снимок каждую секунду)
+traffic = {"frames": 0, "bytes_sent": 0, "bytes_legacy": 0}
+
+def total_connections() -> int:
+    return sum(len(clients) for clients in connections.values())
+
+metrics.Gauge("quiz_ws_connections", "Открытые WebSocket-подключения по комнатам", ("room",),
+              source=lambda: {(room_id,): len(clients) for room_id, clients in connections.items()})
+metrics.Gauge("quiz_presenter_connections", "Подключенные экраны ведущего", ("room",),
+              source=lambda: {(room_id,): len(clients) for room_id, clients in presenters.items()})
+metrics.Counter("quiz_ws_frames_total", "Отправленные кадры WebSocket", source=lambda: traffic["frames"])
+metrics.Counter("quiz_ws_bytes_sent_total", "Отправленные байты WebSocket", source=lambda: traffic["bytes_sent"])
+tick_frames = metrics.Histogram("quiz_ws_tick_frames", "Кадров за один тик рассылки",
+                                buckets=(0, 10, 100, 1000, 10000, 100000))
+tick_bytes = metrics.Histogram("quiz_ws_tick_bytes", "Байт за один тик рассылки",
+                               buckets=(0, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8))
+broadcast_seconds = metrics.Histogram("quiz_broadcast_seconds", "Рассылка одного тика по всем комнатам")
+
+def stage_fields(room: Room) -> dict:
+    return {
+        "stage": room.stage,
+        "timer": room.timer,
+        "current_question": getattr(room, 'current_question', 0),
+        "question_count": len(getattr(room, 'questions', [])),
+    }
+
+def stage_extras(room: Room) -> dict:
+    """Данные стадии, за которыми иначе все клиенты разом пришли бы в API.
+    Считаются один раз на версию комнаты: для рассылки и для снимков новых подключений."""
+    cached = room.payloads.get("ws_extras")
+    if cached is not None:
+        return cached
+    extras = {}
+    if room.stage == "quiz" and room.current_question < len(room.public_questions):
+        extras["question"] = room.public_questions[room.current_question]
+    elif room.stage == "pause" and room.current_question < len(room.questions):
+        extras["summary"] = question_summary(room, SUMMARY_LEADERS)
+    elif room.stage == "results":
+        extras["leaders"] = top_players(room, RESULTS_LEADERS)
+    room.payloads["ws_extras"] = extras
+    return extras
+
+def room_snapshot(room: Room) -> dict:
+    """Полный снимок состояния комнаты (отправляется при подключении)"""
+    return {
+        "type": "snapshot",
+        "v": PROTOCOL_VERSION,
+        **stage_fields(room),
+        **stage_extras(room),
+        "users": list(room.users.names),
+    }
+
+def legacy_frame_size(room: Room) -> int:
+    """Размер кадра прежнего протокола без повторной сериализации списка имен"""
+    sent = last_sent[room.id]
+    empty = json.dumps({**stage_fields(room), "users": []}, separators=(",", ":"))
+    return len(empty) + sent["legacy_users_bytes"] + max(0, sent["user_count"] - 1)
+
+def collect_events(room: Room) -> list:
+    """Сравнивает комнату с последним разосланным состоянием и возвращает события"""
+    fields = stage_fields(room)
+    sent = last_sent.setdefault(room.id, {})
+    if sent.get("epoch") != room.epoch:
+        # Новый цикл (или первый тик): список участников заменяется целиком
+        snapshot = room_snapshot(room)
+        sent.clear()
+        sent.update(
+            fields,
+            epoch=room.epoch,
+            user_count=len(snapshot["users"]),
+            legacy_users_bytes=sum(len(json.dumps(name)) for name in snapshot["users"]),
+        )
+        return [snapshot]
+
+    events = []
+    user_count = len(room.users)
+    if user_count > sent["user_count"]:
+        offset = sent["user_count"]
+        joined = room.users.names[offset:]
+        events.append({"type": "user_joined", "offset": offset, "users": joined})
+        sent["legacy_users_bytes"] += sum(len(json.dumps(name)) for name in joined)
+        sent["user_count"] = user_count
+
+    if any(fields[key] != sent[key] for key in ("stage", "current_question", "question_count")):
+        events.append({"type": "stage", **fields, **stage_extras(room)})
+    elif fields["timer"] != sent["timer"]:
+        events.append({"type": "timer", "timer": fields["timer"]})
+    sent.update(fields)
+    return events
+
+async def send_or_drop(websocket: WebSocket, text: str, clients: Set[WebSocket]) -> bool:
+    """Отправка с таймаутом; медленный или отвалившийся клиент отключается"""
+    try:
+        await asyncio.wait_for(websocket.send_text(text), SEND_TIMEOUT)
+        return True
+    except Exception as e:
+        if websocket in clients:
+            clients.discard(websocket)
+            logger.info(f"🐢 Dropping slow WebSocket client: {e!r}. Total connections: {total_connections()}")
+            asyncio.create_task(close_quietly(websocket))
+        return False
+
+async def close_quietly(websocket: WebSocket):
+    try:
+        await asyncio.wait_for(websocket.close(), SEND_TIMEOUT)
+    except Exception:
+        pass
+
+async def broadcast(clients: Set[WebSocket], text: str):
+    """Рассылает уже сериализованный кадр всем клиентам комнаты"""
+    if not clients:
+        return
+    await asyncio.gather(*(send_or_drop(ws, text, clients) for ws in list(clients)))
+
+def encoding_of(websocket: WebSocket) -> str:
+    session = sessions.get(websocket)
+    return session.encoding if session is not None else "json"
+
+async def broadcast_room(room: Room):
+    # События считаются и нумеруются и без клиентов: переподключившимся нужны все кадры
+    events = collect_events(room)
+    log = room_log(room.id)
+    encoded = [log.add(event) for event in events]
+    clients = connections.get(room.id)
+    if not clients:
+        return
+    groups: Dict[str, List[WebSocket]] = {}
+    for websocket in clients:
+        groups.setdefault(encoding_of(websocket), []).append(websocket)
+    recipients = len(clients)
+    traffic["bytes_legacy"] += legacy_frame_size(room) * recipients
+    for event, texts in zip(events, encoded):
+        traffic["frames"] += recipients
+        traffic["bytes_sent"] += sum(len(texts[encoding].encode()) * len(group) for encoding, group in groups.items())
+        await asyncio.gather(*(
+            send_or_drop(websocket, texts[encoding], clients) for encoding, group in groups.items() for websocket in group
+        ))
+        if event["type"] == "stage" and event["stage"] == "pause":
+            await send_results(room, clients)
+
+async def send_results(room: Room, clients: Set[WebSocket]):
+    """Личный итог вопроса каждому авторизованному сокету вместо GET /api/room/me от каждого"""
+    frames = []
+    for websocket in list(clients):
+        session = sessions.get(websocket)
+        if session is None or session.user is None or session.epoch != room.epoch:
+            continue
+        result = personal_result(room, session.user)
+        if result is not None:
+            frames.append((websocket, encode({"type": "result", **result}, session.encoding)))
+    traffic["frames"] += len(frames)
+    traffic["bytes_sent"] += sum(len(text.encode()) for _, text in frames)
+    await asyncio.gather(*(send_or_drop(websocket, text, clients) for websocket, text in frames))
+
+def drop_removed_rooms():
+    """Закрывает сокеты комнат, которые были удалены"""
+    for room_id in list(connections):
+        if rooms.get(room_id) is None:
+            for websocket in connections.pop(room_id):
+                asyncio.create_task(close_quietly(websocket))
+    for room_id in list(last_sent):
+        if rooms.get(room_id) is None:
+            del last_sent[room_id]
+    for room_id in list(history):
+        if rooms.get(room_id) is None:
+            del history[room_id]
+
+async def broadcast_loop():
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    while True:
+        # Тики по абсолютному времени, чтобы медленная рассылка не сдвигала расписание;
+        # при ускоренных часах таймер меняется чаще, и тики тоже (но не чаще MIN_INTERVAL)
+        next_tick += max(MIN_INTERVAL, clock.current().real_delay(BROADCAST_INTERVAL) or BROADCAST_INTERVAL)
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
+        try:
+            frames, sent = traffic["frames"], traffic["bytes_sent"]
+            with broadcast_seconds.time():
+                drop_removed_rooms()
+                await asyncio.gather(*(broadcast_room(room) for room in rooms))
+            tick_frames.observe(traffic["frames"] - frames)
+            tick_bytes.observe(traffic["bytes_sent"] - sent)
+        except Exception as e:
+            logger.error(f"❌ Broadcast error: {e}")
+
+def start_broadcaster():
+    global BROADCAST_TASK
+    if BROADCAST_TASK and not BROADCAST_TASK.done():
+        return
+    BROADCAST_TASK = asyncio.create_task(broadcast_loop())
+
+def votes_key(room: Room) -> tuple:
+    return room.epoch, room.stage, room.current_question, room.answers.count, len(room.users)
+
+def votes_frame(room: Room, with_question: bool) -> str:
+    frame = {"type": "votes", **votes_payload(room)}
+    if with_question and room.current_question < len(room.public_questions):
+        # Текст и варианты — только при смене вопроса или стадии, а не в каждом кадре
+        frame["question_data"] = room.public_questions[room.current_question]
+    return encode(frame)
+
+async def presenter_loop():
+    while True:
+        await asyncio.sleep(PRESENTER_INTERVAL)
+        try:
+            for room_id, clients in list(presenters.items()):
+                room = rooms.get(room_id)
+                if room is None:
+                    for websocket in presenters.pop(room_id):
+                        asyncio.create_task(close_quietly(websocket))
+                    presenter_sent.pop(room_id, None)
+                    continue
+                key = votes_key(room)
+                sent = presenter_sent.get(room_id)
+                if key == sent or not clients:
+                    continue
+                presenter_sent[room_id] = key
+                await broadcast(clients, votes_frame(room, sent is None or key[:3] != sent[:3]))
+        except Exception as e:
+            logger.error(f"❌ Presenter broadcast error: {e}")
+
+def start_presenter_loop():
+    global PRESENTER_TASK
+    if PRESENTER_TASK and not PRESENTER_TASK.done():
+        return
+    PRESENTER_TASK = asyncio.create_task(presenter_loop())
+
+class Session:
+    """Одно подключение: согласованные версия и кодировка, авторизация (токен проверяется один раз)"""
+    __slots__ = ("user", "epoch", "version", "encoding")
+
+    def __init__(self, version: int = PROTOCOL_VERSION, encoding: str = "json"):
+        self.user: Optional[str] = None
+        self.epoch = -1
+        self.version = version
+        self.encoding = encoding
+
+def negotiate(version: Optional[int], encoding: Optional[str]) -> Session:
+    """Версия — не выше своей; компактная кодировка — только клиентам, которые ее знают"""
+    version = PROTOCOL_VERSION if version is None else max(1, min(version, PROTOCOL_VERSION))
+    if encoding not in ENCODINGS or (encoding == "compact" and version < COMPACT_SINCE):
+        encoding = "json"
+    return Session(version, encoding)
+
+def error_reply(error: str, detail: str, msg_id=None) -> dict:
+    return {"type": "error", "id": msg_id, "error": error, "detail": detail}
+
+async def handle_message(room_id: str, session: Session, msg) -> dict:
+    """Сообщение клиента → ответ сокету.
+
+    {"type": "auth", "token": ...} — один раз после подключения;
+    {"type": "answer", "answer": i, "id": ...} — ack с временем получения ответа.
+    """
+    received = clock.now()
+    room = rooms.get(room_id)
+    if not isinstance(msg, dict) or room is None:
+        return error_reply("bad_request", "Неизвестное сообщение")
+    msg_id = msg.get("id")
+    kind = msg.get("type")
+
+    if kind == "auth":
+        token = msg.get("token")
+        user = verify_token(token, room_id, room.game) if isinstance(token, str) else None
+        if user is None:
+            return error_reply("unauthorized", "Недействительный токен", msg_id)
+        session.user, session.epoch = user, room.epoch
+        reply = {"type": "auth", "id": msg_id, "user": user}
+        if room.stage == "pause":
+            # Кадр result мог разойтись, пока сокет переподключался
+            reply["result"] = personal_result(room, user)
+        return reply
+
+    if kind == "answer":
+        # Новый цикл — новые участники с теми же именами: нужна повторная авторизация
+        if session.user is None or session.epoch != room.epoch:
+            return error_reply("unauthorized", "Нужна авторизация", msg_id)
+        answer = msg.get("answer")
+        if not isinstance(answer, int) or isinstance(answer, bool):
+            error = "invalid"
+        else:
+            error = await accept_answer(room, session.user, answer, received)
+        if error is not None:
+            ws_answers["rejected"] += 1
+            return error_reply(error, ANSWER_ERRORS[error][1], msg_id)
+        ws_answers["accepted"] += 1
+        metrics.answers_total.inc("ws")
+        return {
+            "type": "ack",
+            "id": msg_id,
+            "question": room.current_question,
+            # Момент, от которого считаются баллы: время сервера и остаток до дедлайна
+            "received": round(time.time() - (clock.now() - received) / (clock.current().speed or 1), 3),
+            "remaining_ms": int((room.deadline - received) * 1000),
+        }
+
+    return error_reply("bad_request", "Неизвестное сообщение", msg_id)
 
 @ws_router.get("/ws/status")
 async def ws_status():
     """Проверка статуса WebSocket подключений"""
     return {
-        "active_connections": len(connections),
-        "connections": [str(conn.client.host) for conn in connections]
+        "worker": store.worker_id,
+        "active_connections": total_connections(),
+        "rooms": {room_id: len(clients) for room_id, clients in connections.items()},
+        "connections": [str(conn.client.host) for clients in connections.values() for conn in clients],
+        "protocol_version": PROTOCOL_VERSION,
+        "encodings": {
+            encoding: sum(session.encoding == encoding for session in sessions.values()) for encoding in ENCODINGS
+        },
+        "answers": ws_answers,
+        "presenters": {room_id: len(clients) for room_id, clients in presenters.items()},
+        "reconnects": reconnects,
+        "journal": journal.status(),
+        "rate_limit": limiter.status(),
+        "traffic": {
+            **traffic,
+            "bytes_saved": traffic["bytes_legacy"] - traffic["bytes_sent"],
+        },
     }
 
+async def send_initial(websocket: WebSocket, room: Room, clients: Set[WebSocket], session: Session,
+                       since: Optional[int], stream: Optional[str]) -> bool:
+    """Начало подключения: пропущенные кадры, если клиент продолжает, иначе снимок.
+    Затем догоняем кадры, разосланные за время отправки, и только после этого
+    (без await между проверкой и добавлением) сокет попадает в рассылку."""
+    log = room_log(room.id)
+    missed = log.since(since) if since is not None and stream == STREAM else None
+    if missed is None:
+        if since is not None:
+            reconnects["snapshot"] += 1
+        last = log.seq
+        text = encode({
+            **room_snapshot(room), "v": session.version, "enc": session.encoding, "stream": STREAM, "seq": last,
+        }, session.encoding)
+        if not await send_or_drop(websocket, text, clients):
+            return False
+    else:
+        missed = coalesce(missed)
+        reconnects["resumed"] += 1
+        reconnects["resumed_frames"] += len(missed)
+        last = log.seq
+        header = {
+            "type": "resumed", "v": session.version, "enc": session.encoding, "stream": STREAM,
+            "seq": last, "missed": len(missed),
+        }
+        if session.version >= BATCH_RESUME_SINCE:
+            # Все пропущенное — одним кадром: одна отправка вместо отправки на каждый кадр
+            text = encode_with_frames(header, [texts[session.encoding] for _, _, texts in missed], session.encoding)
+            if not await send_or_drop(websocket, text, clients):
+                return False
+        else:
+            header["seq"] = since
+            if not await send_or_drop(websocket, encode(header, session.encoding), clients):
+                return False
+            for _, _, texts in missed:
+                if not await send_or_drop(websocket, texts[session.encoding], clients):
+                    return False
+    while True:
+        missed = log.since(last)
+        if missed is None:
+            # Отстали больше, чем помнит журнал, пока отправляли: начинаем заново со снимка
+            return await send_initial(websocket, room, clients, session, None, None)
+        if not missed:
+            clients.add(websocket)
+            return True
+        for seq, _, texts in missed:
+            if not await send_or_drop(websocket, texts[session.encoding], clients):
+                return False
+            last = seq
+
+def query_int(params, name: str) -> Optional[int]:
+    try:
+        return int(params[name])
+    except (KeyError, ValueError):
+        return None
+
 @ws_router.websocket("/ws/room")
-async def ws_room(websocket: WebSocket):
-    logger.info(f"🔌 WebSocket connection attempt from {websocket.client.host}")
+async def ws_default_room(websocket: WebSocket):
+    await ws_room(websocket, DEFAULT_ROOM_ID)
+
+@ws_router.websocket("/ws/rooms/{room_id}")
+async def ws_room(websocket: WebSocket, room_id: str):
+    """Параметры адреса: since и stream — номер последнего полученного кадра и поток, из
+    которого он пришел; v и enc — версия протокола клиента и желаемая кодировка (json или
+    compact). Они читаются здесь, а не параметрами FastAPI: разбор зависимостей стоил
+    около миллисекунды на подключение, заметно при переподключении всего зала"""
+    params = websocket.query_params
+    since, stream, v, enc = query_int(params, "since"), params.get("stream"), query_int(params, "v"), params.get("enc")
+    logger.info(f"🔌 WebSocket connection attempt from {websocket.client.host} to room {room_id}")
+    room = rooms.get(room_id)
+    if room is None:
+        await websocket.close(code=4404)
+        return
     await websocket.accept()
-    connections.add(websocket)
-    logger.info(f"✅ WebSocket connected. Total connections: {len(connections)}")
-    
+    start_broadcaster()
+    clients = connections.setdefault(room_id, set())
+    session = sessions[websocket] = negotiate(v, enc)
     try:
+        if not await send_initial(websocket, room, clients, session, since, stream):
+            return
+        logger.info(f"✅ WebSocket connected. Total connections: {total_connections()}")
         while True:
-            await asyncio.sleep(1)
-            data = {
-                "stage": room.stage,
-                "timer": room.timer,
-                "users": [u.name for u in get_users()],
-                "current_question": getattr(room, 'current_question', 0),
-                "question_count": len(getattr(room, 'questions', [])),
-            }
-            await websocket.send_json(data)
-            logger.debug(f"📨 Sent WebSocket data: {data}")
+            text = await websocket.receive_text()
+            try:
+                msg = json.loads(text)
+            except ValueError:
+                reply = error_reply("bad_request", "Ожидался JSON")
+            else:
+                reply = await handle_message(room_id, session, msg)
+            if not await send_or_drop(websocket, encode(reply, session.encoding), clients):
+                return
     except WebSocketDisconnect:
-        connections.remove(websocket)
-        logger.info(f"🔌 WebSocket disconnected. Total connections: {len(connections)}")
+        clients.discard(websocket)
+        logger.info(f"🔌 WebSocket disconnected. Total connections: {total_connections()}")
     except Exception as e:
         logger.error(f"❌ WebSocket error: {e}")
-        connections.discard(websocket) 
\ No newline at end of file
+        clients.discard(websocket)
+    finally:
+        sessions.pop(websocket, None)
+
+@ws_router.websocket("/ws/presenter")
+async def ws_default_presenter(websocket: WebSocket):
+    await ws_presenter(websocket, DEFAULT_ROOM_ID)
+
+@ws_router.websocket("/ws/rooms/{room_id}/presenter")
+async def ws_presenter(websocket: WebSocket, room_id: str):
+    """Экран ведущего: кадры votes с распределением ответов, сообщения клиента игнорируются"""
+    room = rooms.get(room_id)
+    if room is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    start_presenter_loop()
+    clients = presenters.setdefault(room_id, set())
+    if not await send_or_drop(websocket, votes_frame(room, True), clients):
+        return
+    clients.add(websocket)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"❌ Presenter WebSocket error: {e}")
+    finally:
+        clients.discard(websocket)
@@ -4,6 +4,7 @@ import RoomPage from './RoomPage';
 import RegisterPage from './RegisterPage';
 import QuizPage from './QuizPage';
 import ResultsPage from './ResultsPage';
+import PresenterPage from './PresenterPage';
 import DuckBackground from './DuckBackground';
 
 // Компонент для автоматического перенаправления
@@ -12,8 +13,8 @@ function AutoRedirect({ user, roomStage, isLoading }) {
   const navigate = useNavigate();
 
   useEffect(() => {
-    // Не перенаправляем, пока данные загружаются
-    if (isLoading) return;
+    // Не перенаправляем, пока данные загружаются; экран ведущего не зависит от стадии
+    if (isLoading || location.pathname === '/presenter') return;
 
     const getTargetRoute = () => {
       if (roomStage === 'registration') {
@@ -178,6 +179,8 @@ function App() {
             } 
           />
           
+          <Route path="/presenter" element={<PresenterPage />} />
+          
           <Route path="*" element={<Navigate to="/room" replace />} />
         </Routes>
       </div>
@@ -0,0 +1,84 @@
+import React, { useEffect, useState } from 'react';
+import { reconnectDelay } from './roomEvents';
+
+// Экран ведущего: как зал отвечает на текущий вопрос. Сервер присылает
+// кадры votes не чаще 5 раз в секунду, текст вопроса — только при его смене.
+function PresenterPage() {
+  const [votes, setVotes] = useState(null);
+  const [question, setQuestion] = useState(null);
+
+  useEffect(() => {
+    let ws = null;
+    let closed = false;
+    let reconnectTimer = null;
+
+    const connect = () => {
+      const wsProtocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+      ws = new WebSocket(`${wsProtocol}://${window.location.host}/ws/presenter`);
+      ws.onmessage = (e) => {
+        try {
+          const msg = JSON.parse(e.data);
+          if (msg.type !== 'votes') return;
+          if (msg.question_data) setQuestion(msg.question_data);
+          setVotes(msg);
+        } catch (error) {
+          console.error('❌ Presenter message error:', error);
+        }
+      };
+      ws.onclose = () => {
+        if (!closed) reconnectTimer = setTimeout(connect, reconnectDelay());
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      if (ws) ws.close();
+    };
+  }, []);
+
+  if (!votes || !question || (votes.stage !== 'quiz' && votes.stage !== 'pause')) {
+    return (
+      <div style={{ maxWidth: 960, margin: '40px auto', fontFamily: 'sans-serif', fontSize: 32, textAlign: 'center' }}>
+        {votes ? `Участников: ${votes.total}` : 'Подключение...'}
+      </div>
+    );
+  }
+
+  const max = Math.max(1, ...votes.votes);
+  return (
+    <div style={{ maxWidth: 960, margin: '40px auto', fontFamily: 'sans-serif' }}>
+      <div style={{ fontSize: 20, color: '#888', marginBottom: 8 }}>
+        Вопрос {votes.question + 1} · {question.theme}
+      </div>
+      <div style={{ fontSize: 36, fontWeight: 700, marginBottom: 24 }}>{question.text}</div>
+      {question.options.map((opt, i) => {
+        const count = votes.votes[i] || 0;
+        const isCorrect = votes.correct_index === i;
+        return (
+          <div key={i} style={{ marginBottom: 16 }}>
+            <div style={{ display: 'flex', justifyContent: 'space-between', fontSize: 24, marginBottom: 4 }}>
+              <span style={{ fontWeight: isCorrect ? 700 : 400 }}>{isCorrect ? '✅ ' : ''}{opt}</span>
+              <span>{count}</span>
+            </div>
+            <div style={{ background: '#eee', borderRadius: 8, height: 28 }}>
+              <div style={{
+                width: `${(count / max) * 100}%`,
+                height: '100%',
+                borderRadius: 8,
+                background: isCorrect ? '#28a745' : '#007bff',
+                transition: 'width 0.2s',
+              }} />
+            </div>
+          </div>
+        );
+      })}
+      <div style={{ fontSize: 24, color: '#888', marginTop: 24, textAlign: 'center' }}>
+        Ответили {votes.answered} из {votes.total}
+      </div>
+    </div>
+  );
+}
+
+export default PresenterPage;
@@ -1,4 +1,5 @@
 import React, { useEffect, useState, useRef } from 'react';
+import { applyRoomEvent, createResume, trackResume, roomSocketUrl, reconnectDelay, roomMessages } from './roomEvents';
 
 function QuizPage({ user, token }) {
   const [question, setQuestion] = useState(null);
@@ -12,39 +13,55 @@ function QuizPage({ user, token }) {
   const [currentQuestion, setCurrentQuestion] = useState(0);
   const [questionCount, setQuestionCount] = useState(0);
   const [isAuthenticated, setIsAuthenticated] = useState(false);
+  const [summary, setSummary] = useState(null);
   const prevCurrentQuestion = useRef(null);
+  // Номер вопроса, пришедшего в кадре стадии и уже показанного
+  const shownQuestion = useRef(null);
+  const roomState = useRef({});
+  // Сокет комнаты: по нему же отправляются ответы после авторизации
+  const wsRef = useRef(null);
+  const wsAuthed = useRef(false);
+  const pending = useRef({});
+  const nextMessageId = useRef(1);
 
   // Проверяем аутентификацию
   useEffect(() => {
     setIsAuthenticated(!!token && !!user);
   }, [token, user]);
 
-  // Функция для получения вопроса
+  const showQuestion = (q) => {
+    setQuestion(q);
+    setSelected(null);
+    setSubmitting(false);
+    setAnswered(false);
+    setResult(null);
+    setShowResult(false);
+    setSummary(null);
+  };
+
+  // Функция для получения вопроса (если его не принес кадр стадии)
   const fetchQuestion = async () => {
     try {
       const response = await fetch('/api/room/question');
       const q = await response.json();
       if (q.question) {
-        setQuestion(q.question);
-        setSelected(null);
-        setSubmitting(false);
-        setAnswered(false);
-        setResult(null);
-        setShowResult(false);
+        showQuestion(q.question);
       }
     } catch (error) {
       console.error('Error fetching question:', error);
     }
   };
 
-  // Функция для получения результатов
+  // Функция для получения результатов (только свои баллы, без всей таблицы)
   const fetchResults = async () => {
+    if (!token) return;
     try {
-      const response = await fetch('/api/room/leaderboard');
-      const results = await response.json();
-      const userResult = results.find(r => r.name === user);
-      if (userResult) {
-        setScore(userResult.score);
+      const response = await fetch('/api/room/me', {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      if (response.ok) {
+        const me = await response.json();
+        setScore(me.score);
       }
     } catch (error) {
       console.error('Error fetching results:', error);
@@ -54,37 +71,81 @@ function QuizPage({ user, token }) {
   useEffect(() => {
     let ws = null;
     let wsConnected = false;
+    // После размонтирования (или смены токена) старый сокет не переподключается
+    let closed = false;
+    let reconnectTimer = null;
+    const resume = createResume();
     
     const connectWebSocket = () => {
       try {
-        const wsProtocol = window.location.protocol === "https:" ? "wss" : "ws";
-        const wsHost = window.location.host;
-        const wsUrl = `${wsProtocol}://${wsHost}/ws/room`;
+        const wsUrl = roomSocketUrl(resume);
         console.log('Attempting WebSocket connection in QuizPage to', wsUrl);
         ws = new WebSocket(wsUrl);
+        wsRef.current = ws;
+        wsAuthed.current = false;
         
         ws.onopen = () => {
           console.log('✅ WebSocket connected in QuizPage');
           wsConnected = true;
+          if (token) {
+            ws.send(JSON.stringify({ type: 'auth', token }));
+          }
         };
         
-        ws.onmessage = (e) => {
-          try {
-            const data = JSON.parse(e.data);
-            console.log('📨 WebSocket message in QuizPage:', data);
-            setTimer(data.timer);
-            setQuestionCount(data.question_count || 0);
-            // Если номер вопроса изменился — обновляем вопрос
-            if (data.current_question !== prevCurrentQuestion.current) {
-              setCurrentQuestion(data.current_question || 0);
-              prevCurrentQuestion.current = data.current_question;
-              fetchQuestion();
+        const handleMessage = (msg) => {
+          console.log('📨 WebSocket message in QuizPage:', msg);
+          trackResume(resume, msg);
+          if (msg.type === 'auth') {
+            wsAuthed.current = true;
+            if (msg.result) setScore(msg.result.score);
+            return;
+          }
+          if (msg.type === 'result') {
+            // Личный итог вопроса приходит сам, без запроса /api/room/me
+            setScore(msg.score);
+            return;
+          }
+          if (msg.type === 'ack' || msg.type === 'error') {
+            if (msg.error === 'unauthorized') {
+              wsAuthed.current = false;
             }
-            // Если стадия изменилась на pause, показываем результаты
-            if (data.stage === 'pause') {
-              setShowResult(true);
-              fetchResults();
+            const resolve = pending.current[msg.id];
+            if (resolve) {
+              delete pending.current[msg.id];
+              resolve(msg);
             }
+            return;
+          }
+          const data = applyRoomEvent(roomState.current, msg);
+          roomState.current = data;
+          setTimer(data.timer);
+          setQuestionCount(data.question_count || 0);
+          // Если номер вопроса изменился — обновляем вопрос
+          if (data.current_question !== prevCurrentQuestion.current) {
+            setCurrentQuestion(data.current_question || 0);
+            prevCurrentQuestion.current = data.current_question;
+            if (!data.question) fetchQuestion();
+          }
+          // Вопрос пришел вместе со сменой стадии — запрашивать его не нужно
+          if (data.stage === 'quiz' && data.question && shownQuestion.current !== data.current_question) {
+            shownQuestion.current = data.current_question;
+            showQuestion(data.question);
+          } else if (data.stage !== 'quiz' && data.stage !== 'pause') {
+            shownQuestion.current = null;
+          }
+          // Если стадия изменилась на pause, показываем результаты
+          if (msg.type !== 'timer' && data.stage === 'pause') {
+            setShowResult(true);
+            setSummary(data.summary);
+            // Авторизованный сокет получит свой итог кадром result
+            if (!wsAuthed.current) fetchResults();
+          }
+        };
+
+        ws.onmessage = (e) => {
+          try {
+            // Кадр resumed несет все пропущенные кадры сразу
+            roomMessages(e.data).forEach(handleMessage);
           } catch (error) {
             console.error('❌ WebSocket message error in QuizPage:', error);
           }
@@ -98,7 +159,11 @@ function QuizPage({ user, token }) {
         ws.onclose = (event) => {
           console.log('🔌 WebSocket disconnected in QuizPage. Code:', event.code, 'Reason:', event.reason);
           wsConnected = false;
-          setTimeout(connectWebSocket, 5000);
+          wsAuthed.current = false;
+          // Ответы без ack уйдут повторно через HTTP
+          Object.values(pending.current).forEach((resolve) => resolve(null));
+          pending.current = {};
+          if (!closed) reconnectTimer = setTimeout(connectWebSocket, reconnectDelay());
         };
       } catch (error) {
         console.error('❌ Failed to create WebSocket in QuizPage:', error);
@@ -129,12 +194,14 @@ function QuizPage({ user, token }) {
     }, 5000);
     
     return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
       if (ws) {
         ws.close();
       }
       clearInterval(fallbackInterval);
     };
-  }, [user]);
+  }, [user, token]);
 
   // Получаем первый вопрос при загрузке
   useEffect(() => {
@@ -147,6 +214,28 @@ function QuizPage({ user, token }) {
     setSelected(idx);
     setSubmitting(true);
     
+    const ws = wsRef.current;
+    if (ws && ws.readyState === WebSocket.OPEN && wsAuthed.current) {
+      const id = nextMessageId.current++;
+      const reply = await new Promise((resolve) => {
+        pending.current[id] = resolve;
+        ws.send(JSON.stringify({ type: 'answer', answer: idx, id }));
+      });
+      if (reply && reply.type === 'ack') {
+        setResult('Ответ принят!');
+        setAnswered(true);
+        setSubmitting(false);
+        return;
+      }
+      if (reply && reply.error !== 'unauthorized') {
+        setResult(reply.detail || 'Ошибка');
+        setSubmitting(false);
+        setSelected(null);
+        return;
+      }
+      // Сокет закрылся или сессия устарела — отправляем через HTTP
+    }
+
     try {
       const res = await fetch('/api/room/answer', {
         method: 'POST',
@@ -247,6 +336,11 @@ function QuizPage({ user, token }) {
           {result}
         </div>
       )}
+      {showResult && summary && question.options[summary.correct_index] !== undefined && (
+        <div style={{ marginTop: 8, fontSize: 18, color: '#28a745', textAlign: 'center' }}>
+          Правильный ответ: {question.options[summary.correct_index]} (верно ответили {summary.correct} из {summary.answers})
+        </div>
+      )}
       {showResult && isAuthenticated && (
         <div style={{ marginTop: 8, fontSize: 18, color: '#007bff', textAlign: 'center' }}>
           Ваши баллы: {score}
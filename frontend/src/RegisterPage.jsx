@@ -6,6 +6,26 @@ function validateName(name) {
   return /^[a-zA-Zа-яА-Я0-9 .]+$/.test(name.trim()) && name.trim().length > 0;
 }
 
+// Сколько раз повторять регистрацию после 429 (сервер сообщает паузу в Retry-After)
+const MAX_RETRIES = 5;
+
+function retryDelay(res) {
+  const seconds = parseFloat(res.headers.get('Retry-After'));
+  // Разброс, чтобы отклоненные разом не пришли снова разом
+  return (Number.isFinite(seconds) ? seconds : 1) * 1000 + Math.random() * 1000;
+}
+
+// Ключ браузера для ограничения частоты: в общем зале у всех один IP, а повторы
+// одного клиента сервер считает по X-Client-Id
+function clientId() {
+  let id = localStorage.getItem('quiz_client');
+  if (!id) {
+    id = Math.random().toString(36).slice(2) + Date.now().toString(36);
+    localStorage.setItem('quiz_client', id);
+  }
+  return id;
+}
+
 function RegisterPage({ setUser, setToken }) {
   const [name, setName] = useState('');
   const [valid, setValid] = useState(false);
@@ -39,13 +59,20 @@ function RegisterPage({ setUser, setToken }) {
     setError('');
     
     try {
-      const res = await fetch('/api/room/register', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ name: name.trim() })
-      });
+      let res;
+      for (let attempt = 0; ; attempt++) {
+        res = await fetch('/api/room/register', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json', 'X-Client-Id': clientId() },
+          body: JSON.stringify({ name: name.trim() })
+        });
+        if (res.status !== 429 || attempt >= MAX_RETRIES) break;
+        setError('Много желающих, повторяем регистрацию...');
+        await new Promise(resolve => setTimeout(resolve, retryDelay(res)));
+      }
       
       if (res.ok) {
+        setError('');
         const data = await res.json();
         setRegistered(true);
         
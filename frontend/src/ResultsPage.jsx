@@ -1,13 +1,15 @@
 import React, { useEffect, useState } from 'react';
+import { applyRoomEvent, roomSocketUrl, decodeFrame } from './roomEvents';
 
 const medals = ['🥇', '🥈', '🥉'];
+const LEADERS_LIMIT = 100;
 
 function ResultsPage() {
   const [leaders, setLeaders] = useState([]);
 
   const fetchResults = async () => {
     try {
-      const response = await fetch('/api/room/leaderboard');
+      const response = await fetch(`/api/room/leaderboard?limit=${LEADERS_LIMIT}`);
       const data = await response.json();
       setLeaders(data);
     } catch (error) {
@@ -18,21 +20,25 @@ function ResultsPage() {
   useEffect(() => {
     // Получаем результаты сразу
     fetchResults();
-    const wsProtocol = window.location.protocol === "https:" ? "wss" : "ws";
-    const wsHost = window.location.host;
-    const wsUrl = `${wsProtocol}://${wsHost}/ws/room`;
-    const ws = new WebSocket(wsUrl);
+    const ws = new WebSocket(roomSocketUrl(null));
     
     ws.onopen = () => {
       console.log('WebSocket connected in ResultsPage');
     };
     
+    let room = {};
     ws.onmessage = (e) => {
       try {
-        const data = JSON.parse(e.data);
-        // Обновляем результаты при изменении стадии
+        const msg = decodeFrame(e.data);
+        if (msg.type === 'timer') return;
+        const data = room = applyRoomEvent(room, msg);
+        // Обновляем результаты при изменении стадии: таблица приходит в кадре стадии
         if (data.stage === 'results') {
-          fetchResults();
+          if (data.leaders) {
+            setLeaders(data.leaders);
+          } else {
+            fetchResults();
+          }
         }
       } catch (error) {
         console.error('WebSocket message error:', error);
@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
+import { applyRoomEvent, createResume, trackResume, roomSocketUrl, reconnectDelay, roomMessages } from './roomEvents';
 
 function RoomPage({ user, token, onLogout }) {
   const [data, setData] = useState({ stage: '', timer: 0, users: [] });
@@ -27,26 +28,36 @@ function RoomPage({ user, token, onLogout }) {
     // Затем подключаем WebSocket
     let ws = null;
     let wsConnected = false;
+    // После размонтирования сокет не переподключается
+    let closed = false;
+    let reconnectTimer = null;
+    const resume = createResume();
     
     const connectWebSocket = () => {
       try {
-        const wsProtocol = window.location.protocol === "https:" ? "wss" : "ws";
-        const wsHost = window.location.host;
-        const wsUrl = `${wsProtocol}://${wsHost}/ws/room`;
+        const wsUrl = roomSocketUrl(resume);
         console.log('Attempting WebSocket connection to', wsUrl);
         ws = new WebSocket(wsUrl);
         
         ws.onopen = () => {
           console.log('✅ WebSocket connected successfully');
+          wsConnected = true;
           setWsConnected(true);
         };
         
         ws.onmessage = (e) => {
           try {
-            const d = JSON.parse(e.data);
-            console.log('📨 WebSocket message received:', d);
-            setData(d);
-            setQuestionInfo({ current: (d.current_question || 0) + 1, total: d.question_count || 0 });
+            // Кадр resumed несет все пропущенные кадры сразу
+            const messages = roomMessages(e.data);
+            messages.forEach((msg) => {
+              console.log('📨 WebSocket message received:', msg);
+              trackResume(resume, msg);
+            });
+            setData(prev => {
+              const d = messages.reduce(applyRoomEvent, prev);
+              setQuestionInfo({ current: (d.current_question || 0) + 1, total: d.question_count || 0 });
+              return d;
+            });
           } catch (error) {
             console.error('❌ WebSocket message error:', error);
           }
@@ -54,14 +65,16 @@ function RoomPage({ user, token, onLogout }) {
         
         ws.onerror = (error) => {
           console.error('❌ WebSocket error:', error);
+          wsConnected = false;
           setWsConnected(false);
         };
         
         ws.onclose = (event) => {
           console.log('🔌 WebSocket disconnected. Code:', event.code, 'Reason:', event.reason);
+          wsConnected = false;
           setWsConnected(false);
-          // Пробуем переподключиться через 5 секунд
-          setTimeout(connectWebSocket, 5000);
+          // Переподключаемся и продолжаем с последнего полученного кадра
+          if (!closed) reconnectTimer = setTimeout(connectWebSocket, reconnectDelay());
         };
       } catch (error) {
         console.error('❌ Failed to create WebSocket:', error);
@@ -79,6 +92,8 @@ function RoomPage({ user, token, onLogout }) {
     }, 5000);
     
     return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
       if (ws) {
         ws.close();
       }
@@ -0,0 +1,97 @@
+// Применение событий протокола /ws/room к локальному состоянию комнаты.
+// Сервер шлет полный снимок при подключении, дальше — только изменения.
+// Снимок и кадр стадии несут данные стадии: вопрос (quiz), итог вопроса (pause),
+// таблицу лидеров (results); у старого сервера их нет — тогда они null.
+function stageData(msg) {
+  return {
+    stage: msg.stage,
+    timer: msg.timer,
+    current_question: msg.current_question,
+    question_count: msg.question_count,
+    question: msg.question || null,
+    summary: msg.summary || null,
+    leaders: msg.leaders || null,
+  };
+}
+
+export function applyRoomEvent(state, msg) {
+  switch (msg.type) {
+    case 'snapshot':
+      return { ...stageData(msg), users: msg.users };
+    case 'stage':
+      return { ...state, ...stageData(msg) };
+    case 'timer':
+      return { ...state, timer: msg.timer };
+    case 'user_joined':
+      // offset — позиция первого нового участника, повторная доставка ничего не ломает
+      return { ...state, users: (state.users || []).slice(0, msg.offset).concat(msg.users) };
+    default:
+      return state;
+  }
+}
+
+// Продолжение после переподключения: сервер нумерует кадры (seq) в пределах
+// потока (stream) своего процесса. С ними в адресе клиент получает только
+// пропущенные кадры (одним кадром resumed), а если сервер их уже не помнит — обычный снимок.
+export function createResume() {
+  return { stream: null, seq: null };
+}
+
+export function trackResume(resume, msg) {
+  if (msg.stream) resume.stream = msg.stream;
+  if (typeof msg.seq === 'number') resume.seq = msg.seq;
+}
+
+// Версия протокола клиента: с 5-й сервер отдает кадры в компактной кодировке,
+// с 6-й присылает пропущенные кадры внутри кадра resumed (frames)
+const PROTOCOL_VERSION = 6;
+
+export function roomSocketUrl(resume) {
+  const wsProtocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+  const url = `${wsProtocol}://${window.location.host}/ws/room?v=${PROTOCOL_VERSION}&enc=compact`;
+  if (resume && resume.stream && resume.seq !== null) {
+    return `${url}&stream=${resume.stream}&since=${resume.seq}`;
+  }
+  return url;
+}
+
+// Компактная кодировка: короткие ключи и типы кадров (те же таблицы, что в backend/codec.py)
+const COMPACT_KEYS = {
+  t: 'type', s: 'stage', r: 'timer', q: 'current_question', n: 'question_count',
+  u: 'users', o: 'offset', i: 'seq', m: 'stream', x: 'question', y: 'summary',
+  l: 'leaders', k: 'missed', d: 'id', e: 'error', w: 'detail', a: 'user',
+  z: 'result', c: 'received', b: 'remaining_ms', g: 'correct', p: 'points', h: 'score',
+  f: 'frames',
+};
+const COMPACT_TYPES = {
+  S: 'snapshot', G: 'stage', T: 'timer', J: 'user_joined', R: 'resumed',
+  U: 'result', A: 'auth', K: 'ack', E: 'error',
+};
+
+function expandFrame(frame) {
+  if (!('t' in frame)) return frame;
+  const msg = {};
+  for (const key of Object.keys(frame)) {
+    msg[COMPACT_KEYS[key] || key] = frame[key];
+  }
+  msg.type = COMPACT_TYPES[msg.type] || msg.type;
+  return msg;
+}
+
+// Кадр сокета комнаты → сообщение с полными ключами (в любой кодировке)
+export function decodeFrame(text) {
+  return expandFrame(JSON.parse(text));
+}
+
+// Кадр сокета комнаты → сообщения по порядку: resumed, затем пропущенные кадры из него
+export function roomMessages(text) {
+  const msg = decodeFrame(text);
+  if (!Array.isArray(msg.frames)) return [msg];
+  const { frames, ...resumed } = msg;
+  return [resumed, ...frames.map(expandFrame)];
+}
+
+// Пауза перед переподключением с разбросом: после сбоя Wi-Fi зал не приходит в одну секунду
+export function reconnectDelay() {
+  return 1000 + Math.random() * 4000;
+}
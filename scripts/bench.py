@@ -0,0 +1,1420 @@
+#!/usr/bin/env python3
+"""Бенчмарки и проверки backend.
+
+Запуск из корня репозитория:
+
+    python scripts/bench.py workers    # несколько воркеров uvicorn на общем sqlite-хранилище
+    python scripts/bench.py memory     # байт на участника: pydantic User против колонок Participants
+    python scripts/bench.py scoring    # подсчет баллов при закрытии вопроса: цикл против векторного прохода
+    python scripts/bench.py tokens     # проверка JWT на пути ответа: полный разбор против кэша
+    python scripts/bench.py answers    # ответы/с под нагрузкой: POST /api/room/answer против сообщения в /ws/room
+    python scripts/bench.py bank       # банк вопросов (--users = число вопросов): время загрузки и память
+    python scripts/bench.py journal    # журнал игр: очередь и пачки в потоке против записи на каждый ответ
+    python scripts/bench.py restart    # kill -9 посреди вопроса: игра продолжается, перезапуск быстрее --target
+    python scripts/bench.py cycle      # полный цикл викторины под нагрузкой, сравнение с сохраненным базовым прогоном
+    python scripts/bench.py simulate   # вся игра на ручных часах за миллисекунды, баллы сверяются с формулой
+    python scripts/bench.py limits     # флуд /register и /answer с одного адреса: отказ 429 и задержка остальных
+    python scripts/bench.py static     # index.html и бандл из памяти со сжатием против FileResponse с диска
+    python scripts/bench.py herd       # открытие вопроса: GET /question от всех клиентов против вопроса в кадре стадии
+    python scripts/bench.py reconnect  # переподключение всех клиентов: снимок против пропущенных кадров по ?since=
+    python scripts/bench.py presenter  # экран ведущего во время волны ответов: не чаще 5 кадров/с, точные счетчики
+    python scripts/bench.py encode     # CPU и байты кадров на 1000 клиентов за тик: json/компактная, orjson, deflate
+    python scripts/bench.py burst      # 2000 регистраций за 5 с с одного адреса при лимитах по умолчанию
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+def start_server(port, workers=1, env=None):
+    """Запускает uvicorn с backend.main:app в отдельном процессе"""
+    cmd = [sys.executable, "-m", "uvicorn", "backend.main:app",
+           "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    # Снимок, журнал и ключ — во временном каталоге: иначе следующий настоящий запуск
+    # из корня репозитория продолжил бы игру бенчмарка
+    tmp = tempfile.mkdtemp(prefix="quiz-bench-")
+    isolated = {
+        "QUIZ_SNAPSHOT": os.path.join(tmp, "snapshot.json"),
+        "QUIZ_JOURNAL": os.path.join(tmp, "journal.db"),
+        "QUIZ_SECRET_FILE": os.path.join(tmp, "secret.key"),
+    }
+    # Бенчмарки шлют тысячи запросов с одного адреса: ограничение частоты включает только сценарий limits
+    proc = subprocess.Popen(cmd, cwd=ROOT, env={**os.environ, "QUIZ_RATE_LIMIT": "0", **isolated, **(env or {})})
+    proc.tmp = tmp
+    return proc
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+    shutil.rmtree(proc.tmp, ignore_errors=True)
+
+def http(method, url, body=None, token=None):
+    """Один запрос в новом соединении (между воркерами соединения распределяет ядро)"""
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
+    if data is not None:
+        req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status, json.loads(resp.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+
+def wait_ready(base, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if http("GET", f"{base}/api/room")[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Сервер не запустился")
+
+def wait_stage(base, stage, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if http("GET", f"{base}/api/room")[1]["stage"] == stage:
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f"Не дождались стадии {stage}")
+
+def check(condition, message):
+    print(("✅ " if condition else "❌ ") + message)
+    if not condition:
+        raise SystemExit(1)
+
+def complete(coro):
+    """Результат корутины, которая не уходит в event loop: хранилище в памяти отвечает сразу"""
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("корутина ждет event loop")
+
+async def store_answers(path, n, batched):
+    """Запись n ответов в sqlite-хранилище: по транзакции на ответ прямо в event loop
+    (как до потока записи) или пачками в потоке. Ответы приходят по 50 за оборот loop,
+    соседний «воркер» то и дело держит блокировку записи по 20 мс. Возвращает
+    (секунды, ответов принято, самая долгая остановка event loop)"""
+    import sqlite3
+    import threading
+    from backend.models import Room
+    from backend.store import SQLiteBackend
+
+    backend = SQLiteBackend(path)
+    room = Room("answers", "quiz")
+    backend.publish_stage(room, {"type": "stage"})
+    stalls = [0.0]
+    running = True
+
+    def rival():
+        db = sqlite3.connect(path, timeout=10, isolation_level=None)
+        while running:
+            db.execute("BEGIN IMMEDIATE")
+            time.sleep(0.02)
+            db.execute("COMMIT")
+            time.sleep(0.02)
+        db.close()
+
+    async def ticker():
+        # Задержки таймера — время, когда event loop не мог обслуживать сокеты
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stalls[0] = max(stalls[0], now - last - 0.001)
+            last = now
+
+    neighbour = threading.Thread(target=rival)
+    neighbour.start()
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    pending = []
+    accepted = 0
+    for wave in range(0, n, 50):
+        for i in range(wave, min(n, wave + 50)):
+            if batched:
+                pending.append(asyncio.create_task(backend.record_answer(room, f"user {i}", 0, 0.0)))
+            else:
+                accepted += backend.write_batch([(backend._record_answer, (room.id, room.epoch, 0, f"user {i}", 0, 0.0))])[0]
+        await asyncio.sleep(0)
+    accepted += sum(await asyncio.gather(*pending))
+    elapsed = time.perf_counter() - start
+    running = False
+    await tick
+    neighbour.join()
+    backend.writer.shutdown()
+    return elapsed, accepted, stalls[0]
+
+def bench_workers(args):
+    """Несколько воркеров uvicorn видят одну игру через общее sqlite-хранилище"""
+    base = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"🗄️ {args.users * 10} ответов в sqlite-хранилище")
+        rates = {}
+        for label, batched in (("по транзакции в event loop", False), ("пачками в потоке записи", True)):
+            elapsed, accepted, stall = asyncio.run(store_answers(os.path.join(tmp, f"answers-{batched}.db"), args.users * 10, batched))
+            rates[batched] = accepted / elapsed
+            print(f"   {label:27}: {rates[batched]:8.0f} ответов/с, event loop стоял до {stall * 1000:.1f} мс")
+            check(accepted == args.users * 10, f"{label}: все ответы записаны")
+        check(rates[True] > rates[False], f"запись пачками быстрее: x{rates[True] / rates[False]:.1f}")
+
+        env = {"QUIZ_STATE_BACKEND": "sqlite", "QUIZ_STATE_DB": os.path.join(tmp, "state.db"),
+               "QUIZ_MAX_USERS": str(max(100, args.users))}
+        proc = start_server(args.port, workers=args.workers, env=env)
+        try:
+            wait_ready(base)
+            with ThreadPoolExecutor(32) as pool:
+                seen = {status["worker"] for status in pool.map(
+                    lambda _: http("GET", f"{base}/ws/status")[1], range(args.workers * 20))}
+                check(len(seen) > 1, f"запросы обслуживают разные воркеры: {len(seen)}")
+
+                names = [f"user {i}" for i in range(args.users)]
+                registered = list(pool.map(lambda n: http("POST", f"{base}/api/room/register", {"name": n}), names))
+                tokens = {n: body["token"] for n, (status, body) in zip(names, registered) if status == 200}
+                check(len(tokens) == args.users, f"зарегистрировано {len(tokens)} из {args.users}")
+                dupes = list(pool.map(lambda n: http("POST", f"{base}/api/room/register", {"name": n})[0], names[:10]))
+                check(all(code == 409 for code in dupes), "повторное имя отклонено на любом воркере")
+
+                time.sleep(0.5)
+                me = list(pool.map(lambda n: http("GET", f"{base}/api/room/me", token=tokens[n])[0], names * 3))
+                check(all(code == 200 for code in me), "токен принимается всеми воркерами")
+                views = list(pool.map(lambda _: http("GET", f"{base}/api/room")[1], range(args.workers * 10)))
+                check(all(len(v["users"]) == args.users for v in views), "все воркеры видят всех участников")
+                check(len({v["stage"] for v in views}) == 1 and max(v["timer"] for v in views) - min(v["timer"] for v in views) <= 1,
+                      "стадия и таймер совпадают на всех воркерах")
+
+                if args.full:
+                    print("⏳ Ждем первый вопрос...")
+                    wait_stage(base, "quiz")
+                    start = time.perf_counter()
+                    answers = list(pool.map(lambda n: http("POST", f"{base}/api/room/answer", {"answer": 0}, tokens[n])[0], names))
+                    print(f"   ответы по HTTP: {len(names) / (time.perf_counter() - start):.0f} в секунду")
+                    check(all(code == 200 for code in answers), "ответы принимаются всеми воркерами")
+                    again = list(pool.map(lambda n: http("POST", f"{base}/api/room/answer", {"answer": 0}, tokens[n])[0], names))
+                    check(all(code == 409 for code in again), "повторный ответ отклонен на любом воркере")
+                    wait_stage(base, "pause")
+                    time.sleep(0.5)
+                    # Порядок участников с равными баллами у воркеров может отличаться, сравниваем баллы
+                    boards = list(pool.map(lambda _: http("GET", f"{base}/api/room/leaderboard")[1], range(args.workers * 10)))
+                    scores = {json.dumps(sorted((row["name"], row["score"]) for row in board)) for board in boards}
+                    check(len(scores) == 1, "баллы одинаковы на всех воркерах")
+        finally:
+            stop_server(proc)
+
+def measure(build):
+    """Сколько байт удерживает результат build()"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+def bench_memory(args):
+    """Память на участника (и его ответ) при args.users участниках"""
+    from backend.models import User, Participants, AnswerLog
+
+    n = args.users
+    # Строки имен одинаковы в обоих вариантах, поэтому создаются заранее и не входят в замер
+    names = [f"Участник {i}" for i in range(n)]
+
+    def legacy():
+        users = {name: User(name=name) for name in names}
+        answers = {name: {'answer': 1, 'received': 1.5} for name in names}
+        return users, answers
+
+    def compact():
+        users = Participants()
+        for name in names:
+            users.add(name)
+        answers = AnswerLog(n)
+        for idx in range(n):
+            answers.add(idx, 1, 1.5)
+        return users, answers
+
+    before, after = measure(legacy), measure(compact)
+    print(f"👥 {n} участников")
+    print(f"   до:    {before / n:8.1f} байт на участника ({before / 2**20:.2f} MiB)")
+    print(f"   после: {after / n:8.1f} байт на участника ({after / 2**20:.2f} MiB)")
+    print(f"   экономия: x{before / after:.1f}")
+
+def bench_scoring(args):
+    """Подсчет баллов за вопрос, на который ответили все args.users участников"""
+    import random
+    from backend.models import User, Room, Question
+    from backend.state import add_user, record_answer, score_question
+
+    n = args.users
+    rng = random.Random(1)
+    names = [f"Участник {i}" for i in range(n)]
+    picks = [(rng.randrange(4), rng.uniform(0, 15)) for _ in range(n)]
+    question = Question(text="?", options=["a", "b", "c", "d"], correct_index=0, theme="bench")
+
+    # Прежняя схема: словарь pydantic-пользователей и словарь словарей ответов
+    users = {name: User(name=name) for name in names}
+    answers = {name: {'answer': option, 'received': received} for name, (option, received) in zip(names, picks)}
+
+    def legacy():
+        for uname, user in users.items():
+            if uname in answers:
+                answer_data = answers[uname]
+                if answer_data['answer'] == question.correct_index:
+                    points = max(0, int((15 - answer_data['received']) * 1000))
+                    user.last_answer_correct = True
+                    user.last_score = points
+                    user.score += points
+                else:
+                    user.last_answer_correct = False
+                    user.last_score = 0
+            else:
+                user.last_answer_correct = False
+                user.last_score = 0
+
+    room = Room("bench", "quiz", 15)
+    room.questions = [question]
+    for name in names:
+        add_user(room, name)
+    room.answers.reset(n)
+    start = time.perf_counter()
+    for name, (option, received) in zip(names, picks):
+        record_answer(room, name, option, received)
+    record_time = time.perf_counter() - start
+
+    def timed(fn, repeat=20):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    before = timed(legacy)
+    after = timed(lambda: score_question(room, 0, 15))
+    # Оба варианта прогнаны одинаковое число раз, итоговые баллы должны совпасть
+    check(list(room.users.score) == [users[name].score for name in names], "баллы совпадают с прежним подсчетом")
+    print(f"🧮 {n} ответов")
+    print(f"   запись ответов в колонки: {record_time / n * 1e6:.2f} мкс на ответ")
+    print(f"   подсчет, цикл по словарям:  {before * 1000:8.2f} мс")
+    print(f"   подсчет, векторный проход:  {after * 1000:8.2f} мс (x{before / after:.0f})")
+
+def bench_tokens(args):
+    """Пропускная способность verify_token для args.users токенов: холодный и теплый кэш"""
+    from backend import auth, config
+
+    n = args.users
+    config.TOKEN_CACHE_SIZE = max(config.TOKEN_CACHE_SIZE, n)
+    tokens = [auth.create_access_token({"sub": f"Участник {i}", "room": "bench", "game": "g"}) for i in range(n)]
+
+    auth.forget_room_tokens("bench")
+    start = time.perf_counter()
+    cold = [auth.verify_token(token, "bench", "g") for token in tokens]
+    cold_time = time.perf_counter() - start
+
+    # Волна ответов: каждый участник присылает тот же токен еще раз
+    start = time.perf_counter()
+    warm = [auth.verify_token(token, "bench", "g") for token in tokens]
+    warm_time = time.perf_counter() - start
+
+    check(cold == warm == [f"Участник {i}" for i in range(n)], "кэш возвращает те же имена")
+    check(auth.verify_token(tokens[0], "other", "g") is None, "токен другой комнаты отклонен и из кэша")
+    check(auth.verify_token(tokens[0], "bench", "next") is None, "токен прошлого цикла отклонен и из кэша")
+    auth.forget_room_tokens("bench")
+    check(not auth._verified, "сброс комнаты очищает кэш")
+    print(f"🔑 {n} токенов")
+    print(f"   без кэша: {n / cold_time:10.0f} проверок/с ({cold_time / n * 1e6:.1f} мкс)")
+    print(f"   из кэша:  {n / warm_time:10.0f} проверок/с ({warm_time / n * 1e6:.2f} мкс, x{cold_time / warm_time:.0f})")
+
+async def http_keepalive(port, host="127.0.0.1", ip=None, client=None):
+    """Соединение HTTP/1.1 keep-alive: POST одной функцией, без накладных расходов клиента.
+    ip — адрес клиента в X-Real-IP (сервер доверяет ему с локального адреса, как за nginx),
+    client — ключ браузера в X-Client-Id"""
+    reader, writer = await asyncio.open_connection(host, port)
+    real_ip = f"X-Real-IP: {ip}\r\n" if ip else ""
+    if client:
+        real_ip += f"X-Client-Id: {client}\r\n"
+
+    async def post(path, body, token=None, method="POST"):
+        data = json.dumps(body).encode() if body is not None else b""
+        auth = f"Authorization: Bearer {token}\r\n" if token else ""
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"{real_ip}{auth}Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(next(line.split(b":")[1] for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")))
+        return int(head.split(b" ", 2)[1]), await reader.readexactly(length)
+
+    return post, writer
+
+async def answer_wave(port, tokens):
+    """Каждый участник отвечает по HTTP, затем (на следующем вопросе) по сокету"""
+    import websockets
+
+    base = f"http://127.0.0.1:{port}"
+    connections = [await http_keepalive(port) for _ in tokens]
+    sockets = []
+    for token in tokens:
+        ws = await websockets.connect(f"ws://127.0.0.1:{port}/ws/room", max_queue=None)
+        await ws.recv()  # снимок
+        await ws.send(json.dumps({"type": "auth", "token": token}))
+        while json.loads(await ws.recv())["type"] != "auth":
+            pass
+        sockets.append(ws)
+
+    async def ws_answer(ws):
+        await ws.send(json.dumps({"type": "answer", "answer": 0, "id": 1}))
+        while True:
+            msg = json.loads(await ws.recv())
+            if msg.get("id") == 1:
+                return msg["type"]
+
+    results = {}
+    loop = asyncio.get_running_loop()
+    for path, question in (("http", 0), ("ws", 1)):
+        print(f"⏳ Ждем вопрос {question + 1}...")
+        await loop.run_in_executor(None, wait_question, base, question)
+        start = time.perf_counter()
+        if path == "http":
+            replies = await asyncio.gather(*(post("/api/room/answer", {"answer": 0}, token)
+                                             for (post, _), token in zip(connections, tokens)))
+            ok = sum(code == 200 for code, _ in replies)
+        else:
+            replies = await asyncio.gather(*(ws_answer(ws) for ws in sockets))
+            ok = sum(kind == "ack" for kind in replies)
+        results[path] = (time.perf_counter() - start, ok)
+
+    for _, writer in connections:
+        writer.close()
+    for ws in sockets:
+        await ws.close()
+    return results
+
+def wait_question(base, question, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        room = http("GET", f"{base}/api/room")[1]
+        if room["stage"] == "quiz" and room["current_question"] == question and room["timer"] > 5:
+            return
+        time.sleep(0.1)
+    raise RuntimeError(f"Не дождались вопроса {question + 1}")
+
+def bench_answers(args):
+    """Пропускная способность приема ответов: HTTP-маршрут против сокета"""
+    base = f"http://127.0.0.1:{args.port}"
+    proc = start_server(args.port, env={"QUIZ_MAX_USERS": str(args.users)})
+    try:
+        wait_ready(base)
+        names = [f"user {i}" for i in range(args.users)]
+        with ThreadPoolExecutor(32) as pool:
+            registered = list(pool.map(lambda n: http("POST", f"{base}/api/room/register", {"name": n}), names))
+        tokens = [body["token"] for status, body in registered if status == 200]
+        check(len(tokens) == args.users, f"зарегистрировано {len(tokens)} из {args.users}")
+        results = asyncio.run(answer_wave(args.port, tokens))
+    finally:
+        stop_server(proc)
+
+    for path, (elapsed, ok) in results.items():
+        check(ok == args.users, f"{path}: принято {ok} из {args.users}")
+    http_time, ws_time = results["http"][0], results["ws"][0]
+    print(f"📨 {args.users} одновременных ответов")
+    print(f"   POST /api/room/answer: {args.users / http_time:8.0f} ответов/с ({http_time * 1000:.0f} мс на волну)")
+    print(f"   сообщение в /ws/room:  {args.users / ws_time:8.0f} ответов/с ({ws_time * 1000:.0f} мс на волну, x{http_time / ws_time:.1f})")
+
+def bench_bank(args):
+    """Загрузка банка из args.users вопросов в JSON, CSV и SQLite против списка pydantic-моделей"""
+    import csv
+    import random
+    import sqlite3
+    from backend.models import Question
+    from backend.questions import QuestionBank
+
+    n = args.users
+    rng = random.Random(1)
+    themes = [f"Тема {i}" for i in range(50)]
+    records = [{
+        "text": f"Вопрос номер {i}: что из перечисленного верно?",
+        "options": [f"Вариант {j} к вопросу {i}" for j in range(4)],
+        "correct": rng.randrange(4),
+        "theme": rng.choice(themes),
+        "difficulty": rng.randint(1, 3),
+    } for i in range(n)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {fmt: os.path.join(tmp, f"bank.{fmt}") for fmt in ("json", "csv", "db")}
+        with open(paths["json"], "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+        with open(paths["csv"], "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["text", "options", "correct", "theme", "difficulty"])
+            writer.writerows([r["text"], "|".join(r["options"]), r["correct"], r["theme"], r["difficulty"]] for r in records)
+        db = sqlite3.connect(paths["db"])
+        db.execute("CREATE TABLE questions (text TEXT, options TEXT, correct INTEGER, theme TEXT, difficulty INTEGER)")
+        db.executemany("INSERT INTO questions VALUES (?, ?, ?, ?, ?)", [
+            (r["text"], json.dumps(r["options"], ensure_ascii=False), r["correct"], r["theme"], r["difficulty"]) for r in records
+        ])
+        db.commit()
+        db.close()
+        del records
+
+        def legacy():
+            # Прежняя схема: весь пул словарями в памяти и модели на каждый вопрос
+            with open(paths["json"], encoding="utf-8") as f:
+                pool = json.load(f)
+            return pool, [Question(text=q["text"], options=q["options"], correct_index=q["correct"], theme=q["theme"]) for q in pool]
+
+        print(f"📚 {n} вопросов")
+        variants = [("pydantic-список (json)", legacy)] + [
+            (f"QuestionBank ({fmt})", lambda path=path: QuestionBank(path)) for fmt, path in paths.items()
+        ]
+        for label, build in variants:
+            start = time.perf_counter()
+            build()
+            elapsed = time.perf_counter() - start
+            size = measure(build)
+            print(f"   {label:24} загрузка {elapsed * 1000:7.0f} мс, память {size / 2**20:7.1f} MiB ({size / n:.0f} байт на вопрос)")
+
+        for fmt, path in paths.items():
+            bank = QuestionBank(path)
+            check(len(bank) == n, f"{fmt}: загружено {len(bank)} вопросов")
+            picked = bank.sample(5, theme=themes[0], difficulty=2)
+            check(len(picked) == 5 and all(q.theme == themes[0] for q in picked), f"{fmt}: выборка по теме и сложности")
+            start = time.perf_counter()
+            for _ in range(1000):
+                bank.sample(5, theme=themes[0])
+            print(f"   выборка 5 вопросов темы ({fmt}): {(time.perf_counter() - start) * 1000:.3f} мкс")
+            bank.close()
+
+def bench_journal(args):
+    """Цена журнала на пути ответа: args.users записей через очередь и синхронно"""
+    from backend import config, journal
+    from backend.models import Room
+
+    n = args.users
+    room = Room("bench", "quiz")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Прежний путь без очереди: транзакция на каждый ответ прямо в обработчике
+        direct = journal.SQLiteJournal(os.path.join(tmp, "direct.db"))
+        start = time.perf_counter()
+        for i in range(n):
+            direct.write([(time.time(), room.game, room.id, "answer", {"name": f"Участник {i}", "answer": 0})])
+        direct_time = time.perf_counter() - start
+
+        journal.sink = journal.SQLiteJournal(os.path.join(tmp, "queued.db"))
+        config.JOURNAL_BUFFER = max(config.JOURNAL_BUFFER, n)
+
+        async def queued():
+            journal.start_journal()
+            start = time.perf_counter()
+            for i in range(n):
+                journal.record(room, "answer", name=f"Участник {i}", answer=0)
+            enqueue = time.perf_counter() - start
+            await journal.stop_journal()
+            return enqueue, time.perf_counter() - start
+
+        enqueue_time, total_time = asyncio.run(queued())
+        check(len(journal.sink.records(room.game)) == n, f"в журнале все {n} записей")
+        status = journal.status()
+        print(f"📓 {n} ответов")
+        print(f"   транзакция на ответ:      {direct_time / n * 1e6:8.1f} мкс на ответ в обработчике")
+        print(f"   очередь + пачки в потоке: {enqueue_time / n * 1e6:8.2f} мкс на ответ в обработчике "
+              f"(x{direct_time / enqueue_time:.0f}), до диска за {total_time * 1000:.0f} мс")
+        print(f"   пачек: {status['batches']}, самая долгая {status['max_flush_ms']:.1f} мс")
+
+def bench_restart(args):
+    """Процесс убит посреди вопроса; после перезапуска игра, токены и ответы на месте"""
+    base = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            "QUIZ_SNAPSHOT": os.path.join(tmp, "snapshot.json"),
+            "QUIZ_SNAPSHOT_INTERVAL": "0.2",
+            "QUIZ_SECRET_FILE": os.path.join(tmp, "secret.key"),
+            "QUIZ_JOURNAL": os.path.join(tmp, "journal.db"),
+            "QUIZ_MAX_USERS": str(args.users),
+        }
+        proc = start_server(args.port, env=env)
+        try:
+            wait_ready(base)
+            names = [f"user {i}" for i in range(args.users)]
+            with ThreadPoolExecutor(32) as pool:
+                registered = list(pool.map(lambda n: http("POST", f"{base}/api/room/register", {"name": n}), names))
+                tokens = {n: body["token"] for n, (status, body) in zip(names, registered) if status == 200}
+                check(len(tokens) == args.users, f"зарегистрировано {len(tokens)} из {args.users}")
+                print("⏳ Ждем первый вопрос...")
+                wait_question(base, 0)
+                half = names[:args.users // 2]
+                answers = list(pool.map(lambda n: http("POST", f"{base}/api/room/answer", {"answer": 0}, tokens[n])[0], half))
+                check(all(code == 200 for code in answers), "половина участников ответила")
+                time.sleep(0.5)  # снимок пишется раз в 0.2 с
+
+                before = http("GET", f"{base}/api/room")[1]
+                proc.kill()
+                proc.wait()
+                killed = time.perf_counter()
+                proc = start_server(args.port, env=env)
+                wait_ready(base)
+                restart_time = time.perf_counter() - killed
+                after = http("GET", f"{base}/api/room")[1]
+
+                check(after["stage"] == "quiz" and after["current_question"] == before["current_question"],
+                      "после перезапуска идет тот же вопрос")
+                check(before["timer"] - restart_time - 2 <= after["timer"] <= before["timer"],
+                      f"таймер продолжился: {before['timer']} → {after['timer']} с")
+                check(after["users"] == before["users"], "участники восстановлены")
+                me = list(pool.map(lambda n: http("GET", f"{base}/api/room/me", token=tokens[n])[0], names))
+                check(all(code == 200 for code in me), "старые токены принимаются")
+                again = list(pool.map(lambda n: http("POST", f"{base}/api/room/answer", {"answer": 0}, tokens[n])[0], half))
+                check(all(code == 409 for code in again), "ответы до падения сохранились")
+                rest = list(pool.map(lambda n: http("POST", f"{base}/api/room/answer", {"answer": 0}, tokens[n])[0], names[len(half):]))
+                check(all(code == 200 for code in rest), "остальные участники отвечают после перезапуска")
+                check(restart_time < args.target, f"перезапуск за {restart_time:.2f} с (цель {args.target} с)")
+        finally:
+            stop_server(proc)
+
+def bench_simulate(args):
+    """Полный цикл на ручных часах: args.users участников, каждый отвечает в точно заданный момент"""
+    from backend import clock, config
+
+    clock.use(clock.ManualClock())
+    config.MAX_USERS = max(config.MAX_USERS, args.users)
+    from backend.scheduler import scheduler
+    from backend.state import rooms, join_room, accept_answer
+    from backend.timer import start_registration, STAGES
+
+    n = args.users
+    durations = dict(STAGES)
+    start = time.perf_counter()
+    room = rooms.create("simulate")
+    start_registration(room)
+    joined = sum(complete(join_room(room, f"Участник {i}")) for i in range(n))
+    check(joined == n, f"зарегистрировано {joined} из {n}")
+    scheduler.advance(room.deadline - clock.now())
+    scheduler.advance(room.deadline - clock.now())
+    check(room.stage == "quiz", "регистрация и подготовка пройдены")
+
+    expected = [0] * n
+    question = rejected = 0
+    while room.stage == "quiz":
+        correct = room.questions[question].correct_index
+        opened = clock.now()
+        # Моменты ответов кратны 1/64 с — точные в double, баллы однозначны
+        offsets = sorted((i % 900 + 1) / 64 for i in range(n))
+        for i, offset in enumerate(offsets):
+            scheduler.advance(opened + offset - clock.now())
+            option = correct if i % 3 else (correct + 1) % 4
+            rejected += complete(accept_answer(room, f"Участник {i}", option, clock.now())) is not None
+            if option == correct:
+                expected[i] += int((durations["quiz"] - offset) * 1000)
+        scheduler.advance(room.deadline - clock.now())
+        scheduler.advance(room.deadline - clock.now())
+        question += 1
+    elapsed = time.perf_counter() - start
+
+    check(room.stage == "results", f"игра дошла до результатов: {question} вопросов")
+    check(rejected == 0, "все ответы приняты")
+    check(list(room.users.score) == expected, "баллы совпадают с формулой для точных моментов ответов")
+    game_seconds = clock.now()
+    print(f"⏩ {n} участников, {game_seconds:.0f} игровых секунд за {elapsed * 1000:.1f} мс (x{game_seconds / elapsed:,.0f})")
+
+CYCLE_BASELINE = ROOT / "scripts" / "cycle_baseline.json"
+
+async def flood(port, users, duration):
+    """Поток повторов с одного адреса, браузера и токена, пока настоящие участники регистрируются
+    (каждый со своим ключом браузера, часть — с того же адреса, что и флуд)"""
+    spam_post, spam_writer = await http_keepalive(port, ip="10.0.0.1", client="spammer")
+    token = json.loads((await spam_post("/api/room/register", {"name": "spammer"}))[1])["token"]
+    statuses = {"register": {}, "answer": {}}
+    latencies = []
+    stop = time.perf_counter() + duration
+
+    async def spam(route, index):
+        post, writer = await http_keepalive(port, ip="10.0.0.1", client="spammer")
+        sent = 0
+        while time.perf_counter() < stop:
+            body = {"name": f"flood {index} {sent}"} if route == "register" else {"answer": 0}
+            code, _ = await post(f"/api/room/{route}", body, token if route == "answer" else None)
+            statuses[route][code] = statuses[route].get(code, 0) + 1
+            sent += 1
+        writer.close()
+
+    async def participant(i):
+        await asyncio.sleep(random.uniform(0, duration * 0.8))
+        ip = "10.0.0.1" if i % 4 == 0 else f"10.1.{i // 250}.{i % 250 + 1}"
+        post, writer = await http_keepalive(port, ip=ip, client=f"browser {i}")
+        start = time.perf_counter()
+        code, _ = await post("/api/room/register", {"name": f"Участник {i}"})
+        latencies.append((code, time.perf_counter() - start))
+        writer.close()
+
+    await asyncio.gather(
+        *(spam(route, index) for route in ("register", "answer") for index in range(4)),
+        *(participant(i) for i in range(users)),
+    )
+    spam_writer.close()
+    return statuses, latencies
+
+def bench_limits(args):
+    """Повторы одного клиента с ограничением частоты и без: задержка регистрации остальных"""
+    print(f"🚧 Флуд /register и /answer с одного адреса, {args.users} участников регистрируются с разных")
+    for label, enabled in (("без ограничения", "0"), ("с ограничением", "1")):
+        base = f"http://127.0.0.1:{args.port}"
+        # Лимиты по умолчанию: флуд останавливают ключи браузера и токена, а четверть
+        # участников за тем же адресом, что и флуд, все равно проходит
+        proc = start_server(args.port, env={"QUIZ_MAX_USERS": "1000000", "QUIZ_RATE_LIMIT": enabled})
+        try:
+            wait_ready(base)
+            statuses, latencies = asyncio.run(flood(args.port, args.users, 3.0))
+            status = http("GET", f"{base}/ws/status")[1]["rate_limit"]
+        finally:
+            stop_server(proc)
+        ok = [elapsed * 1000 for code, elapsed in latencies if code == 200]
+        print(f"   {label}: участников {len(ok)}/{args.users}, регистрация p50 {percentile(ok, 0.5):.1f} мс, p99 {percentile(ok, 0.99):.1f} мс")
+        for route, codes in statuses.items():
+            total = sum(codes.values())
+            print(f"      флуд {route}: {total / 3:7.0f} запросов/с, ответы {dict(sorted(codes.items()))}")
+        check(len(ok) == args.users, f"{label}: все участники зарегистрированы")
+        if enabled == "1":
+            check(statuses["answer"].get(429, 0) > 0 and statuses["register"].get(429, 0) > 0, "флуд отклоняется ответом 429")
+            check(status["rejected"].get("register:client", 0) > 0, "повторы регистрации одного браузера ограничены по X-Client-Id")
+            print(f"      отклонено: {status['rejected']}")
+
+def bench_static(args):
+    """Отдача index.html и бандла: FileResponse с диска против готовых вариантов в памяти"""
+    from starlette.requests import Request
+    from starlette.responses import FileResponse
+    from backend import static
+
+    sources = sorted((ROOT / "frontend" / "src").rglob("*.js*"))
+    script = "\n".join(path.read_text(encoding="utf-8") for path in sources).encode()
+    with tempfile.TemporaryDirectory() as dist:
+        os.makedirs(os.path.join(dist, "assets"))
+        with open(os.path.join(dist, "index.html"), "wb") as f:
+            f.write((ROOT / "frontend" / "index.html").read_bytes())
+        with open(os.path.join(dist, "assets", "index-BHj3kX9a.js"), "wb") as f:
+            f.write(script)
+        bundle = static.StaticBundle(dist)
+
+        async def serve(build, path):
+            sent = []
+
+            async def receive():
+                return {"type": "http.request"}
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip, deflate, br")]}
+            await build(Request(scope), path)(scope, receive, send)
+            return sum(len(m.get("body", b"")) for m in sent)
+
+        def from_disk(request, path):
+            full = os.path.join(dist, path)
+            return FileResponse(full) if os.path.exists(full) else None
+
+        def from_memory(request, path):
+            return bundle.get(path).response(request)
+
+        async def run(build, path, n):
+            start = time.perf_counter()
+            for _ in range(n):
+                size = await serve(build, path)
+            return (time.perf_counter() - start) / n, size
+
+        n = args.users
+        print(f"🗂️ {n} запросов на файл, brotli {'есть' if static.brotli else 'не установлен'}")
+        for path in ("index.html", "assets/index-BHj3kX9a.js"):
+            disk, disk_size = asyncio.run(run(from_disk, path, n))
+            memory, memory_size = asyncio.run(run(from_memory, path, n))
+            print(f"   {path:26} диск {disk * 1e6:6.0f} мкс {disk_size:7} байт, "
+                  f"память {memory * 1e6:6.0f} мкс {memory_size:7} байт (x{disk / memory:.0f})")
+        check(bundle.get("assets/index-BHj3kX9a.js").variants["gzip"][1]["Cache-Control"] == static.IMMUTABLE,
+              "хэшированные файлы кэшируются навсегда")
+
+async def question_herd(port, users):
+    """Все клиенты ждут вопрос: на первом запрашивают его по HTTP, на втором берут из кадра стадии"""
+    import websockets
+
+    clients = []
+    for _ in range(users):
+        ws = await websockets.connect(f"ws://127.0.0.1:{port}/ws/room", max_queue=None)
+        await ws.recv()  # снимок
+        clients.append((ws, await http_keepalive(port)))
+    # Номер вопроса → моменты кадра стадии и получения вопроса каждым клиентом
+    frames = {0: [], 1: []}
+    ready = {0: [], 1: []}
+
+    async def client(ws, connection):
+        post, writer = connection
+        async for text in ws:
+            msg = json.loads(text)
+            if msg["type"] != "stage" or msg["stage"] != "quiz":
+                if msg["type"] == "stage" and msg["stage"] == "results":
+                    break
+                continue
+            question = msg["current_question"]
+            frames[question].append(time.perf_counter())
+            if question == 0:
+                # Прежнее поведение QuizPage: вопрос запрашивается сразу после кадра стадии
+                _, body = await post("/api/room/question", None, method="GET")
+                payload = json.loads(body)["question"]
+            else:
+                payload = msg.get("question")
+            if payload:
+                ready[question].append(time.perf_counter())
+        writer.close()
+
+    await asyncio.gather(*(client(ws, connection) for ws, connection in clients))
+    for ws, _ in clients:
+        await ws.close()
+    return frames, ready
+
+def bench_herd(args):
+    """Открытие вопроса при args.users подключенных клиентах: GET /question от всех против вопроса в кадре стадии"""
+    base = f"http://127.0.0.1:{args.port}"
+    proc = start_server(args.port, env={
+        "QUIZ_MAX_USERS": str(args.users), "QUIZ_CLOCK_SPEED": "4", "QUIZ_QUESTIONS_PER_GAME": "2",
+        "QUIZ_JOURNAL": "", "QUIZ_SNAPSHOT": "",
+    })
+    try:
+        wait_ready(base)
+        print(f"⏳ {args.users} клиентов ждут вопросы (часы ускорены в 4 раза)...")
+        frames, ready = asyncio.run(question_herd(args.port, args.users))
+    finally:
+        stop_server(proc)
+    print(f"❓ Вопрос у всех {args.users} клиентов, от первого кадра стадии")
+    for question, label in ((0, "GET /api/room/question"), (1, "вопрос в кадре стадии")):
+        check(len(ready[question]) == args.users, f"{label}: вопрос получили {len(ready[question])} из {args.users}")
+        first = min(frames[question])
+        delays = [(at - first) * 1000 for at in ready[question]]
+        print(f"   {label:24} p50 {percentile(delays, 0.5):7.1f} мс, последний {max(delays):7.1f} мс")
+
+async def reconnect_storm(port, users, pid):
+    """Все клиенты теряют сокет и переподключаются разом: с номером последнего кадра и без"""
+    import websockets
+
+    url = f"ws://127.0.0.1:{port}/ws/room"
+    post, writer = await http_keepalive(port)
+    for i in range(users):
+        await post("/api/room/register", {"name": f"Участник {i}"})
+    writer.close()
+
+    async def connect(query=""):
+        """Подключение до получения начального состояния: (сокет, stream, seq, байт)"""
+        ws = await websockets.connect(url + query, max_queue=None)
+        first = await ws.recv()
+        size = len(first.encode())
+        msg = json.loads(first)
+        # Пропущенные кадры приходят внутри кадра resumed (frames), seq — номер последнего из них
+        return ws, msg["stream"], msg["seq"], size
+
+    clients = await asyncio.gather(*(connect() for _ in range(users)))
+    sampler = ProcessSampler(pid)
+    results = {}
+    # Два круга через один: время переподключения шумит, в сравнение идет лучший круг
+    for label, resume in (("снимок", False), ("продолжение", True)) * 2:
+        # Клиенты пропускают несколько тиков таймера, пока нет связи
+        for ws, *_ in clients:
+            await ws.close()
+        await asyncio.sleep(2.5)
+        start, cpu = time.perf_counter(), sampler.read()[0]
+        clients = await asyncio.gather(*(
+            connect(f"?stream={stream}&since={seq}" if resume else "") for _, stream, seq, _ in clients
+        ))
+        result = (time.perf_counter() - start, sampler.read()[0] - cpu, sum(size for *_, size in clients))
+        results[label] = min(results.get(label, result), result)
+    for ws, *_ in clients:
+        await ws.close()
+    return results
+
+def bench_reconnect(args):
+    """Переподключение args.users клиентов комнаты с args.users участниками"""
+    base = f"http://127.0.0.1:{args.port}"
+    proc = start_server(args.port, env={"QUIZ_MAX_USERS": str(args.users), "QUIZ_JOURNAL": "", "QUIZ_SNAPSHOT": ""})
+    try:
+        wait_ready(base)
+        results = asyncio.run(reconnect_storm(args.port, args.users, proc.pid))
+        reconnects = http("GET", f"{base}/ws/status")[1]["reconnects"]
+    finally:
+        stop_server(proc)
+    print(f"🔁 {args.users} клиентов переподключаются разом")
+    for label, (elapsed, cpu, size) in results.items():
+        print(f"   {label:12} {elapsed * 1000:7.0f} мс (CPU сервера {cpu * 1000:5.0f} мс), "
+              f"{size / 2**20:7.2f} MiB, {size / args.users:8.0f} байт на клиента")
+    check(reconnects["resumed"] == args.users * 2, f"продолжили с пропущенных кадров {reconnects['resumed']} из {args.users * 2}")
+    check(reconnects["resumed_frames"] <= args.users * 4, f"устаревшие тики таймера не досылаются: {reconnects['resumed_frames']} кадров")
+    (snapshot, snapshot_cpu, _), (resumed, resumed_cpu, _) = results["снимок"], results["продолжение"]
+    check(resumed < snapshot and resumed_cpu < snapshot_cpu, "продолжение быстрее и дешевле снимка")
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+class ProcessSampler:
+    """CPU и память процесса сервера по стадиям (Linux, /proc)"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.stages = {}
+        self.current = None
+        self.started = self.cpu_start = None
+
+    def read(self):
+        if self.pid is None:
+            return None, None
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        with open(f"/proc/{self.pid}/status") as f:
+            rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+        return cpu, rss
+
+    def sample(self, stage):
+        now = time.perf_counter()
+        cpu, rss = self.read()
+        if stage != self.current:
+            self.close(now, cpu)
+            self.current, self.started, self.cpu_start = stage, now, cpu
+        entry = self.stages.setdefault(stage, {"seconds": 0.0, "cpu_seconds": 0.0, "rss_mb_max": None})
+        if rss is not None:
+            entry["rss_mb_max"] = max(entry["rss_mb_max"] or 0, round(rss, 1))
+
+    def close(self, now, cpu):
+        if self.current is None:
+            return
+        entry = self.stages[self.current]
+        entry["seconds"] += now - self.started
+        if cpu is not None:
+            entry["cpu_seconds"] += cpu - self.cpu_start
+
+    def report(self):
+        self.close(time.perf_counter(), self.read()[0])
+        self.current = None
+        return {
+            stage: {
+                "seconds": round(entry["seconds"], 2),
+                "cpu_percent": round(100 * entry["cpu_seconds"] / entry["seconds"], 1) if self.pid and entry["seconds"] else None,
+                "rss_mb_max": entry["rss_mb_max"],
+            }
+            for stage, entry in self.stages.items()
+        }
+
+class Participant:
+    """Участник нагрузочного прогона: регистрация, сокет комнаты, ответы"""
+
+    def __init__(self, name):
+        self.name = name
+        self.token = None
+        self.ws = None
+        self.pending = {}
+        self.next_id = 0
+
+    async def register(self, host, port):
+        post, writer = await http_keepalive(port, host)
+        try:
+            status, body = await post("/api/room/register", {"name": self.name})
+        finally:
+            writer.close()
+        if status == 200:
+            self.token = json.loads(body)["token"]
+        return status == 200
+
+    async def connect(self, url):
+        import websockets
+
+        self.ws = await websockets.connect(url, max_queue=None, open_timeout=30)
+        asyncio.create_task(self.read())
+        return await self.request({"type": "auth", "token": self.token}) == "auth"
+
+    async def read(self):
+        # Кадры рассыльщика читаются и отбрасываются, ответы на запросы находят свой future
+        try:
+            async for text in self.ws:
+                msg = json.loads(text)
+                future = self.pending.pop(msg.get("id"), None)
+                if future is not None:
+                    future.set_result(msg["type"])
+        except Exception:
+            pass
+        for future in self.pending.values():
+            future.set_result("closed")
+
+    async def request(self, msg):
+        self.next_id += 1
+        future = self.pending[self.next_id] = asyncio.get_running_loop().create_future()
+        await self.ws.send(json.dumps({**msg, "id": self.next_id}))
+        return await future
+
+async def presenter_wave(port, users):
+    """Участники отвечают волной, экран ведущего записывает кадры votes"""
+    import websockets
+
+    participants = [Participant(f"Участник {i}") for i in range(users)]
+    await asyncio.gather(*(p.register("127.0.0.1", port) for p in participants))
+    await asyncio.gather(*(p.connect(f"ws://127.0.0.1:{port}/ws/room") for p in participants))
+    presenter = await websockets.connect(f"ws://127.0.0.1:{port}/ws/presenter")
+    frames = []
+    async for text in presenter:
+        frames.append((time.perf_counter(), len(text.encode()), json.loads(text)))
+        if frames[-1][2]["stage"] == "quiz":
+            break
+
+    picks = [random.randrange(4) for _ in participants]
+
+    async def answer(p, option):
+        await asyncio.sleep(random.uniform(0, 1.5))
+        return await p.request({"type": "answer", "answer": option})
+
+    wave = asyncio.gather(*(answer(p, option) for p, option in zip(participants, picks)))
+    async for text in presenter:
+        frames.append((time.perf_counter(), len(text.encode()), json.loads(text)))
+        if frames[-1][2]["answered"] == users or frames[-1][2]["stage"] != "quiz":
+            break
+    replies = await wave
+    await presenter.close()
+    for p in participants:
+        await p.ws.close()
+    expected = [sum(1 for pick, reply in zip(picks, replies) if pick == option and reply == "ack") for option in range(4)]
+    return frames, expected
+
+def bench_presenter(args):
+    """Экран ведущего во время волны из args.users ответов: частота кадров и точность счетчиков"""
+    base = f"http://127.0.0.1:{args.port}"
+    proc = start_server(args.port, env={
+        "QUIZ_MAX_USERS": str(args.users), "QUIZ_CLOCK_SPEED": "4", "QUIZ_QUESTIONS_PER_GAME": "1",
+        "QUIZ_JOURNAL": "", "QUIZ_SNAPSHOT": "",
+    })
+    try:
+        wait_ready(base)
+        print(f"⏳ {args.users} участников ждут вопрос (часы ускорены в 4 раза)...")
+        frames, expected = asyncio.run(presenter_wave(args.port, args.users))
+    finally:
+        stop_server(proc)
+    wave = [frame for frame in frames if frame[2]["stage"] == "quiz"]
+    gaps = [b[0] - a[0] for a, b in zip(wave, wave[1:])]
+    last = frames[-1][2]
+    print(f"📊 {args.users} ответов → {len(wave)} кадров votes, {sum(size for _, size, _ in wave)} байт")
+    print(f"   минимальный интервал между кадрами {min(gaps) * 1000:.0f} мс, последний кадр: {last['votes']}")
+    check(min(gaps) > 0.15, "не чаще 5 кадров в секунду")
+    check(last["votes"] == expected and last["answered"] == sum(expected), "счетчики совпадают с принятыми ответами")
+
+def game_frames(n):
+    """Кадры рассылки /ws/room за всю игру на ручных часах: [(игровое время, кадр с seq)]"""
+    from backend import clock, config, ws
+
+    clock.use(clock.ManualClock())
+    config.MAX_USERS = max(config.MAX_USERS, n)
+    from backend.scheduler import scheduler
+    from backend.state import rooms, join_room, accept_answer
+    from backend.timer import start_registration
+
+    room = rooms.create("encode")
+    start_registration(room)
+    registration = room.deadline - clock.now()
+    frames = []
+    joined = answered = 0
+    while room.stage != "results":
+        scheduler.advance(config.SYNC_INTERVAL)
+        if room.stage == "registration":
+            # Участники подходят равномерно в первой половине регистрации
+            target = min(n, int(n * 2 * clock.now() / registration))
+            while joined < target:
+                complete(join_room(room, f"Участник {joined}"))
+                joined += 1
+        elif room.stage == "quiz" and answered <= room.current_question:
+            correct = room.questions[room.current_question].correct_index
+            for i in range(n):
+                complete(accept_answer(room, f"Участник {i}", correct if i % 3 else (correct + 1) % 4, clock.now()))
+            answered += 1
+        frames.extend((clock.now(), event) for event in ws.collect_events(room))
+    for seq, (_, event) in enumerate(frames, 1):
+        event["seq"] = seq
+    return frames
+
+def deflate_cost(texts, connections, window, mem_level):
+    """permessage-deflate как в websockets: свой компрессор на каждое соединение,
+    контекст между кадрами сохраняется. Возвращает (секунды, байт, прирост RSS в МиБ)."""
+    import zlib
+
+    before = ProcessSampler(os.getpid()).read()[1]
+    encoders = [zlib.compressobj(wbits=-window, memLevel=mem_level) for _ in range(connections)]
+    sent = 0
+    start = time.process_time()
+    for text in texts:
+        data = text.encode()
+        for encoder in encoders:
+            sent += len(encoder.compress(data) + encoder.flush(zlib.Z_SYNC_FLUSH)) - 4
+    elapsed = time.process_time() - start
+    grown = ProcessSampler(os.getpid()).read()[1] - before
+    del encoders
+    return elapsed, sent, grown
+
+def bench_encode(args):
+    """CPU кодирования и байты в сети на 1000 клиентов за тик рассылки: json против компактной
+    кодировки, стандартный json против orjson, и сверху permessage-deflate на каждое соединение"""
+    from backend import codec
+
+    clients = 1000
+    frames = game_frames(args.users)
+    ticks = len({moment for moment, _ in frames})
+    events = [event for _, event in frames]
+    kinds = {}
+    for event in events:
+        kinds[event["type"]] = kinds.get(event["type"], 0) + 1
+    print(f"🎬 {args.users} участников: {len(events)} кадров за {ticks} тиков рассылки {kinds}")
+
+    encoders = [("json", codec.dumps_stdlib)]
+    if codec.orjson is not None:
+        encoders.append(("orjson", codec.dumps_orjson))
+    else:
+        print("ℹ️ orjson не установлен: сравнивается только стандартный json")
+    sizes = {}
+    print(f"   {'кодировщик':10} {'кодировка':9} {'CPU/тик':>10} {'КиБ/тик на 1k':>14} {'таймер':>7}")
+    for name, dumps in encoders:
+        for encoding in codec.ENCODINGS:
+            prepare = codec.compact if encoding == "compact" else (lambda data: data)
+            rounds = 0
+            start = time.process_time()
+            while rounds < 3 or time.process_time() - start < 0.5:
+                texts = [dumps(prepare(event)) for event in events]
+                rounds += 1
+            cpu = (time.process_time() - start) / rounds / ticks
+            size = sum(len(text.encode()) for text in texts)
+            sizes[encoding] = texts
+            timer = next(len(text.encode()) for text, event in zip(texts, events) if event["type"] == "timer")
+            print(f"   {name:10} {encoding:9} {cpu * 1e6:8.1f} мкс {size * clients / ticks / 1024:14.1f} {timer:5} Б")
+    json_bytes = sum(len(text.encode()) for text in sizes["json"])
+    compact_bytes = sum(len(text.encode()) for text in sizes["compact"])
+    check(compact_bytes < json_bytes, f"компактная кодировка меньше json на {1 - compact_bytes / json_bytes:.0%}")
+    check(all(
+        json.loads(c) == codec.compact(json.loads(j)) for c, j in zip(sizes["compact"], sizes["json"])
+    ), "компактный кадр — тот же кадр с короткими ключами")
+
+    # Сжатие идет отдельно для каждого соединения: кадр один, а CPU и память — на клиента
+    connections = min(clients, 100)
+    scale = clients / connections
+    print(f"🗜️ permessage-deflate, пересчет с {connections} соединений на {clients}:")
+    print(f"   {'окно/memLevel':14} {'кодировка':9} {'CPU/тик':>10} {'КиБ/тик на 1k':>14} {'память на 1k':>13}")
+    for label, window, mem_level in (("15/8 uvicorn", 15, 8), ("12/5", 12, 5)):
+        for encoding in codec.ENCODINGS:
+            elapsed, sent, grown = deflate_cost(sizes[encoding], connections, window, mem_level)
+            print(f"   {label:14} {encoding:9} {elapsed * scale / ticks * 1e3:7.2f} мс "
+                  f"{sent * scale / ticks / 1024:14.1f} {grown * scale:9.0f} МиБ")
+
+async def registration_burst(port, users, duration):
+    """users регистраций равномерно за duration секунд, каждая в новом соединении (скан QR-кода).
+    Параллельно раз в 20 мс GET /api/room — насколько регистрации задерживают остальные запросы."""
+    latencies = []
+    probes = []
+    tokens = []
+    done = asyncio.Event()
+
+    async def participant(i):
+        await asyncio.sleep(duration * i / users)
+        post, writer = await http_keepalive(port)
+        start = time.perf_counter()
+        code, body = await post("/api/room/register", {"name": f"Участник {i}"})
+        latencies.append((code, time.perf_counter() - start))
+        if code == 200:
+            tokens.append(json.loads(body)["token"])
+        writer.close()
+
+    async def probe():
+        post, writer = await http_keepalive(port)
+        while not done.is_set():
+            start = time.perf_counter()
+            await post("/api/room", None, method="GET")
+            probes.append(time.perf_counter() - start)
+            await asyncio.sleep(0.02)
+        writer.close()
+
+    prober = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(participant(i) for i in range(users)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await prober
+    post, writer = await http_keepalive(port)
+    duplicates = [(await post("/api/room/register", {"name": name}))[0] for name in ("участник 1", "  УЧАСТНИК   2 ")]
+    accepted = [(await post("/api/room/me", None, token, method="GET"))[0] for token in random.sample(tokens, 10)]
+    writer.close()
+    return latencies, probes, elapsed, duplicates, accepted
+
+def bench_burst(args):
+    """Волна регистраций в начале игры: args.users участников за 5 секунд,
+    токены подписываются прямо в event loop и пачками в пуле"""
+    base = f"http://127.0.0.1:{args.port}"
+    for label, workers in (("подпись в event loop", "0"), ("подпись пачками в пуле", "1")):
+        proc = start_server(args.port, env={
+            "QUIZ_MAX_USERS": str(args.users * 2), "QUIZ_JOURNAL": "", "QUIZ_SNAPSHOT": "",
+            "QUIZ_TOKEN_SIGN_WORKERS": workers,
+            # Все регистрации идут с одного адреса, как из зала за одним NAT: лимиты по умолчанию
+            "QUIZ_RATE_LIMIT": "1",
+        })
+        try:
+            wait_ready(base)
+            sampler = ProcessSampler(proc.pid)
+            cpu_before = sampler.read()[0]
+            latencies, probes, elapsed, duplicates, accepted = asyncio.run(registration_burst(args.port, args.users, 5.0))
+            cpu = sampler.read()[0] - cpu_before
+            users = len(http("GET", f"{base}/api/room")[1]["users"])
+        finally:
+            stop_server(proc)
+        ok = [seconds * 1000 for code, seconds in latencies if code == 200]
+        probe = [seconds * 1000 for seconds in probes]
+        print(f"📝 {label}: {args.users} регистраций за {elapsed:.1f} с, CPU сервера {cpu:.2f} с")
+        print(f"   регистрация p50 {percentile(ok, 0.5):.1f} мс, p99 {percentile(ok, 0.99):.1f} мс, max {max(ok):.1f} мс")
+        print(f"   GET /api/room во время волны: p50 {percentile(probe, 0.5):.1f} мс, p99 {percentile(probe, 0.99):.1f} мс")
+        check(len(ok) == args.users and users == args.users, f"зарегистрированы все {args.users}")
+        check(duplicates == [409, 409], "имя, отличающееся регистром и пробелами, считается занятым")
+        check(accepted == [200] * 10, "выданные токены принимаются")
+
+async def run_cycle(args, host, port, pid):
+    base = f"http://{host}:{port}"
+    loop = asyncio.get_running_loop()
+    sampler = ProcessSampler(pid)
+    latencies = {"register": [], "connect": [], "answer": []}
+    errors = {"register": 0, "connect": 0, "answer": 0}
+    room = {"stage": None}
+
+    async def track():
+        while True:
+            room.update((await loop.run_in_executor(None, http, "GET", f"{base}/api/room"))[1])
+            sampler.sample(room["stage"])
+            await asyncio.sleep(max(0.02, 0.25 / args.speed))
+
+    async def timed(kind, coro):
+        start = time.perf_counter()
+        try:
+            ok = await coro
+        except Exception:
+            ok = False
+        if ok:
+            latencies[kind].append(time.perf_counter() - start)
+        else:
+            errors[kind] += 1
+        return ok
+
+    async def delayed(delay, coro):
+        # Разброс моментов ответа — до начала замера: в задержку ответа он не входит
+        await asyncio.sleep(delay)
+        return await coro
+
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def limited(kind, coro):
+        async with limit:
+            return await timed(kind, coro)
+
+    async def answer(participant):
+        option = random.randrange(4)
+        if args.transport == "ws":
+            return await participant.request({"type": "answer", "answer": option}) == "ack"
+        post, writer = await http_keepalive(port, host)
+        try:
+            return (await post("/api/room/answer", {"answer": option}, participant.token))[0] == 200
+        finally:
+            writer.close()
+
+    # Новая регистрация на 60 секунд, чтобы прогон всегда начинался с начала цикла
+    await loop.run_in_executor(None, http, "POST", f"{base}/api/room/start")
+    tracker = asyncio.create_task(track())
+    participants = [Participant(f"load {i}") for i in range(args.users)]
+    print(f"👥 Регистрация {args.users} участников...")
+    await asyncio.gather(*(limited("register", p.register(host, port)) for p in participants))
+    participants = [p for p in participants if p.token]
+    print(f"🔌 Подключение сокетов...")
+    await asyncio.gather(*(limited("connect", p.connect(f"ws://{host}:{port}/ws/room")) for p in participants))
+
+    question = 0
+    while True:
+        await asyncio.sleep(0.01)
+        if room["stage"] == "results":
+            break
+        if room["stage"] != "quiz" or room["current_question"] != question or room["timer"] > args.window:
+            continue
+        # Все отвечают в последние секунды вопроса, с запасом до дедлайна
+        print(f"⏱️ Вопрос {question + 1}/{room['question_count']}: волна ответов")
+        spread = max(0.0, args.window - 1.5) / args.speed
+        await asyncio.gather(*(delayed(random.uniform(0, spread), timed("answer", answer(p))) for p in participants))
+        question += 1
+
+    tracker.cancel()
+    for p in participants:
+        await p.ws.close()
+    ops = {
+        kind: {
+            "count": len(values) + errors[kind],
+            "errors": errors[kind],
+            "p50_ms": round(percentile(values, 0.5) * 1000, 2) if values else None,
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2) if values else None,
+        }
+        for kind, values in latencies.items()
+    }
+    return {"users": args.users, "transport": args.transport, "questions": question, "speed": args.speed,
+            "ops": ops, "stages": sampler.report()}
+
+def compare(results, baseline, tolerance):
+    """Печатает отличия от базового прогона; возвращает список регрессий"""
+    regressions = []
+    params = ("users", "transport", "speed")
+    if any(baseline.get(key, 1.0 if key == "speed" else None) != results[key] for key in params):
+        print(f"⚠️ Базовый прогон снят с другими параметрами: {baseline['users']} участников, {baseline['transport']}, "
+              f"ускорение {baseline.get('speed', 1.0)}")
+    rows = [(f"{kind} {metric}", results["ops"][kind][metric], baseline["ops"].get(kind, {}).get(metric))
+            for kind in results["ops"] for metric in ("p50_ms", "p99_ms")]
+    # Стадии короче нескольких секунд (results — прогон на ней заканчивается) дают шумный CPU
+    rows += [(f"{stage} {metric}", values[metric], baseline["stages"].get(stage, {}).get(metric))
+             for stage, values in results["stages"].items() if values["seconds"] >= 5
+             for metric in ("cpu_percent", "rss_mb_max")]
+    print("📊 Сравнение с базовым прогоном:")
+    for label, value, base in rows:
+        if value is None or not base:
+            continue
+        change = (value - base) / base
+        worse = change > tolerance
+        if worse:
+            regressions.append(label)
+        print(f"   {'❌' if worse else '  '} {label:28} {base:10.2f} → {value:10.2f} ({change:+.0%})")
+    for kind, values in results["ops"].items():
+        if values["errors"] > baseline["ops"].get(kind, {}).get("errors", 0):
+            regressions.append(f"{kind} errors")
+            print(f"   ❌ {kind} errors: {baseline['ops'][kind]['errors']} → {values['errors']}")
+    return regressions
+
+def bench_cycle(args):
+    """Полный цикл викторины: args.users участников регистрируются, держат сокеты и отвечают в конце вопросов"""
+    if args.url:
+        host, port = args.url.split("//")[-1].rstrip("/").split(":")
+        port, pid, proc = int(port), args.pid, None
+    else:
+        host, port = "127.0.0.1", args.port
+        tmp = tempfile.TemporaryDirectory()
+        proc = start_server(port, env={
+            "QUIZ_MAX_USERS": str(args.users),
+            "QUIZ_QUESTIONS_PER_GAME": str(args.questions),
+            "QUIZ_SNAPSHOT": os.path.join(tmp.name, "snapshot.json"),
+            "QUIZ_SECRET_FILE": os.path.join(tmp.name, "secret.key"),
+            "QUIZ_JOURNAL": os.path.join(tmp.name, "journal.db"),
+            "QUIZ_CLOCK_SPEED": str(args.speed),
+        })
+        pid = proc.pid
+    try:
+        wait_ready(f"http://{host}:{port}")
+        results = asyncio.run(run_cycle(args, host, port, pid))
+    finally:
+        if proc is not None:
+            stop_server(proc)
+            tmp.cleanup()
+
+    print(f"🏁 {results['users']} участников, {results['questions']} вопросов, ответы через {results['transport']}")
+    for kind, values in results["ops"].items():
+        print(f"   {kind:9} {values['count']:6} запросов, ошибок {values['errors']:4}, "
+              f"p50 {values['p50_ms']} мс, p99 {values['p99_ms']} мс")
+    for stage, values in results["stages"].items():
+        print(f"   {stage:13} {values['seconds']:7.1f} с, CPU {values['cpu_percent']}%, RSS до {values['rss_mb_max']} MiB")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n")
+        print(f"💾 Результаты сохранены в {args.save}")
+    baseline = Path(args.baseline)
+    if baseline.exists() and baseline.resolve() != Path(args.save or "").resolve():
+        regressions = compare(results, json.loads(baseline.read_text()), args.tolerance)
+        check(not regressions, f"без регрессий относительно {baseline.name} (допуск {args.tolerance:.0%})")
+
+DEFAULT_USERS = {
+    "memory": 10_000,
+    "scoring": 10_000,
+    "tokens": 10_000,
+    "answers": 500,
+    "bank": 100_000,
+    "journal": 20_000,
+    "cycle": 1000,
+    "simulate": 1000,
+    "limits": 200,
+    "static": 2000,
+    "herd": 1000,
+    "reconnect": 1000,
+    "presenter": 1000,
+    "encode": 1000,
+    "burst": 2000,
+}
+
+SCENARIOS = {
+    "workers": bench_workers,
+    "memory": bench_memory,
+    "scoring": bench_scoring,
+    "tokens": bench_tokens,
+    "answers": bench_answers,
+    "bank": bench_bank,
+    "journal": bench_journal,
+    "restart": bench_restart,
+    "cycle": bench_cycle,
+    "simulate": bench_simulate,
+    "limits": bench_limits,
+    "static": bench_static,
+    "herd": bench_herd,
+    "reconnect": bench_reconnect,
+    "presenter": bench_presenter,
+    "encode": bench_encode,
+    "burst": bench_burst,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--users", type=int, default=None, help="число участников (по умолчанию зависит от сценария)")
+    parser.add_argument("--full", action="store_true", help="дождаться вопроса и проверить ответы и подсчет")
+    parser.add_argument("--target", type=float, default=3.0, help="restart: допустимое время перезапуска (секунды)")
+    cycle = parser.add_argument_group("cycle")
+    cycle.add_argument("--url", help="уже запущенный сервер, например http://127.0.0.1:8000 (по умолчанию запускается свой)")
+    cycle.add_argument("--pid", type=int, help="pid сервера из --url для замера CPU и памяти")
+    cycle.add_argument("--transport", choices=("ws", "http"), default="ws", help="как отправлять ответы")
+    cycle.add_argument("--questions", type=int, default=3, help="вопросов в цикле (только для своего сервера)")
+    cycle.add_argument("--window", type=float, default=3.0, help="за сколько игровых секунд до конца вопроса отвечают все")
+    cycle.add_argument("--speed", type=float, default=1.0, help="ускорение часов игры своего сервера (QUIZ_CLOCK_SPEED)")
+    cycle.add_argument("--concurrency", type=int, default=200, help="одновременных регистраций и подключений")
+    cycle.add_argument("--save", help="сохранить результаты в JSON")
+    cycle.add_argument("--baseline", default=str(CYCLE_BASELINE), help="базовый прогон для сравнения")
+    cycle.add_argument("--tolerance", type=float, default=0.5, help="допустимое ухудшение относительно базового прогона")
+    args = parser.parse_args()
+    if args.users is None:
+        args.users = DEFAULT_USERS.get(args.scenario, 50)
+    # Сценарии, которые импортируют backend в этот процесс, тоже не оставляют журнал,
+    # снимок и ключ подписи в корне репозитория (у серверов start_server — свои временные)
+    scratch = tempfile.mkdtemp(prefix="quiz-bench-")
+    for name, filename in (("QUIZ_JOURNAL", "journal.db"), ("QUIZ_SNAPSHOT", "snapshot.json"),
+                           ("QUIZ_SECRET_FILE", "secret.key")):
+        os.environ.setdefault(name, os.path.join(scratch, filename))
+    try:
+        SCENARIOS[args.scenario](args)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()